@@ -2,6 +2,9 @@ import streamlit as st
 import sqlite3
 import pandas as pd
 
+from costeo.catalogos import invalidar_catalogos, obtener_catalogo
+from costeo.conexion import obtener_conexion
+
 DB_PATH = 'minerva.db'
 
 st.set_page_config(layout="wide")
@@ -13,8 +16,7 @@ st.header("➕ Dar de Alta Nueva Receta")
 # Cargar clientes para el selector
 clientes_df = pd.DataFrame()
 try:
-    with sqlite3.connect(DB_PATH) as conn:
-        clientes_df = pd.read_sql_query("SELECT id, nombre FROM clientes", conn)
+    clientes_df = obtener_catalogo(DB_PATH, "clientes")[['id', 'nombre']]
 except sqlite3.Error as e:
     st.error(f"Error al cargar clientes: {e}")
 
@@ -35,13 +37,14 @@ with st.form("add_receta_form", clear_on_submit=True):
 
         if nombre_nueva and cliente_id_nueva is not None:
             try:
-                with sqlite3.connect(DB_PATH) as conn:
+                with obtener_conexion(DB_PATH) as conn:
                     cursor = conn.cursor()
                     cursor.execute(
                         "INSERT INTO recetas (nombre, cliente_id, uso, linea) VALUES (?, ?, ?, ?)",
                         (nombre_nueva, cliente_id_nueva, uso_nueva, linea_nueva)
                     )
                     conn.commit()
+                invalidar_catalogos(DB_PATH, "recetas")
                 st.success(f"Receta '{nombre_nueva}' agregada exitosamente.")
                 st.experimental_rerun() # Recargar para actualizar la lista de recetas
             except sqlite3.IntegrityError:
@@ -56,7 +59,7 @@ st.header("📝 Recetas Existentes")
 
 recetas_df = pd.DataFrame()
 try:
-    with sqlite3.connect(DB_PATH) as conn:
+    with obtener_conexion(DB_PATH) as conn:
         recetas_df = pd.read_sql_query("""
             SELECT 
                 r.id, 
@@ -117,13 +120,14 @@ if selected_receta_data is not None:
         if submitted_update:
             if update_nombre and cliente_id_mod is not None:
                 try:
-                    with sqlite3.connect(DB_PATH) as conn:
+                    with obtener_conexion(DB_PATH) as conn:
                         cursor = conn.cursor()
                         cursor.execute(
                             "UPDATE recetas SET nombre=?, cliente_id=?, uso=?, linea=? WHERE id=?",
                             (update_nombre, cliente_id_mod, update_uso, update_linea, receta_to_modify_id)
                         )
                         conn.commit()
+                    invalidar_catalogos(DB_PATH, "recetas")
                     st.success(f"Receta '{update_nombre}' (ID: {receta_to_modify_id}) actualizada exitosamente.")
                     st.experimental_rerun() 
                 except sqlite3.Error as e:
@@ -148,7 +152,7 @@ if selected_receta_name_del != "Seleccionar Receta" and not recetas_df.empty:
     
     if st.button("Confirmar Eliminación", key="confirm_delete_receta"):
         try:
-            with sqlite3.connect(DB_PATH) as conn:
+            with obtener_conexion(DB_PATH) as conn:
                 cursor = conn.cursor()
                 # Verificar si existen ingredientes asociados a esta receta
                 cursor.execute("SELECT COUNT(*) FROM receta_ingredientes WHERE receta_id = ?", (receta_to_delete_id,))
@@ -157,6 +161,7 @@ if selected_receta_name_del != "Seleccionar Receta" and not recetas_df.empty:
                 else:
                     cursor.execute("DELETE FROM recetas WHERE id=?", (receta_to_delete_id,))
                     conn.commit()
+                    invalidar_catalogos(DB_PATH, "recetas")
                     st.success(f"Receta '{selected_receta_name_del}' eliminada exitosamente.")
                     st.experimental_rerun()
         except sqlite3.Error as e:
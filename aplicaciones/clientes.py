@@ -2,6 +2,9 @@ import streamlit as st
 import sqlite3
 import pandas as pd
 
+from costeo.catalogos import invalidar_catalogos, obtener_catalogo
+from costeo.conexion import obtener_conexion
+
 DB_PATH = 'minerva.db'
 
 st.set_page_config(layout="wide")
@@ -10,7 +13,7 @@ st.title("Gestión de Clientes")
 # --- Funciones Auxiliares (Integradas en la lógica principal para evitar 'def') ---
 
 # Asegurarse de que la tabla clientes exista
-with sqlite3.connect(DB_PATH) as conn:
+with obtener_conexion(DB_PATH) as conn:
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS clientes (
@@ -23,8 +26,7 @@ with sqlite3.connect(DB_PATH) as conn:
 
 # --- Ver Clientes Existentes ---
 st.header("Clientes Registrados")
-with sqlite3.connect(DB_PATH) as conn:
-    df_clientes = pd.read_sql_query("SELECT id, nombre, contacto FROM clientes", conn)
+df_clientes = obtener_catalogo(DB_PATH, "clientes")
 if not df_clientes.empty:
     st.dataframe(df_clientes, use_container_width=True)
 else:
@@ -40,11 +42,12 @@ with st.form("add_client_form", clear_on_submit=True):
     if submitted_add:
         if new_nombre:
             try:
-                with sqlite3.connect(DB_PATH) as conn:
+                with obtener_conexion(DB_PATH) as conn:
                     cursor = conn.cursor()
                     cursor.execute("INSERT INTO clientes (nombre, contacto) VALUES (?, ?)",
                                    (new_nombre, new_contacto))
                     conn.commit()
+                invalidar_catalogos(DB_PATH, "clientes")
                 st.success(f"Cliente '{new_nombre}' agregado exitosamente.")
                 st.rerun()
             except sqlite3.Error as e:
@@ -55,8 +58,7 @@ with st.form("add_client_form", clear_on_submit=True):
 # --- Actualizar Cliente Existente ---
 st.header("Actualizar Cliente Existente")
 
-with sqlite3.connect(DB_PATH) as conn:
-    clientes_data = pd.read_sql_query("SELECT id, nombre FROM clientes", conn)
+clientes_data = obtener_catalogo(DB_PATH, "clientes")
 
 if not clientes_data.empty:
     clientes_dict = {row['nombre']: row['id'] for index, row in clientes_data.iterrows()}
@@ -69,14 +71,11 @@ if not clientes_data.empty:
         selected_client_id = None
         if selected_nombre:
             selected_client_id = clientes_dict[selected_nombre]
-            with sqlite3.connect(DB_PATH) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT nombre, contacto FROM clientes WHERE id = ?", (selected_client_id,))
-                client_to_update = cursor.fetchone()
+            client_to_update = clientes_data[clientes_data['id'] == selected_client_id]
             
-            if client_to_update:
-                current_nombre = client_to_update[0]
-                current_contacto = client_to_update[1]
+            if not client_to_update.empty:
+                current_nombre = client_to_update['nombre'].iloc[0]
+                current_contacto = client_to_update['contacto'].iloc[0] or ""
             else:
                 current_nombre = ""
                 current_contacto = ""
@@ -91,11 +90,12 @@ if not clientes_data.empty:
         if submitted_update:
             if selected_client_id and updated_nombre:
                 try:
-                    with sqlite3.connect(DB_PATH) as conn:
+                    with obtener_conexion(DB_PATH) as conn:
                         cursor = conn.cursor()
                         cursor.execute("UPDATE clientes SET nombre = ?, contacto = ? WHERE id = ?",
                                        (updated_nombre, updated_contacto, selected_client_id))
                         conn.commit()
+                    invalidar_catalogos(DB_PATH, "clientes")
                     st.success(f"Cliente '{current_nombre}' actualizado a '{updated_nombre}' exitosamente.")
                     st.rerun()
                 except sqlite3.Error as e:
@@ -110,8 +110,7 @@ else:
 # --- Eliminar Cliente ---
 st.header("Eliminar Cliente")
 
-with sqlite3.connect(DB_PATH) as conn:
-    clientes_data_delete = pd.read_sql_query("SELECT id, nombre FROM clientes", conn)
+clientes_data_delete = obtener_catalogo(DB_PATH, "clientes")
 
 if not clientes_data_delete.empty:
     clientes_dict_delete = {row['nombre']: row['id'] for index, row in clientes_data_delete.iterrows()}
@@ -126,7 +125,7 @@ if not clientes_data_delete.empty:
             if selected_nombre_delete:
                 selected_client_id_delete = clientes_dict_delete[selected_nombre_delete]
                 try:
-                    with sqlite3.connect(DB_PATH) as conn:
+                    with obtener_conexion(DB_PATH) as conn:
                         cursor = conn.cursor()
                         # Verificar si el cliente tiene recetas asociadas
                         cursor.execute("SELECT COUNT(*) FROM recetas WHERE cliente_id = ?", (selected_client_id_delete,))
@@ -137,6 +136,7 @@ if not clientes_data_delete.empty:
                         else:
                             cursor.execute("DELETE FROM clientes WHERE id = ?", (selected_client_id_delete,))
                             conn.commit()
+                            invalidar_catalogos(DB_PATH, "clientes")
                             st.success(f"Cliente '{selected_nombre_delete}' eliminado exitosamente.")
                             st.rerun()
                 except sqlite3.Error as e:
@@ -2,6 +2,9 @@ import streamlit as st
 import sqlite3
 import pandas as pd
 
+from costeo.catalogos import invalidar_catalogos, obtener_catalogo
+from costeo.conexion import obtener_conexion
+
 DB_PATH = 'minerva.db'
 
 st.title("Gestión de Recetas")
@@ -11,8 +14,7 @@ st.header("Dar de Alta Nueva Receta")
 
 # Obtener clientes para el selectbox
 try:
-    with sqlite3.connect(DB_PATH) as conn:
-        clientes_df = pd.read_sql_query("SELECT id, nombre FROM clientes", conn)
+    clientes_df = obtener_catalogo(DB_PATH, "clientes")[['id', 'nombre']]
     clientes_dict = {row['nombre']: row['id'] for index, row in clientes_df.iterrows()}
     clientes_nombres = list(clientes_dict.keys())
 except Exception as e:
@@ -43,13 +45,14 @@ with st.form("form_alta_receta"):
             st.error("Debe seleccionar un cliente para la receta.")
         else:
             try:
-                with sqlite3.connect(DB_PATH) as conn:
+                with obtener_conexion(DB_PATH) as conn:
                     cursor = conn.cursor()
                     cursor.execute(
                         "INSERT INTO recetas (nombre, cliente_id, uso, linea) VALUES (?, ?, ?, ?)",
                         (nombre_receta, cliente_id_seleccionado, uso_receta, linea_receta)
                     )
                     conn.commit()
+                invalidar_catalogos(DB_PATH, "recetas")
                 st.success(f"Receta '{nombre_receta}' agregada exitosamente.")
                 # Clear form fields after submission
                 st.session_state["nombre_receta_input"] = ""
@@ -64,7 +67,7 @@ with st.form("form_alta_receta"):
 st.header("Recetas Existentes")
 
 try:
-    with sqlite3.connect(DB_PATH) as conn:
+    with obtener_conexion(DB_PATH) as conn:
         recetas_df = pd.read_sql_query(
             """
             SELECT
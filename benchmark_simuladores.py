@@ -0,0 +1,201 @@
+"""
+Benchmark de los simuladores sobre bases sintéticas de distintas escalas.
+
+    python benchmark_simuladores.py --escalas 1 10 100 --salida bench.json
+    python benchmark_simuladores.py --escalas 1 10 --comparar bench.json     # sale con 1 si algo empeoró
+
+Para cada escala genera una minerva.db sintética (costeo.sintetico) en un directorio temporal,
+se para en él (los módulos usan DB_PATH = "minerva.db") y mide las funciones calientes de
+simulador_costo.py y un rerun completo de la página con el AppTest de Streamlit.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date, datetime
+
+import pandas as pd
+
+from costeo.conexion import cerrar_conexiones, obtener_conexion
+from costeo.sintetico import COMPRAS_POR_MP, GASTOS_POR_MES, generar_base
+from costeo.tanda import ingredientes_receta
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+PAGINA = os.path.join(RAIZ, "simulador_costo.py")
+PLANTILLA = os.path.join(RAIZ, "minerva.db")
+
+OPERACIONES = [
+    "calcular_costo_total",
+    "obtener_precio_actual_materia_prima",
+    "get_detalle_gastos_operativos_mensual",
+    "generate_pdf_reportlab",
+    "rerun_pagina",
+]
+
+# =================================================================================================
+# MEDICIÓN
+# =================================================================================================
+
+def medir(funcion, repeticiones):
+    """Ejecuta `funcion` `repeticiones` veces y devuelve {'mediana_ms', 'p95_ms', 'n'}."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000.0)
+    tiempos.sort()
+    return {
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "p95_ms": round(tiempos[min(len(tiempos) - 1, int(round(0.95 * (len(tiempos) - 1))))], 3),
+        "n": repeticiones,
+    }
+
+def _datos_pdf(simulador, conn, recetas, cotizacion):
+    """Datos de presupuesto con el formato de 'presupuesto_data_for_print' para las recetas dadas."""
+    filas = []
+    for receta_id, nombre in recetas:
+        ingredientes = ingredientes_receta(conn, receta_id)
+        costo = simulador.calcular_costo_total(ingredientes, cotizacion, conn)[0]
+        filas.append({"Receta": nombre, "Litros": 200.0, "Costo Total ARS": costo})
+    df = pd.DataFrame(filas)
+    df["Precio_Venta_Total_ARS"] = df["Costo Total ARS"] * 1.3
+    df["Precio_Venta_Total_USD"] = df["Precio_Venta_Total_ARS"] / cotizacion
+    df["Precio_Venta_Unitario_ARS"] = df["Precio_Venta_Total_ARS"] / df["Litros"]
+    df["Precio_Venta_Unitario_USD"] = df["Precio_Venta_Unitario_ARS"] / cotizacion
+    return {
+        "cliente_nombre": "Cliente Benchmark",
+        "costo_total_acumulado": df["Costo Total ARS"].sum(),
+        "ganancia_ars": df["Precio_Venta_Total_ARS"].sum() - df["Costo Total ARS"].sum(),
+        "precio_final_ars": df["Precio_Venta_Total_ARS"].sum(),
+        "litros_total_acumulado": df["Litros"].sum(),
+        "precio_unitario_ars_litro": df["Precio_Venta_Total_ARS"].sum() / df["Litros"].sum(),
+        "porcentaje_ganancia": 30.0,
+        "df_detalle_final_presupuesto": df,
+        "cotizacion_dolar_actual": cotizacion,
+        "presupuesto_id": 1,
+    }
+
+def medir_escala(directorio, escala, repeticiones, compras_por_mp, semilla):
+    """Genera la base de la escala en `directorio` y mide todas las OPERACIONES. Devuelve (filas, resultados)."""
+    import simulador_costo as simulador
+
+    db_path = os.path.join(directorio, "minerva.db")
+    filas = generar_base(db_path, PLANTILLA, escala, semilla,
+                         compras_por_mp=compras_por_mp, gastos_por_mes=int(round(GASTOS_POR_MES * escala)))
+
+    os.chdir(directorio)
+    conn = obtener_conexion(simulador.DB_PATH)
+    rng = random.Random(semilla)
+    recetas = conn.execute("SELECT id, nombre FROM recetas ORDER BY id").fetchall()
+    mp_ids = [fila[0] for fila in conn.execute("SELECT id FROM materias_primas")]
+    cotizacion = conn.execute("SELECT venta FROM cotizacion_dolar ORDER BY fecha_hora DESC LIMIT 1").fetchone()[0]
+    hoy = date.today()
+
+    muestra_recetas = [rng.choice(recetas) for _ in range(repeticiones)]
+    ingredientes = [ingredientes_receta(conn, receta_id) for receta_id, _ in muestra_recetas]
+    muestra_mp = [rng.choice(mp_ids) for _ in range(repeticiones)]
+    datos_pdf = _datos_pdf(simulador, conn, recetas[:max(1, min(len(recetas), int(10 * escala)))], cotizacion)
+
+    siguiente = iter(range(10 ** 9))
+    resultados = {
+        "calcular_costo_total": medir(lambda: simulador.calcular_costo_total(ingredientes[next(siguiente) % repeticiones], cotizacion, conn), repeticiones),
+        "obtener_precio_actual_materia_prima": medir(lambda: simulador.obtener_precio_actual_materia_prima(conn, muestra_mp[next(siguiente) % repeticiones]), repeticiones),
+        "get_detalle_gastos_operativos_mensual": medir(lambda: simulador.get_detalle_gastos_operativos_mensual(hoy.month, hoy.year), repeticiones),
+        "generate_pdf_reportlab": medir(lambda: simulador.generate_pdf_reportlab(datos_pdf), max(1, repeticiones // 5)),
+    }
+
+    from streamlit.testing.v1 import AppTest
+    pagina = AppTest.from_file(PAGINA, default_timeout=120)
+    pagina.run()  # primera corrida: crea tablas y carga la foto de precios
+    if pagina.exception:
+        raise RuntimeError(f"La página falló en la escala {escala}: {[e.message for e in pagina.exception]}")
+    resultados["rerun_pagina"] = medir(pagina.run, max(1, repeticiones // 5))
+    return filas, resultados
+
+# =================================================================================================
+# REPORTE Y COMPARACIÓN
+# =================================================================================================
+
+def imprimir_reporte(reporte, anterior=None):
+    """Tabla por escala y operación; con `anterior` agrega la relación contra esa corrida."""
+    print(f"\n{'escala':>7} {'operación':<40}{'mediana ms':>12}{'p95 ms':>12}{'vs anterior':>13}")
+    for escala, datos in reporte["escalas"].items():
+        for operacion in OPERACIONES:
+            medida = datos["resultados"][operacion]
+            relacion = ""
+            base = ((anterior or {}).get("escalas", {}).get(escala, {}).get("resultados", {})).get(operacion)
+            if base and base["mediana_ms"] > 0:
+                relacion = f"{medida['mediana_ms'] / base['mediana_ms']:.2f}x"
+            print(f"{escala:>7} {operacion:<40}{medida['mediana_ms']:>12.2f}{medida['p95_ms']:>12.2f}{relacion:>13}")
+
+def regresiones(reporte, anterior, tolerancia):
+    """Lista de (escala, operación, relación) cuya mediana empeoró más que `tolerancia` (ej: 1.25 = +25%)."""
+    peores = []
+    for escala, datos in reporte["escalas"].items():
+        for operacion, medida in datos["resultados"].items():
+            base = anterior.get("escalas", {}).get(escala, {}).get("resultados", {}).get(operacion)
+            if base and base["mediana_ms"] > 0 and medida["mediana_ms"] / base["mediana_ms"] > tolerancia:
+                peores.append((escala, operacion, round(medida["mediana_ms"] / base["mediana_ms"], 2)))
+    return peores
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los simuladores sobre bases sintéticas.")
+    parser.add_argument("--escalas", type=float, nargs="+", default=[1.0, 10.0], help="Escalas a medir (1 ≈ la base real)")
+    parser.add_argument("--repeticiones", type=int, default=50, help="Repeticiones por operación (PDF y rerun usan 1/5)")
+    parser.add_argument("--compras-por-mp", type=int, default=COMPRAS_POR_MP, help="Profundidad del historial de compras")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default=None, help="Guardar el reporte en JSON")
+    parser.add_argument("--comparar", default=None, help="Reporte JSON anterior contra el cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=1.25, help="Relación de mediana a partir de la cual se marca regresión")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, RAIZ)
+    warnings.filterwarnings("ignore")
+    import logging
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    reporte = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "repeticiones": args.repeticiones,
+        "compras_por_mp": args.compras_por_mp,
+        "escalas": {},
+    }
+    directorio_original = os.getcwd()
+    try:
+        for escala in args.escalas:
+            with tempfile.TemporaryDirectory(prefix=f"bench_x{escala:g}_") as directorio:
+                print(f"Escala {escala:g}: generando base y midiendo...", file=sys.stderr)
+                filas, resultados = medir_escala(directorio, escala, args.repeticiones, args.compras_por_mp, args.semilla)
+                cerrar_conexiones()
+                os.chdir(directorio_original)
+            reporte["escalas"][f"{escala:g}"] = {"filas": filas, "resultados": resultados}
+    finally:
+        os.chdir(directorio_original)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    imprimir_reporte(reporte, anterior)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+
+    if anterior:
+        peores = regresiones(reporte, anterior, args.tolerancia)
+        if peores:
+            print(f"\nRegresiones (> {args.tolerancia:.2f}x): {peores}")
+            sys.exit(1)
+        print(f"\nOK: ninguna operación empeoró más de {args.tolerancia:.2f}x.")
+
+if __name__ == "__main__":
+    main()
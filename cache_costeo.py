@@ -0,0 +1,26 @@
+import streamlit as st
+
+from costeo import clave_costo_base, costear_mp_base, escalar_costo_mp
+
+# =================================================================================================
+# COSTO DE MP DE LA TANDA (receta base costeada una vez por sesión y escalada)
+# =================================================================================================
+
+def costo_mp_base(ingredientes_df, cotizacion_dolar_actual, precios_df):
+    """
+    Costo de MP de la receta base (factor 1, la tupla de `costear_mp_base`). Queda en session_state:
+    mientras no cambien ingredientes, precios ni dólar, no se vuelve a costear.
+    """
+    clave = clave_costo_base(ingredientes_df, precios_df, cotizacion_dolar_actual)
+    cache = st.session_state.get('costo_mp_base')
+    if cache is None or cache['clave'] != clave:
+        cache = {'clave': clave, 'costo': costear_mp_base(ingredientes_df, precios_df, cotizacion_dolar_actual)}
+        st.session_state['costo_mp_base'] = cache
+    return cache['costo']
+
+def calcular_costo_tanda_mp(ingredientes_df, cotizacion_dolar_actual, precios_df, factor):
+    """
+    Igual que `calcular_costo_total` de los simuladores para una tanda de `factor` veces la receta
+    base: si sólo cambian los litros, se escala el costo de `costo_mp_base` sin volver a costear.
+    """
+    return escalar_costo_mp(costo_mp_base(ingredientes_df, cotizacion_dolar_actual, precios_df), factor)
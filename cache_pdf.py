@@ -0,0 +1,27 @@
+import streamlit as st
+
+from costeo.documentos import CacheDocumentos
+
+# =================================================================================================
+# PDFs DE PRESUPUESTOS COMPARTIDOS POR TODAS LAS SESIONES
+# =================================================================================================
+
+@st.cache_resource(show_spinner=False)
+def _cache_pdf():
+    """Un solo CacheDocumentos (y su hilo de generación) en todo el proceso de Streamlit."""
+    return CacheDocumentos()
+
+def encargar_pdf(render, data_pdf):
+    """Empieza a generar el PDF en segundo plano (se llama al guardar el presupuesto)."""
+    _cache_pdf().encargar(render, data_pdf)
+
+def obtener_pdf(render, data_pdf):
+    """
+    Bytes del PDF del presupuesto. Los reruns siguientes devuelven el ya generado;
+    sólo se vuelve a generar si cambian los datos del presupuesto.
+    """
+    cache = _cache_pdf()
+    if cache.listo(data_pdf):
+        return cache.obtener(render, data_pdf)
+    with st.spinner("Generando PDF..."):
+        return cache.obtener(render, data_pdf)
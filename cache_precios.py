@@ -0,0 +1,67 @@
+import os
+
+import streamlit as st
+
+from costeo import CacheSnapshotPrecios, ComposicionCiclicaError
+from costeo.cambio import CacheCotizaciones
+from costeo.historico import CacheLineaTiempoPrecios
+
+# =================================================================================================
+# FOTO DE PRECIOS COMPARTIDA POR TODAS LAS SESIONES
+# =================================================================================================
+
+@st.cache_resource(show_spinner=False)
+def _cache_precios(db_path):
+    """Un solo CacheSnapshotPrecios por base de datos en todo el proceso de Streamlit."""
+    return CacheSnapshotPrecios(db_path)
+
+def obtener_snapshot_precios(db_path):
+    """
+    Últimos precios de MP y envases en memoria. Los reruns (sliders, inputs) no leen las
+    tablas de precios: sólo se recargan cuando entran compras nuevas.
+    """
+    return _cache_precios(os.path.abspath(db_path)).obtener()
+
+def obtener_precios_materias_primas(db_path, materia_prima_ids):
+    """
+    Tabla de precios del motor para las MP pedidas, tomada de la foto en memoria.
+    Las MP combinadas (ej: SERUM) se costean por sus componentes; si la composición es
+    circular se avisa en pantalla y esas MP usan su último precio registrado.
+    """
+    snapshot = obtener_snapshot_precios(db_path)
+    try:
+        return snapshot.precios_mp(materia_prima_ids, combinados=True)
+    except ComposicionCiclicaError as e:
+        st.error(f"⚠️ {e}. Esas MP se costean con su último precio registrado.")
+        return snapshot.precios_mp(materia_prima_ids)
+
+# =================================================================================================
+# HISTORIA DE PRECIOS (costeo a fecha)
+# =================================================================================================
+
+@st.cache_resource(show_spinner=False)
+def _cache_linea_tiempo(db_path):
+    """Una sola CacheLineaTiempoPrecios por base de datos en todo el proceso de Streamlit."""
+    return CacheLineaTiempoPrecios(db_path)
+
+def obtener_linea_tiempo_precios(db_path):
+    """Historia de precios de MP en memoria (se recarga sólo cuando entran compras o precios nuevos)."""
+    return _cache_linea_tiempo(os.path.abspath(db_path)).obtener()
+
+# =================================================================================================
+# COTIZACIÓN DEL DÓLAR
+# =================================================================================================
+DOLAR_POR_DEFECTO = 1000.0
+
+@st.cache_resource(show_spinner=False)
+def _cache_cotizaciones(db_path):
+    """Una sola CacheCotizaciones por base de datos en todo el proceso de Streamlit."""
+    return CacheCotizaciones(db_path)
+
+def obtener_cotizaciones(db_path):
+    """Cotizaciones de compra y venta en memoria (se recargan sólo cuando cambian en la DB)."""
+    return _cache_cotizaciones(os.path.abspath(db_path)).obtener()
+
+def dolar_sugerido(db_path):
+    """Valor inicial de `dolar_input`: la última cotización de venta registrada."""
+    return obtener_cotizaciones(db_path).ultima("venta") or DOLAR_POR_DEFECTO
@@ -0,0 +1,60 @@
+"""
+Núcleo de costeo de recetas (sin Streamlit ni ReportLab).
+
+Los simuladores (simulador_costo.py, simulacion_envasases.py y pages/) delegan aquí
+los cálculos para que puedan ejecutarse por columnas y sin interfaz.
+"""
+from costeo.motor import (
+    COLUMNAS_DETALLE,
+    COLUMNAS_PRECIO,
+    RECARGO_FIJO_USD_PERCENT,
+    calcular_costo_mp,
+    ids_a_resolver,
+    precio_unitario_usd_base,
+    tabla_precios,
+)
+from costeo.precios import PRECIO_VACIO, obtener_precios_actuales
+from costeo.composicion import (
+    ComposicionCiclicaError,
+    cargar_composiciones,
+    obtener_precios_con_combinados,
+    orden_topologico,
+    resolver_precios_combinados,
+)
+from costeo.snapshot import CacheSnapshotPrecios, SnapshotPrecios, firma_precios
+from costeo.tanda import (
+    BASE_LITROS,
+    COLUMNAS_DETALLE_ESCALABLES,
+    DIAS_HABILES_FIJOS_MENSUAL,
+    RECETAS_DIARIAS,
+    VOLUMEN_MENSUAL_AUTOMATICO,
+    barrido_volumen,
+    calcular_empaque,
+    clave_costo_base,
+    costear_mp_base,
+    costear_tanda,
+    costo_flete,
+    costo_indirecto_por_litro,
+    escalar_costo_mp,
+    factor_escala,
+    ingredientes_receta,
+    margen_desde_precio,
+    precio_con_margen,
+    precio_envase_ars,
+    totales_tanda,
+    unidades_envase,
+    volumenes_barrido,
+)
+from costeo.conexion import abrir_conexion, cerrar_conexiones, obtener_conexion
+from costeo.gastos import SQL_DETALLE_GASTOS_MES, detalle_gastos_mes, rango_mes, total_gastos_mes
+from costeo.catalogos import CATALOGOS, CacheCatalogos, invalidar_catalogos, obtener_catalogo
+from costeo.documentos import CacheDocumentos, clave_documento
+from costeo.presupuestos import (
+    SQL_RESUMEN_RECETAS,
+    guardar_items_presupuesto,
+    items_de_presupuesto,
+    pagina_historial,
+    resumen_recetas,
+    sql_historial,
+)
+from costeo.cambio import SQL_COTIZACIONES, CacheCotizaciones, TablaCotizaciones, compras_convertidas, firma_cotizaciones
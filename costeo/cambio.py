@@ -0,0 +1,137 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from costeo.conexion import abrir_conexion
+
+# =================================================================================================
+# COTIZACIONES DEL DÓLAR (cotizacion_dolar + historial_cambios_dolar)
+# =================================================================================================
+
+# Todas las cotizaciones conocidas: la vigente (compra y venta) y cada cambio del historial
+SQL_COTIZACIONES = """
+    SELECT fecha_hora, 'compra', compra FROM cotizacion_dolar
+    UNION ALL
+    SELECT fecha_hora, 'venta', venta FROM cotizacion_dolar
+    UNION ALL
+    SELECT fecha_cambio, tipo_cambio, valor_nuevo FROM historial_cambios_dolar WHERE valor_nuevo > 0
+"""
+
+# Huella de las dos tablas; cotizacion_dolar suele editarse en el lugar, por eso se suman los valores
+_SQL_FIRMA_COTIZACIONES = """
+    SELECT
+        (SELECT MAX(id) FROM cotizacion_dolar), (SELECT COUNT(*) FROM cotizacion_dolar),
+        (SELECT MAX(fecha_hora) FROM cotizacion_dolar), (SELECT TOTAL(compra) + TOTAL(venta) FROM cotizacion_dolar),
+        (SELECT MAX(id) FROM historial_cambios_dolar), (SELECT COUNT(*) FROM historial_cambios_dolar)
+"""
+
+# Compras de MP de un período (para convertirlas con la cotización de su fecha)
+SQL_COMPRAS_PERIODO = """
+    SELECT id, fecha, materia_prima_id, proveedor_id, cantidad, precio_unitario, costo_total, moneda, cotizacion_usd
+    FROM compras_materia_prima
+    WHERE fecha BETWEEN ? AND ?
+"""
+
+TIPOS_CAMBIO = ("compra", "venta")
+SEGUNDOS_DIA = 86400
+
+def firma_cotizaciones(conn):
+    """Tupla que cambia si se agregan, borran o editan cotizaciones."""
+    return tuple(conn.execute(_SQL_FIRMA_COTIZACIONES).fetchone())
+
+def _segundos(instantes):
+    """(segundos desde 1970, máscara de válidas) de fechas u horas (texto ISO, date, datetime)."""
+    instantes = pd.to_datetime(pd.Series(np.atleast_1d(np.asarray(instantes, dtype=object))), format="ISO8601", errors="coerce")
+    segundos = instantes.to_numpy(dtype="datetime64[ns]").astype("datetime64[s]").astype(np.int64)
+    return segundos, ~instantes.isna().to_numpy()
+
+class TablaCotizaciones:
+    """
+    Cotizaciones de compra y venta ordenadas por fecha y hora, en arrays numpy.
+    La cotización "a una fecha" es la última registrada hasta el final de ese día (búsqueda binaria).
+    """
+
+    def __init__(self, series, firma):
+        self.series = series  # {tipo: (segundos int64 ordenados, valores float64)}
+        self.firma = firma
+
+    @classmethod
+    def cargar(cls, conn):
+        """Lee de la DB todas las cotizaciones."""
+        firma = firma_cotizaciones(conn)
+        filas = [tuple(fila) for fila in conn.execute(SQL_COTIZACIONES).fetchall()]
+        tabla = pd.DataFrame(filas, columns=["instante", "tipo", "valor"])
+        segundos, validos = _segundos(tabla["instante"])
+        tabla = tabla.assign(segundos=segundos)[validos & tabla["valor"].notna().to_numpy()]
+        series = {}
+        for tipo in TIPOS_CAMBIO:
+            serie = tabla[tabla["tipo"] == tipo].sort_values("segundos", kind="stable")
+            series[tipo] = (serie["segundos"].to_numpy(dtype=np.int64), serie["valor"].to_numpy(dtype=np.float64))
+        return cls(series, firma)
+
+    def ultima(self, tipo="venta"):
+        """Última cotización registrada (None si no hay ninguna)."""
+        _, valores = self.series[tipo]
+        return float(valores[-1]) if len(valores) else None
+
+    def en_fechas(self, fechas, tipo="venta"):
+        """
+        Cotización vigente al cierre de cada una de las `fechas`, como array. Las fechas anteriores a
+        la primera cotización toman la primera; sin cotizaciones (o fecha inválida) => NaN.
+        """
+        segundos, valores = self.series[tipo]
+        consulta, validas = _segundos(fechas)
+        resultado = np.full(len(consulta), np.nan)
+        if not len(valores):
+            return resultado
+        # Fin del día de cada fecha (las horas se descartan: cuenta todo el día)
+        cierre = (consulta // SEGUNDOS_DIA + 1) * SEGUNDOS_DIA - 1
+        posiciones = (np.searchsorted(segundos, cierre, side="right") - 1).clip(min=0)
+        resultado[validas] = valores[posiciones[validas]]
+        return resultado
+
+    def a_ars(self, montos_usd, fechas, tipo="venta"):
+        """Montos en USD convertidos a ARS con la cotización de su fecha."""
+        return np.asarray(montos_usd, dtype=float) * self.en_fechas(fechas, tipo)
+
+    def a_usd(self, montos_ars, fechas, tipo="venta"):
+        """Montos en ARS convertidos a USD con la cotización de su fecha."""
+        return np.asarray(montos_ars, dtype=float) / self.en_fechas(fechas, tipo)
+
+def compras_convertidas(conn, tabla, desde, hasta, tipo="venta"):
+    """
+    Compras de MP entre `desde` y `hasta` (ISO, inclusive) con 'cotizacion_dia' (la de `tabla` a la
+    fecha de cada compra) y el costo total en las dos monedas: 'costo_total_ars' y 'costo_total_usd'.
+    """
+    compras_df = pd.read_sql_query(SQL_COMPRAS_PERIODO, conn, params=(str(desde), str(hasta)))
+    cotizacion = tabla.en_fechas(compras_df["fecha"], tipo)
+    en_usd = (compras_df["moneda"] == "USD").to_numpy()
+    costo = compras_df["costo_total"].to_numpy(dtype=float)
+    compras_df["cotizacion_dia"] = cotizacion
+    compras_df["costo_total_ars"] = np.where(en_usd, costo * cotizacion, costo)
+    compras_df["costo_total_usd"] = np.where(en_usd, costo, costo / cotizacion)
+    return compras_df
+
+class CacheCotizaciones:
+    """
+    Mantiene una `TablaCotizaciones` por base de datos y la recarga sólo cuando cambian las
+    cotizaciones (PRAGMA data_version y después la firma de las dos tablas).
+    """
+
+    def __init__(self, db_path):
+        self._conn = abrir_conexion(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._tabla = None
+
+    def obtener(self):
+        """Devuelve la tabla vigente, recargándola si entraron cotizaciones nuevas."""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._tabla is not None and data_version == self._data_version:
+                return self._tabla
+            if self._tabla is None or firma_cotizaciones(self._conn) != self._tabla.firma:
+                self._tabla = TablaCotizaciones.cargar(self._conn)
+            self._data_version = data_version
+            return self._tabla
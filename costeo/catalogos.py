@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pandas as pd
+
+from costeo.conexion import abrir_conexion
+
+# =================================================================================================
+# CATÁLOGOS EN MEMORIA (recetas, MP, envases, categorías y clientes)
+# =================================================================================================
+
+# Consulta de cada catálogo: las columnas que usan los selectores y el orden en que se muestran
+CATALOGOS = {
+    "recetas": "SELECT id, nombre, cliente_id, uso, linea FROM recetas ORDER BY nombre",
+    "materias_primas": "SELECT id, nombre, unidad FROM materias_primas ORDER BY nombre",
+    "envases": "SELECT id, descripcion, unidad, cliente_id, capacidad_litros FROM envases ORDER BY descripcion",
+    "categorias_imputacion": "SELECT id, nombre, tipo FROM categorias_imputacion ORDER BY nombre",
+    "clientes": "SELECT id, nombre, contacto FROM clientes ORDER BY id",
+}
+
+def firma_catalogo(conn, nombre):
+    """
+    Huella del contenido del catálogo `nombre` (cantidad de filas y hash de todas sus columnas): cambia
+    si se agregan, borran o editan filas, también con un UPDATE en el lugar desde otro proceso. Los
+    catálogos son chicos, así que se recorren enteros; sólo se calcula cuando cambió `data_version`.
+    """
+    filas = conn.execute(CATALOGOS[nombre]).fetchall()
+    return len(filas), hash(tuple(tuple(fila) for fila in filas))
+
+class CacheCatalogos:
+    """
+    Catálogos de una base de datos en memoria. Las pantallas que graban (altas, ediciones, bajas)
+    llaman a `invalidar()` con las tablas que tocaron. Además, si otro proceso escribió
+    (`PRAGMA data_version`), se recargan sólo los catálogos cuyo contenido cambió.
+    """
+
+    def __init__(self, db_path):
+        self._conn = abrir_conexion(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._tablas = {}   # nombre -> (firma, DataFrame)
+
+    def obtener(self, nombre):
+        """Copia del catálogo `nombre` (DataFrame con las columnas de CATALOGOS)."""
+        if nombre not in CATALOGOS:
+            raise KeyError(f"Catálogo desconocido: {nombre}")
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                for tabla, (firma, _) in list(self._tablas.items()):
+                    if firma_catalogo(self._conn, tabla) != firma:
+                        del self._tablas[tabla]
+                self._data_version = data_version
+            if nombre not in self._tablas:
+                firma = firma_catalogo(self._conn, nombre)
+                self._tablas[nombre] = (firma, pd.read_sql_query(CATALOGOS[nombre], self._conn))
+            return self._tablas[nombre][1].copy()
+
+    def invalidar(self, *nombres):
+        """Descarta los catálogos indicados (todos si no se indica ninguno)."""
+        with self._lock:
+            for nombre in nombres or list(self._tablas):
+                self._tablas.pop(nombre, None)
+
+_caches = {}
+_caches_lock = threading.Lock()
+_caches_pid = os.getpid()
+
+def _cache(db_path):
+    global _caches_pid
+    clave = os.path.abspath(db_path)
+    with _caches_lock:
+        if _caches_pid != os.getpid():  # después de un fork el hijo no usa las conexiones del padre
+            _caches.clear()
+            _caches_pid = os.getpid()
+        if clave not in _caches:
+            _caches[clave] = CacheCatalogos(clave)
+        return _caches[clave]
+
+def obtener_catalogo(db_path, nombre):
+    """Catálogo `nombre` de `db_path` desde la caché del proceso (compartida por todas las sesiones)."""
+    return _cache(db_path).obtener(nombre)
+
+def invalidar_catalogos(db_path, *nombres):
+    """Llamar después de grabar en alguna de las tablas de CATALOGOS (sin nombres: todas)."""
+    _cache(db_path).invalidar(*nombres)
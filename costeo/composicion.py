@@ -0,0 +1,102 @@
+from collections import deque
+
+from costeo.precios import obtener_precios_actuales
+
+# =================================================================================================
+# GRAFO DE MATERIAS PRIMAS COMBINADAS (composicion_colorantes)
+# =================================================================================================
+
+class ComposicionCiclicaError(ValueError):
+    """La tabla composicion_colorantes contiene un ciclo (una MP se compone de sí misma)."""
+
+    def __init__(self, materias_primas):
+        self.materias_primas = sorted(materias_primas)
+        super().__init__(f"Composición circular (o que depende de un ciclo) en las materias primas: {self.materias_primas}")
+
+def cargar_composiciones(conn):
+    """
+    Carga toda la tabla composicion_colorantes en una sola consulta.
+    Devuelve {colorante_combinado_id: [(colorante_primario_id, proporcion), ...]}.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT colorante_combinado_id, colorante_primario_id, proporcion
+        FROM composicion_colorantes
+        WHERE colorante_combinado_id IS NOT NULL AND colorante_primario_id IS NOT NULL
+    """)
+    composiciones = {}
+    for combinado_id, primario_id, proporcion in cursor.fetchall():
+        composiciones.setdefault(int(combinado_id), []).append((int(primario_id), proporcion or 0.0))
+    return composiciones
+
+def orden_topologico(composiciones, raices):
+    """
+    Ordena de abajo hacia arriba las MP combinadas alcanzables desde `raices`
+    (cada combinada aparece después de todos sus componentes combinados).
+    Lanza ComposicionCiclicaError si el subgrafo tiene un ciclo.
+    """
+    # 1. Subgrafo alcanzable desde las raíces (sólo nodos combinados)
+    combinadas = set()
+    pendientes = [mp_id for mp_id in raices if mp_id in composiciones]
+    while pendientes:
+        mp_id = pendientes.pop()
+        if mp_id in combinadas:
+            continue
+        combinadas.add(mp_id)
+        pendientes.extend(comp_id for comp_id, _ in composiciones[mp_id] if comp_id in composiciones)
+
+    # 2. Kahn: una combinada está lista cuando todos sus componentes combinados lo están
+    faltantes = {mp_id: {comp_id for comp_id, _ in composiciones[mp_id] if comp_id in composiciones} for mp_id in combinadas}
+    usada_por = {}
+    for mp_id, componentes in faltantes.items():
+        for comp_id in componentes:
+            usada_por.setdefault(comp_id, []).append(mp_id)
+
+    listas = deque(mp_id for mp_id, componentes in faltantes.items() if not componentes)
+    orden = []
+    while listas:
+        mp_id = listas.popleft()
+        orden.append(mp_id)
+        for padre_id in usada_por.get(mp_id, []):
+            faltantes[padre_id].discard(mp_id)
+            if not faltantes[padre_id]:
+                listas.append(padre_id)
+
+    if len(orden) < len(combinadas):
+        raise ComposicionCiclicaError(combinadas.difference(orden))
+    return orden
+
+def componentes_simples(composiciones, orden):
+    """MP no combinadas que intervienen en las combinadas de `orden`."""
+    return {comp_id for mp_id in orden for comp_id, _ in composiciones[mp_id] if comp_id not in composiciones}
+
+def resolver_precios_combinados(precios_df, composiciones, orden):
+    """
+    Calcula en una pasada (de abajo hacia arriba) el precio de cada MP combinada como la suma
+    de precio_unitario * proporcion de sus componentes. Cada combinada se calcula una sola vez
+    y se reutiliza en las mezclas que la contienen, así el costo es O(aristas).
+    `precios_df` debe incluir las MP simples de `componentes_simples`; se modifica y devuelve.
+    """
+    precio_unitario = {int(mp_id): precio for mp_id, precio in precios_df["precio_unitario"].items()}
+    for mp_id in orden:
+        precio_unitario[mp_id] = sum(
+            precio_unitario.get(comp_id, 0.0) * proporcion
+            for comp_id, proporcion in composiciones[mp_id]
+        )
+        # El valor ya está resuelto, por eso la cotización es 1.0 (igual que la versión recursiva)
+        precios_df.loc[mp_id] = (precio_unitario[mp_id], 0.0, 0.0, 1.0)
+    return precios_df
+
+def obtener_precios_con_combinados(conn, materia_prima_ids):
+    """
+    Igual que `obtener_precios_actuales`, pero las MP combinadas (ej: SERUM) se costean por
+    sus componentes. Usa dos consultas sin importar la profundidad de las mezclas.
+    """
+    materia_prima_ids = [int(mp_id) for mp_id in materia_prima_ids if mp_id != -1]
+    composiciones = cargar_composiciones(conn)
+    orden = orden_topologico(composiciones, materia_prima_ids)
+
+    simples = componentes_simples(composiciones, orden)
+    precios_df = obtener_precios_actuales(conn, simples.union(materia_prima_ids))
+    resolver_precios_combinados(precios_df, composiciones, orden)
+    return precios_df.loc[sorted(set(materia_prima_ids))]
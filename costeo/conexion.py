@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import threading
+
+from costeo.perfil import CursorMedido, perfil_activo
+
+# =================================================================================================
+# CONEXIONES SQLITE CONFIGURADAS (una por proceso e hilo)
+# =================================================================================================
+DB_PATH = "minerva.db"
+
+# Se aplican una sola vez, al abrir la conexión. journal_mode=WAL queda guardado en el archivo:
+# los lectores (simuladores) no bloquean a quien graba compras o presupuestos.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -32000),        # 32 MB de caché de páginas
+    ("mmap_size", 268435456),      # 256 MB mapeados en memoria
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),        # ms de espera si otro proceso tiene el lock de escritura
+)
+
+class ConexionCompartida(sqlite3.Connection):
+    """
+    Conexión del pool. `close()` no la cierra (la reutiliza el próximo pedido del mismo hilo):
+    sólo descarta lo no confirmado, igual que cerrar una conexión propia. `cerrar()` la cierra de verdad.
+    """
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def cerrar(self):
+        super().close()
+
+    # Con un perfil activo (costeo.perfil) las sentencias pasan por CursorMedido para contarlas y medirlas
+    def cursor(self, factory=sqlite3.Cursor):
+        return super().cursor(CursorMedido if perfil_activo() is not None else factory)
+
+    def execute(self, sql, parametros=()):
+        if perfil_activo() is None:
+            return super().execute(sql, parametros)
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        if perfil_activo() is None:
+            return super().executemany(sql, parametros)
+        return self.cursor().executemany(sql, parametros)
+
+def configurar_conexion(conn, solo_lectura=False):
+    """Aplica PRAGMAS a la conexión (journal_mode se omite en sólo lectura)."""
+    for pragma, valor in PRAGMAS:
+        if solo_lectura and pragma == "journal_mode":
+            continue
+        conn.execute(f"PRAGMA {pragma} = {valor}")
+    return conn
+
+def abrir_conexion(db_path=DB_PATH, solo_lectura=False, **kwargs):
+    """Conexión nueva (fuera del pool) ya configurada; para workers y cachés con su propio ciclo de vida."""
+    if solo_lectura:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, **kwargs)
+    else:
+        conn = sqlite3.connect(db_path, **kwargs)
+    return configurar_conexion(conn, solo_lectura)
+
+_local = threading.local()
+
+def obtener_conexion(db_path=DB_PATH):
+    """
+    Conexión configurada del hilo actual para `db_path` (filas sqlite3.Row).
+    Se abre la primera vez y se reutiliza en todas las llamadas siguientes del mismo hilo;
+    después de un fork (pool de procesos) el hijo abre las suyas.
+    """
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.conexiones = {}
+    clave = os.path.abspath(db_path)
+    conn = _local.conexiones.get(clave)
+    if conn is None:
+        conn = configurar_conexion(sqlite3.connect(db_path, factory=ConexionCompartida))
+        conn.row_factory = sqlite3.Row
+        _local.conexiones[clave] = conn
+    return conn
+
+def cerrar_conexiones():
+    """Cierra las conexiones del pool del hilo actual."""
+    for conn in getattr(_local, "conexiones", {}).values():
+        conn.cerrar()
+    _local.conexiones = {}
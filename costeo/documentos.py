@@ -0,0 +1,65 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+# =================================================================================================
+# PDFs DE PRESUPUESTOS YA GENERADOS (por N° de presupuesto y contenido)
+# =================================================================================================
+
+def clave_documento(data):
+    """
+    (presupuesto_id, hash del contenido) de los datos de impresión. Cambia si cambia cualquier campo
+    o fila del detalle, y también al día siguiente (el PDF lleva la fecha de emisión).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(date.today().isoformat().encode())
+    for campo in sorted(data):
+        valor = data[campo]
+        h.update(campo.encode())
+        if isinstance(valor, pd.DataFrame):
+            h.update(valor.to_json(orient="split", double_precision=15).encode())
+        else:
+            h.update(repr(valor).encode())
+    return data.get("presupuesto_id"), h.hexdigest()
+
+class CacheDocumentos:
+    """
+    PDFs ya generados, guardados por `clave_documento`. `encargar()` los genera en un hilo aparte
+    (al guardar el presupuesto, fuera del rerun) y `obtener()` devuelve los bytes, esperando sólo si
+    todavía se están generando. Se conservan los `maximo` más recientes.
+    """
+
+    def __init__(self, maximo=32, hilos=1):
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="pdf")
+        self._lock = threading.Lock()
+        self._maximo = maximo
+        self._documentos = OrderedDict()   # clave -> Future con los bytes del PDF
+
+    def encargar(self, render, data):
+        """Pone a generar `render(data)` si ese contenido no está (o falló); devuelve el Future."""
+        clave = clave_documento(data)
+        with self._lock:
+            futuro = self._documentos.get(clave)
+            if futuro is None or (futuro.done() and futuro.exception() is not None):
+                # Copia del detalle: la sesión puede seguir modificando el suyo mientras se genera
+                copia = {k: (v.copy() if isinstance(v, pd.DataFrame) else v) for k, v in data.items()}
+                futuro = self._executor.submit(render, copia)
+                self._documentos[clave] = futuro
+            self._documentos.move_to_end(clave)
+            while len(self._documentos) > self._maximo:
+                self._documentos.popitem(last=False)
+        return futuro
+
+    def obtener(self, render, data, timeout=None):
+        """Bytes del PDF de `data` (lo genera si hace falta)."""
+        return self.encargar(render, data).result(timeout)
+
+    def listo(self, data):
+        """True si el PDF de `data` ya está generado."""
+        with self._lock:
+            futuro = self._documentos.get(clave_documento(data))
+        return futuro is not None and futuro.done()
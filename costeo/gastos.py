@@ -0,0 +1,44 @@
+import pandas as pd
+
+# =================================================================================================
+# GASTOS OPERATIVOS MENSUALES
+# =================================================================================================
+
+# Rango semiabierto [desde, hasta) sobre fecha_factura: usa idx_gastos_fecha en vez de strftime()
+SQL_DETALLE_GASTOS_MES = """
+    SELECT
+        g.fecha_factura AS Fecha,
+        ci.nombre AS Categoria,
+        g.beneficiario_nombre AS Beneficiario,
+        g.importe_total AS Monto_ARS
+    FROM
+        gastos g
+    JOIN
+        categorias_imputacion ci ON g.categoria_id = ci.id
+    WHERE
+        g.fecha_factura >= ? AND g.fecha_factura < ?
+    ORDER BY
+        g.fecha_factura, ci.nombre
+"""
+
+# Total del mes desde el resumen gastos_mensuales (mantenido por triggers sobre gastos)
+SQL_TOTAL_GASTOS_MES = """
+    SELECT COALESCE(SUM(total), 0.0)
+    FROM gastos_mensuales
+    WHERE anio_mes = ?
+"""
+
+def rango_mes(mes, anio):
+    """Fechas ISO (desde, hasta) del mes como rango semiabierto: desde <= fecha < hasta."""
+    mes, anio = int(mes), int(anio)
+    desde = f"{anio:04d}-{mes:02d}-01"
+    hasta = f"{anio + 1:04d}-01-01" if mes == 12 else f"{anio:04d}-{mes + 1:02d}-01"
+    return desde, hasta
+
+def detalle_gastos_mes(conn, mes, anio):
+    """Detalle de gastos (Fecha, Categoria, Beneficiario, Monto_ARS) de un mes."""
+    return pd.read_sql_query(SQL_DETALLE_GASTOS_MES, conn, params=rango_mes(mes, anio))
+
+def total_gastos_mes(conn, mes, anio):
+    """Gasto operativo total del mes leído del resumen gastos_mensuales."""
+    return float(conn.execute(SQL_TOTAL_GASTOS_MES, (f"{int(anio):04d}-{int(mes):02d}",)).fetchone()[0])
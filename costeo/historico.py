@@ -0,0 +1,463 @@
+"""
+Costeo a fecha: precios de MP vigentes en cualquier día, a partir de las líneas de tiempo de
+compras_materia_prima y precios_materias_primas.
+
+    python -m costeo.historico --receta 3 --fecha 2025-09-01 --dolar 1480
+    python -m costeo.historico --receta 3 --desde 2025-08-01 --hasta 2025-12-31 --litros 1000 --salida serie.csv
+    python -m costeo.historico --receta 3 --fecha 2025-09-01 --dolar 1480 --reconstruir-cache
+
+Se leen una vez todas las filas de las dos tablas y se guardan como arrays ordenados por
+(materia_prima_id, fecha, id). El precio de una MP en un día es la última compra hasta ese día
+inclusive y, si todavía no se había comprado, el último precio cargado hasta ese día (la misma
+regla que `obtener_precios_actuales`). Cada consulta es una búsqueda binaria sobre los arrays.
+Los arrays se guardan además en minerva.db.lineas y se mapean en memoria al arrancar: un proceso
+nuevo sólo lee de la DB las filas agregadas desde la última vez (y rearma la línea de una tabla
+si se borraron o editaron filas ya guardadas).
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from costeo.composicion import cargar_composiciones, componentes_simples, orden_topologico
+from costeo.conexion import abrir_conexion
+from costeo.motor import COLUMNAS_PRECIO, RECARGO_FIJO_USD_PERCENT, _columna
+from costeo.precios import PRECIO_VACIO
+from costeo.snapshot import firma_precios
+from costeo.tanda import BASE_LITROS, ingredientes_receta
+
+# =================================================================================================
+# LÍNEAS DE TIEMPO DE PRECIOS (una por tabla, todas las MP en los mismos arrays)
+# =================================================================================================
+
+# Todas las compras; misma cotización que usa `_SQL_PRECIOS_ACTUALES` (compra en ARS => 1.0)
+_SQL_LINEA_COMPRAS = """
+    SELECT
+        id,
+        materia_prima_id,
+        fecha,
+        precio_unitario,
+        0.0,
+        0.0,
+        CASE
+            WHEN moneda = 'ARS' AND COALESCE(cotizacion_usd, 1.0) <= 1.0 THEN 1.0
+            ELSE COALESCE(cotizacion_usd, 1.0)
+        END
+    FROM compras_materia_prima
+    {filtro}
+"""
+
+# Todos los precios cargados a mano
+_SQL_LINEA_PRECIOS = """
+    SELECT
+        id,
+        materia_prima_id,
+        fecha,
+        precio_unitario,
+        COALESCE(costo_flete, 0.0),
+        COALESCE(otros_costos, 0.0),
+        COALESCE(cotizacion_usd, 1.0)
+    FROM precios_materias_primas
+    {filtro}
+"""
+
+# Huella del contenido de cada tabla hasta un id: sumas de todas las columnas que lee su línea,
+# ponderadas por id para que también se note un valor movido de una fila a otra. Se recorre por
+# rowid (WHERE id <= ?) para que las sumas salgan siempre en el mismo orden y se puedan comparar.
+_SQL_FIRMA_COMPRAS = """
+    SELECT
+        COUNT(*),
+        TOTAL(id * materia_prima_id),
+        TOTAL(id * julianday(fecha)),
+        TOTAL(id * precio_unitario),
+        TOTAL(id * cotizacion_usd),
+        TOTAL(id * (moneda = 'ARS'))
+    FROM compras_materia_prima
+    WHERE id <= ?
+"""
+
+_SQL_FIRMA_PRECIOS = """
+    SELECT
+        COUNT(*),
+        TOTAL(id * materia_prima_id),
+        TOTAL(id * julianday(fecha)),
+        TOTAL(id * precio_unitario),
+        TOTAL(id * costo_flete) + TOTAL(id * otros_costos),
+        TOTAL(id * cotizacion_usd)
+    FROM precios_materias_primas
+    WHERE id <= ?
+"""
+
+# Nombre de cada línea -> (tabla de origen, consulta, huella)
+_TABLAS_LINEA = {
+    "compras": ("compras_materia_prima", _SQL_LINEA_COMPRAS, _SQL_FIRMA_COMPRAS),
+    "precios": ("precios_materias_primas", _SQL_LINEA_PRECIOS, _SQL_FIRMA_PRECIOS),
+}
+
+# Columnas de la serie de costo de MP (una fila por fecha)
+COLUMNAS_SERIE = ["costo_mp_total", "costo_mp_base_ars", "costo_recargo_mp_ars", "costo_total_mp_usd"]
+
+def dias_desde_epoca(fechas):
+    """Fechas (texto ISO, date o datetime) como días enteros desde 1970-01-01; NaT => -1 << 40."""
+    fechas = pd.to_datetime(pd.Series(np.atleast_1d(np.asarray(fechas, dtype=object))), format="ISO8601", errors="coerce")
+    dias = fechas.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+    return np.where(fechas.isna().to_numpy(), -1 << 40, dias)
+
+def _linea_desde_filas(filas):
+    """
+    Arrays de una tabla de precios a partir de filas (id, materia_prima_id, fecha, 4 columnas de precio),
+    ordenados por (materia_prima_id, fecha, id). Se descartan las filas sin fecha válida.
+    Devuelve (ids, mp_ids, dias, valores (n, 4)).
+    """
+    filas = [tuple(fila) for fila in filas]
+    ids = np.array([fila[0] for fila in filas], dtype=np.int64)
+    mp_ids = np.array([fila[1] for fila in filas], dtype=np.int64)
+    dias = dias_desde_epoca([fila[2] for fila in filas]) if filas else np.zeros(0, dtype=np.int64)
+    valores = np.array([fila[3:] for fila in filas], dtype=np.float64).reshape(-1, len(COLUMNAS_PRECIO))
+    valores[:, 0] = np.nan_to_num(valores[:, 0])
+    valores[:, 3] = np.where(np.isnan(valores[:, 3]), 1.0, valores[:, 3])
+
+    validas = dias > (-1 << 40)
+    orden = np.lexsort((ids[validas], dias[validas], mp_ids[validas]))
+    return ids[validas][orden], mp_ids[validas][orden], dias[validas][orden], valores[validas][orden]
+
+def _claves(mp_ids, dias):
+    """Clave única ordenable (materia_prima_id, día) para buscar en una sola llamada a searchsorted."""
+    return (np.asarray(mp_ids, dtype=np.int64) << 32) + (np.asarray(dias, dtype=np.int64) + (1 << 31))
+
+class LineaTiempoPrecios:
+    """
+    Historia completa de precios de MP en arrays numpy (compras y precios cargados por separado).
+    Se arma con dos consultas y después responde "precio al día D" sin tocar la DB.
+    """
+
+    def __init__(self, compras, precios, composiciones, firma):
+        # Cada línea: (ids, mp_ids, dias, valores) ordenada por (materia_prima_id, fecha, id)
+        self.compras = compras
+        self.precios = precios
+        self.composiciones = composiciones
+        self.firma = firma
+        self._claves_compras = _claves(compras[1], compras[2])
+        self._claves_precios = _claves(precios[1], precios[2])
+
+    @classmethod
+    def cargar(cls, conn, ruta_cache=None):
+        """
+        Lee de la DB todas las compras y precios de MP. Con `ruta_cache` parte de la caché en disco
+        (ver `actualizar_cache_lineas`) y sólo lee de la DB las filas nuevas.
+        """
+        firma = firma_precios(conn)
+        if ruta_cache is not None:
+            lineas = actualizar_cache_lineas(conn, ruta_cache)
+        else:
+            lineas = {nombre: _linea_desde_filas(conn.execute(sql.format(filtro="")).fetchall()) for nombre, (_, sql, _) in _TABLAS_LINEA.items()}
+        return cls(lineas["compras"], lineas["precios"], cargar_composiciones(conn), firma)
+
+    def rango_fechas(self):
+        """(primera, última) fecha con algún precio registrado, o (None, None) si no hay."""
+        dias = np.concatenate([self.compras[2], self.precios[2]])
+        if not len(dias):
+            return None, None
+        return tuple(pd.Timestamp(np.datetime64(int(dia), "D")).date() for dia in (dias.min(), dias.max()))
+
+    def valores_en(self, materia_prima_ids, fechas):
+        """
+        Precios registrados (sin resolver combinadas) de cada MP en cada fecha: array
+        (fechas, MP, 4) en el orden de COLUMNAS_PRECIO; sin precio hasta esa fecha => PRECIO_VACIO.
+        """
+        mp_ids = np.asarray(materia_prima_ids, dtype=np.int64)
+        dias = dias_desde_epoca(fechas)
+        mp_q = np.broadcast_to(mp_ids[None, :], (len(dias), len(mp_ids))).ravel()
+        dias_q = np.broadcast_to(dias[:, None], (len(dias), len(mp_ids))).ravel()
+        claves = _claves(mp_q, dias_q)
+
+        valores = np.tile(np.array(PRECIO_VACIO, dtype=np.float64), (len(claves), 1))
+        pendientes = np.ones(len(claves), dtype=bool)
+        # Primero la última compra hasta la fecha; si no hay, el último precio cargado
+        for (_, linea_mp, _, linea_valores), linea_claves in ((self.compras, self._claves_compras), (self.precios, self._claves_precios)):
+            if not len(linea_claves):
+                continue
+            posiciones = np.searchsorted(linea_claves, claves, side="right") - 1
+            encontrado = pendientes & (posiciones >= 0) & (linea_mp[posiciones.clip(min=0)] == mp_q)
+            valores[encontrado] = linea_valores[posiciones[encontrado]]
+            pendientes &= ~encontrado
+        return valores.reshape(len(dias), len(mp_ids), len(COLUMNAS_PRECIO))
+
+    def matriz_precios(self, materia_prima_ids, fechas, combinados=False):
+        """
+        (ids, valores) con `valores` (fechas, MP, 4) para las MP pedidas (ordenadas, sin -1).
+        Con `combinados=True` las MP combinadas se costean por sus componentes en cada fecha (igual
+        que `resolver_precios_combinados`, pero para todas las fechas a la vez); puede lanzar
+        ComposicionCiclicaError.
+        """
+        ids = sorted({int(mp_id) for mp_id in materia_prima_ids if mp_id != -1})
+        if not combinados:
+            return ids, self.valores_en(ids, fechas)
+
+        orden = orden_topologico(self.composiciones, ids)
+        todos = sorted(componentes_simples(self.composiciones, orden).union(ids).union(orden))
+        valores = self.valores_en(todos, fechas)
+        columna = {mp_id: posicion for posicion, mp_id in enumerate(todos)}
+        for mp_id in orden:
+            precio = np.zeros(valores.shape[0])
+            for comp_id, proporcion in self.composiciones[mp_id]:
+                precio += valores[:, columna[comp_id], 0] * proporcion
+            valores[:, columna[mp_id]] = np.array(PRECIO_VACIO)
+            valores[:, columna[mp_id], 0] = precio
+        return ids, valores[:, [columna[mp_id] for mp_id in ids]]
+
+    def precios_mp(self, materia_prima_ids, fecha, combinados=False):
+        """Tabla de precios del motor (como `SnapshotPrecios.precios_mp`) vigente al día `fecha`."""
+        ids, valores = self.matriz_precios(materia_prima_ids, [fecha], combinados)
+        return pd.DataFrame(valores[0], columns=COLUMNAS_PRECIO, index=pd.Index(np.asarray(ids, dtype=np.int64), name="materia_prima_id"))
+
+    def serie_costo_mp(self, ingredientes_df, fechas, cotizacion_dolar, combinados=True):
+        """
+        Costo de MP de `ingredientes_df` (formato del motor) en cada una de las `fechas`, con las
+        mismas reglas que `calcular_costo_mp` (precio manual > precio a la fecha; recargo 3% en USD).
+        `cotizacion_dolar` es un valor o un array con el dólar de cada fecha.
+        Devuelve un DataFrame indexado por fecha con COLUMNAS_SERIE.
+        """
+        indice = pd.DatetimeIndex(pd.to_datetime(pd.Series(np.atleast_1d(np.asarray(fechas, dtype=object))), format="ISO8601"), name="fecha")
+        dolar = np.broadcast_to(np.asarray(cotizacion_dolar, dtype=float), (len(indice),))
+        if ingredientes_df.empty:
+            return pd.DataFrame(0.0, index=indice, columns=COLUMNAS_SERIE)
+
+        mp_ids = ingredientes_df["materia_prima_id"].to_numpy(dtype=np.int64)
+        cantidad = ingredientes_df["cantidad_simulada"].to_numpy(dtype=float)
+        precio_manual = _columna(ingredientes_df, "precio_unitario_manual", 0.0).to_numpy()
+        cotizacion_manual = _columna(ingredientes_df, "cotizacion_usd_manual", 1.0).to_numpy()
+
+        # (fechas × ingredientes): precio y cotización de la DB a cada fecha
+        ids, valores = self.matriz_precios(mp_ids[(mp_ids != -1) & (precio_manual <= 0.0)], indice, combinados)
+        ids = np.asarray(ids, dtype=np.int64)
+        precio_db = np.zeros((len(indice), len(mp_ids)))
+        cotizacion_db = np.ones((len(indice), len(mp_ids)))
+        if len(ids):
+            posiciones = np.searchsorted(ids, mp_ids).clip(max=len(ids) - 1)
+            con_precio = ids[posiciones] == mp_ids
+            precio_db[:, con_precio] = valores[:, posiciones[con_precio], 0]
+            cotizacion_db[:, con_precio] = valores[:, posiciones[con_precio], 3]
+
+        es_manual = precio_manual > 0.0
+        es_db = ~es_manual & (mp_ids != -1)
+        precio_elegido = np.where(es_manual, precio_manual, np.where(es_db, precio_db, 0.0))
+        cotizacion_elegida = np.where(es_manual, cotizacion_manual, np.where(es_db, cotizacion_db, 1.0))
+
+        es_usd = cotizacion_elegida > 1.0
+        precio_base_usd = np.where(es_usd & (precio_elegido > 0.0), precio_elegido, 0.0)
+        costo_ars_registrado = np.where(es_usd, 0.0, precio_elegido)
+        recargo_usd = precio_base_usd * RECARGO_FIJO_USD_PERCENT
+
+        costo_base_ars = np.where(precio_base_usd > 0.0, precio_base_usd * dolar[:, None], costo_ars_registrado) @ cantidad
+        costo_recargo_ars = (recargo_usd * dolar[:, None]) @ cantidad
+        return pd.DataFrame({
+            "costo_mp_total": costo_base_ars + costo_recargo_ars,
+            "costo_mp_base_ars": costo_base_ars,
+            "costo_recargo_mp_ars": costo_recargo_ars,
+            "costo_total_mp_usd": (precio_base_usd + recargo_usd) @ cantidad,
+        }, index=indice)
+
+def serie_costo_receta(conn, linea, receta_id, fechas, cotizacion_dolar, cantidad_litros=BASE_LITROS):
+    """Costo de MP de una receta de `cantidad_litros` en cada una de las `fechas` (ver `serie_costo_mp`)."""
+    return linea.serie_costo_mp(ingredientes_receta(conn, receta_id, cantidad_litros), fechas, cotizacion_dolar)
+
+# =================================================================================================
+# CACHÉ EN DISCO (archivo binario al lado de la base, se abre con mmap)
+# =================================================================================================
+# Formato: MAGICO, largo del encabezado (uint64), encabezado JSON y los arrays crudos alineados a
+# ALINEACION bytes. El encabezado guarda por línea el último id leído, cuántas filas tenía la tabla
+# y la huella de su contenido hasta ese id.
+MAGICO = b"MINLT\x00\x00\x02"
+ALINEACION = 64
+_ARRAYS_LINEA = ("ids", "mp_ids", "dias", "valores")
+
+def ruta_cache_lineas(db_path):
+    """Archivo de la caché de líneas de tiempo de `db_path` (minerva.db -> minerva.db.lineas)."""
+    return os.path.abspath(db_path) + ".lineas"
+
+def escribir_cache_lineas(ruta, lineas, estado):
+    """
+    Escribe `lineas` ({nombre: (ids, mp_ids, dias, valores)}) y `estado` ({nombre: (ultimo_id, filas, huella)})
+    en `ruta` de forma atómica (archivo temporal + os.replace). Devuelve False si no se pudo escribir
+    (directorio de sólo lectura, o Windows con el archivo abierto por otro proceso).
+    """
+    arrays = []
+    encabezado = {"lineas": {}}
+    posicion = 0
+    for nombre, linea in lineas.items():
+        ultimo_id, filas, huella = estado[nombre]
+        encabezado["lineas"][nombre] = {"ultimo_id": int(ultimo_id), "filas": int(filas), "huella": list(huella), "arrays": {}}
+        for campo, array in zip(_ARRAYS_LINEA, linea):
+            array = np.ascontiguousarray(array)
+            encabezado["lineas"][nombre]["arrays"][campo] = [posicion, array.dtype.str, list(array.shape)]
+            arrays.append((posicion, array))
+            posicion += -(-array.nbytes // ALINEACION) * ALINEACION
+    texto = json.dumps(encabezado).encode()
+    inicio_datos = -(-(len(MAGICO) + 8 + len(texto)) // ALINEACION) * ALINEACION
+
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporal, "wb") as archivo:
+            archivo.write(MAGICO + len(texto).to_bytes(8, "little") + texto)
+            for desplazamiento, array in arrays:
+                archivo.seek(inicio_datos + desplazamiento)
+                archivo.write(array.tobytes())
+            archivo.truncate(inicio_datos + posicion)
+        os.replace(temporal, ruta)
+        return True
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+
+def leer_cache_lineas(ruta):
+    """
+    (lineas, estado) desde la caché en `ruta`, con los arrays mapeados en memoria (sólo lectura,
+    sin copiar). (None, None) si el archivo no existe o no tiene el formato esperado.
+    """
+    try:
+        with open(ruta, "rb") as archivo:
+            datos = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None, None
+    try:
+        if datos[:len(MAGICO)] != MAGICO:
+            return None, None
+        largo = int.from_bytes(datos[len(MAGICO):len(MAGICO) + 8], "little")
+        encabezado = json.loads(datos[len(MAGICO) + 8:len(MAGICO) + 8 + largo])
+        inicio_datos = -(-(len(MAGICO) + 8 + largo) // ALINEACION) * ALINEACION
+        lineas, estado = {}, {}
+        for nombre, linea in encabezado["lineas"].items():
+            arrays = []
+            for campo in _ARRAYS_LINEA:
+                desplazamiento, tipo, forma = linea["arrays"][campo]
+                tipo = np.dtype(tipo)
+                cantidad = int(np.prod(forma))
+                arrays.append(np.frombuffer(datos, dtype=tipo, count=cantidad, offset=inicio_datos + desplazamiento).reshape(forma))
+            lineas[nombre] = tuple(arrays)
+            estado[nombre] = (linea["ultimo_id"], linea["filas"], tuple(linea["huella"]))
+        return lineas, estado
+    except (ValueError, KeyError, TypeError):
+        return None, None
+
+def _unir_lineas(linea, nuevas):
+    """Agrega a una línea (ids, mp_ids, dias, valores) las filas nuevas, manteniendo el orden."""
+    unidas = [np.concatenate([vieja, nueva]) for vieja, nueva in zip(linea, nuevas)]
+    orden = np.lexsort((unidas[0], unidas[2], unidas[1]))
+    return tuple(array[orden] for array in unidas)
+
+def _huella(conn, sql_huella, hasta_id):
+    """Huella del contenido de una tabla de línea en las filas con id <= `hasta_id`."""
+    return tuple(conn.execute(sql_huella, (int(hasta_id),)).fetchone())
+
+def actualizar_cache_lineas(conn, ruta):
+    """
+    Líneas de tiempo al día: parte de la caché en `ruta` y lee de la DB sólo las filas con id mayor
+    al último guardado; si hubo filas nuevas reescribe la caché. Si se borraron filas o se editó
+    alguna de las ya guardadas (la huella de las filas hasta el último id no coincide), esa línea se
+    rearma completa. Devuelve {nombre: (ids, mp_ids, dias, valores)}.
+    """
+    lineas, estado = leer_cache_lineas(ruta)
+    lineas, estado = dict(lineas or {}), dict(estado or {})
+    cambios = False
+    for nombre, (tabla, sql, sql_huella) in _TABLAS_LINEA.items():
+        maximo_id, filas = conn.execute(f"SELECT COALESCE(MAX(id), 0), COUNT(*) FROM {tabla}").fetchone()
+        ultimo_id, filas_cache, huella_cache = estado.get(nombre, (None, None, None))
+        nuevas = []
+        # Sin caché, con filas borradas o con filas editadas, la línea se rearma completa
+        reconstruir = (
+            ultimo_id is None or maximo_id < ultimo_id or filas < filas_cache
+            or _huella(conn, sql_huella, ultimo_id) != huella_cache
+        )
+        if not reconstruir:
+            if maximo_id > ultimo_id:
+                nuevas = conn.execute(sql.format(filtro="WHERE id > ?"), (int(ultimo_id),)).fetchall()
+            reconstruir = filas_cache + len(nuevas) != filas
+        if reconstruir:
+            lineas[nombre] = _linea_desde_filas(conn.execute(sql.format(filtro="")).fetchall())
+        elif nuevas:
+            lineas[nombre] = _unir_lineas(lineas[nombre], _linea_desde_filas(nuevas))
+        else:
+            continue
+        estado[nombre] = (maximo_id, filas, _huella(conn, sql_huella, maximo_id))
+        cambios = True
+    if cambios:
+        escribir_cache_lineas(ruta, lineas, estado)
+    return lineas
+
+class CacheLineaTiempoPrecios:
+    """
+    Mantiene una `LineaTiempoPrecios` por base de datos y la rearma sólo cuando cambian los
+    precios (mismo criterio que `CacheSnapshotPrecios`: PRAGMA data_version y firma de tablas).
+    Arranca desde la caché en disco, así un proceso nuevo no vuelve a leer toda la historia.
+    """
+
+    def __init__(self, db_path, ruta_cache=None):
+        self._conn = abrir_conexion(db_path, check_same_thread=False)
+        self._ruta_cache = ruta_cache or ruta_cache_lineas(db_path)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._linea = None
+
+    def obtener(self):
+        """Devuelve la línea de tiempo vigente, recargándola si entraron precios nuevos."""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._linea is not None and data_version == self._data_version:
+                return self._linea
+            if self._linea is None or firma_precios(self._conn) != self._linea.firma:
+                self._linea = LineaTiempoPrecios.cargar(self._conn, self._ruta_cache)
+            self._data_version = data_version
+            return self._linea
+
+# =================================================================================================
+# LÍNEA DE COMANDOS
+# =================================================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Costo de MP de una receta a una fecha o como serie de fechas.")
+    parser.add_argument("--db", default="minerva.db", help="Ruta a la base SQLite (default: minerva.db)")
+    parser.add_argument("--receta", type=int, required=True, help="ID de la receta")
+    parser.add_argument("--litros", type=float, default=BASE_LITROS, help="Litros de la tanda (default: 200)")
+    parser.add_argument("--dolar", type=float, required=True, help="Cotización ARS/USD para convertir los precios en USD")
+    parser.add_argument("--fecha", default=None, help="Fecha puntual (AAAA-MM-DD)")
+    parser.add_argument("--desde", default=None, help="Fecha inicial de la serie diaria (AAAA-MM-DD)")
+    parser.add_argument("--hasta", default=None, help="Fecha final de la serie diaria (AAAA-MM-DD)")
+    parser.add_argument("--salida", default=None, help="Archivo CSV de salida (default: pantalla)")
+    parser.add_argument("--sin-cache", action="store_true", help="Leer toda la historia de la DB sin usar la caché en disco")
+    parser.add_argument("--reconstruir-cache", action="store_true", help="Borrar la caché en disco y volver a armarla")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"No existe la base de datos: {args.db}")
+    if args.fecha:
+        fechas = [args.fecha]
+    elif args.desde and args.hasta:
+        fechas = pd.date_range(args.desde, args.hasta, freq="D")
+    else:
+        parser.error("Indique --fecha o --desde y --hasta.")
+
+    ruta_cache = None if args.sin_cache else ruta_cache_lineas(args.db)
+    if args.reconstruir_cache and os.path.exists(ruta_cache_lineas(args.db)):
+        os.remove(ruta_cache_lineas(args.db))
+
+    conn = abrir_conexion(args.db, solo_lectura=True)
+    try:
+        linea = LineaTiempoPrecios.cargar(conn, ruta_cache)
+        serie_df = serie_costo_receta(conn, linea, args.receta, fechas, args.dolar, args.litros)
+    finally:
+        conn.close()
+    if args.salida:
+        serie_df.to_csv(args.salida)
+        print(f"{len(serie_df)} fechas -> {args.salida}", file=sys.stderr)
+    else:
+        print(serie_df.to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Costeo masivo sin interfaz: todas las recetas × volúmenes × envases.
+
+    python -m costeo.lote --litros 200 1000 --salida lista_precios.csv
+    python -m costeo.lote --litros 200 --envases 3 7 --dolar 1480 --salida lista.parquet
+
+Cada receta se costea en un proceso del pool (la MP se calcula una vez por volumen y
+sólo el empaque cambia por envase). El resultado es una fila por combinación.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from costeo.cambio import TablaCotizaciones
+from costeo.conexion import abrir_conexion
+from costeo.motor import calcular_costo_mp, ids_a_resolver
+from costeo.snapshot import SnapshotPrecios
+from costeo.tanda import BASE_LITROS, calcular_empaque, costo_indirecto_por_litro, factor_escala, ingredientes_receta, totales_tanda
+
+# =================================================================================================
+# CONFIGURACIÓN
+# =================================================================================================
+DB_PATH = "minerva.db"
+
+COLUMNAS_SALIDA = [
+    "receta_id",
+    "receta",
+    "litros",
+    "envase_id",
+    "envase",
+    "capacidad_litros",
+    "unidades_envase",
+    "costo_mp_ars",
+    "costo_recargo_mp_ars",
+    "costo_mp_usd",
+    "costo_flete_ars",
+    "costo_indirecto_ars",
+    "costo_envase_ars",
+    "costo_etiqueta_ars",
+    "costo_caja_ars",
+    "costo_empaque_ars",
+    "costo_total_ars",
+    "costo_por_litro_ars",
+    "costo_por_litro_usd",
+]
+
+# =================================================================================================
+# PRESUPUESTO EN LOTE: muchos ítems (receta, litros, envase, tandas) en una sola pasada
+# =================================================================================================
+
+# Ingredientes de varias recetas en una sola consulta (la lista de ids viaja como JSON)
+SQL_INGREDIENTES_RECETAS = """
+    SELECT
+        ri.receta_id,
+        mp.id AS materia_prima_id,
+        mp.nombre AS "Materia Prima",
+        mp.unidad AS "Unidad",
+        ri.cantidad AS "Cantidad Base (200L)"
+    FROM receta_ingredientes ri
+    JOIN materias_primas mp ON ri.materia_prima_id = mp.id
+    WHERE ri.receta_id IN (SELECT value FROM json_each(?))
+    ORDER BY ri.receta_id, mp.nombre
+"""
+
+COLUMNAS_ITEMS = [
+    "costo_mp_total",
+    "costo_mp_base_ars",
+    "costo_recargo_mp_ars",
+    "costo_total_mp_usd",
+    "capacidad_litros",
+    "precio_envase_usd",
+    "unidades_necesarias",
+    "costo_envase_total_ars",
+    "costo_etiqueta_total_ars",
+    "costo_caja_total_ars",
+    "costo_total_empaque_ars",
+    "costo_flete_total_ars",
+    "gasto_indirecto_tanda",
+    "costo_total_final",
+    "costo_total_final_usd",
+    "costo_por_litro_ars",
+    "costo_por_litro_usd",
+]
+
+def ingredientes_recetas(conn, receta_ids):
+    """Ingredientes de todas las `receta_ids` (formato de `ingredientes_receta` + 'receta_id') con una consulta."""
+    ids = json.dumps(sorted({int(receta_id) for receta_id in receta_ids}))
+    return pd.read_sql_query(SQL_INGREDIENTES_RECETAS, conn, params=(ids,))
+
+def costear_items(items_df, ingredientes_df, precios_df, snapshot, dolar, flete=0.0, costo_indirecto_litro=0.0,
+                  etiqueta=0.0, caja=0.0, base_litros=BASE_LITROS):
+    """
+    Costo de una tanda de cada ítem con una sola llamada al motor, con las reglas de `totales_tanda`
+    y `calcular_empaque`.
+
+    `items_df` trae 'receta_id', 'litros' (por tanda) y 'envase_id' (NaN = a granel); `ingredientes_df`
+    sale de `ingredientes_recetas`, `precios_df` es la tabla de precios de sus MP y `snapshot` da los
+    precios (USD) y capacidades de los envases. Devuelve un DataFrame alineado con `items_df` con COLUMNAS_ITEMS.
+    """
+    items_df = items_df.reset_index(drop=True)
+    litros = items_df["litros"].to_numpy(dtype=float)
+    n = len(items_df)
+
+    # 1. MP: una fila por (ítem, ingrediente) escalada a los litros del ítem, costeada en una sola pasada
+    filas = items_df[["receta_id"]].assign(item=np.arange(n), factor=litros / base_litros)
+    filas = filas.merge(ingredientes_df, on="receta_id", how="inner")
+    filas["cantidad_simulada"] = filas["Cantidad Base (200L)"] * filas["factor"]
+    _, detalle_df, _, _, _ = calcular_costo_mp(filas, precios_df, dolar)
+    item = filas["item"].to_numpy()
+    cantidad = detalle_df["Cantidad (Simulada)"].to_numpy(dtype=float)
+    costo_mp_total = np.bincount(item, detalle_df["Costo Total ARS"].to_numpy(dtype=float), minlength=n)
+    costo_mp_base_ars = np.bincount(item, cantidad * detalle_df["Costo Unit. ARS (Base)"].to_numpy(dtype=float), minlength=n)
+    costo_recargo_mp_ars = np.bincount(item, cantidad * detalle_df["Recargo 3% ARS (Unit.)"].to_numpy(dtype=float), minlength=n)
+    costo_total_mp_usd = np.bincount(item, detalle_df["Costo Total USD"].to_numpy(dtype=float), minlength=n)
+
+    # 2. Empaque: envases redondeados hacia arriba (sin envase o sin capacidad = a granel)
+    precio_envase_usd, capacidad_litros = snapshot.precios_envases(items_df["envase_id"])
+    con_envase = (capacidad_litros > 0) & (litros > 0)
+    unidades = np.where(con_envase, np.ceil(np.divide(litros, capacidad_litros, out=np.zeros(n), where=con_envase)), 0.0)
+    costo_envase = unidades * precio_envase_usd * dolar
+    costo_etiqueta = unidades * etiqueta
+    costo_caja = unidades * caja
+    costo_empaque = costo_envase + costo_etiqueta + costo_caja
+
+    # 3. Flete escalado, overhead por litro y totales
+    costo_flete_total = np.where(litros > 0, flete * litros / base_litros, 0.0)
+    gasto_indirecto = costo_indirecto_litro * litros
+    costo_total = costo_mp_total + costo_flete_total + gasto_indirecto + costo_empaque
+    costo_por_litro = np.divide(costo_total, litros, out=np.zeros(n), where=litros > 0)
+
+    return pd.DataFrame({
+        "costo_mp_total": costo_mp_total,
+        "costo_mp_base_ars": costo_mp_base_ars,
+        "costo_recargo_mp_ars": costo_recargo_mp_ars,
+        "costo_total_mp_usd": costo_total_mp_usd,
+        "capacidad_litros": capacidad_litros,
+        "precio_envase_usd": precio_envase_usd,
+        "unidades_necesarias": unidades.astype(int),
+        "costo_envase_total_ars": costo_envase,
+        "costo_etiqueta_total_ars": costo_etiqueta,
+        "costo_caja_total_ars": costo_caja,
+        "costo_total_empaque_ars": costo_empaque,
+        "costo_flete_total_ars": costo_flete_total,
+        "gasto_indirecto_tanda": gasto_indirecto,
+        "costo_total_final": costo_total,
+        "costo_total_final_usd": costo_total_mp_usd + (costo_flete_total + gasto_indirecto + costo_empaque) / dolar,
+        "costo_por_litro_ars": costo_por_litro,
+        "costo_por_litro_usd": costo_por_litro / dolar if dolar > 0 else 0.0,
+    }, columns=COLUMNAS_ITEMS)
+
+# =================================================================================================
+# WORKERS (una conexión y una foto de precios por proceso)
+# =================================================================================================
+_conn = None
+_snapshot = None
+
+def _iniciar_worker(db_path):
+    """Abre la DB y carga los precios una sola vez por proceso del pool."""
+    global _conn, _snapshot
+    _conn = abrir_conexion(db_path, solo_lectura=True)
+    _snapshot = SnapshotPrecios.cargar(_conn)
+
+def costear_receta(receta, lista_litros, envases, parametros):
+    """
+    Filas de salida de una receta para todos los volúmenes y envases pedidos.
+    `envases` es una lista de dicts (id, descripcion); id None = a granel (sin envase).
+    """
+    filas = []
+    ingredientes_base = ingredientes_receta(_conn, receta["id"])
+    precios_df = _snapshot.precios_mp(ids_a_resolver(ingredientes_base), combinados=True)
+    dolar = parametros["dolar"]
+
+    for litros in lista_litros:
+        ingredientes_df = ingredientes_base.assign(cantidad_simulada=ingredientes_base["Cantidad Base (200L)"] * factor_escala(litros))
+        costo_mp_total, _, costo_mp_base_ars, costo_recargo_mp_ars, costo_total_mp_usd = calcular_costo_mp(ingredientes_df, precios_df, dolar)
+
+        for envase in envases:
+            precio_envase_usd, capacidad_litros = _snapshot.precio_envase(envase["id"])
+            empaque = calcular_empaque(
+                litros, capacidad_litros, precio_envase_usd * dolar,
+                parametros["etiqueta"], parametros["caja"]
+            )
+            totales = totales_tanda(
+                costo_mp_total, costo_total_mp_usd, litros, dolar,
+                parametros["flete"], parametros["costo_indirecto_litro"], empaque["costo_total_empaque_ars"]
+            )
+            filas.append((
+                receta["id"], receta["nombre"], litros, envase["id"], envase["descripcion"], capacidad_litros,
+                empaque["unidades_necesarias"], costo_mp_base_ars, costo_recargo_mp_ars, costo_total_mp_usd,
+                totales["costo_flete_total_ars"], totales["gasto_indirecto_tanda"],
+                empaque["costo_envase_total_ars"], empaque["costo_etiqueta_total_ars"], empaque["costo_caja_total_ars"],
+                empaque["costo_total_empaque_ars"], totales["costo_total_final"],
+                totales["costo_por_litro_ars"], totales["costo_por_litro_usd"],
+            ))
+    return filas
+
+# =================================================================================================
+# ORQUESTACIÓN
+# =================================================================================================
+
+def _ultima_cotizacion(conn):
+    """Última cotización de venta registrada (cotizacion_dolar / historial_cambios_dolar; None si no hay)."""
+    return TablaCotizaciones.cargar(conn).ultima("venta")
+
+def costear_lote(db_path, lista_litros, envase_ids=None, incluir_granel=True, recetas_ids=None, dolar=None,
+                 flete=5000.0, costo_indirecto_litro=0.0, etiqueta=0.0, caja=0.0, procesos=None):
+    """
+    Costea recetas × volúmenes × envases en un pool de procesos y devuelve un DataFrame
+    con las columnas de COLUMNAS_SALIDA. `envase_ids=None` usa todos los envases.
+    """
+    conn = abrir_conexion(db_path)
+    try:
+        recetas = pd.read_sql_query("SELECT id, nombre FROM recetas ORDER BY nombre", conn)
+        envases_df = pd.read_sql_query("SELECT id, descripcion FROM envases ORDER BY descripcion", conn)
+        if dolar is None:
+            dolar = _ultima_cotizacion(conn)
+    finally:
+        conn.close()
+    if not dolar:
+        raise ValueError("No hay cotización del dólar registrada; indique --dolar.")
+
+    if recetas_ids is not None:
+        recetas = recetas[recetas["id"].isin(recetas_ids)]
+    if envase_ids is not None:
+        envases_df = envases_df[envases_df["id"].isin(envase_ids)]
+    envases = ([{"id": None, "descripcion": "A Granel"}] if incluir_granel else []) + envases_df.to_dict("records")
+
+    parametros = {
+        "dolar": float(dolar),
+        "flete": flete,
+        "costo_indirecto_litro": costo_indirecto_litro,
+        "etiqueta": etiqueta,
+        "caja": caja,
+    }
+    lista_litros = [float(litros) for litros in lista_litros]
+    recetas = recetas.to_dict("records")
+
+    filas = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker, initargs=(db_path,)) as pool:
+        futuros = [pool.submit(costear_receta, receta, lista_litros, envases, parametros) for receta in recetas]
+        for futuro in futuros:
+            filas.extend(futuro.result())
+
+    return pd.DataFrame(filas, columns=COLUMNAS_SALIDA)
+
+def guardar_resultado(resultado_df, salida):
+    """Escribe CSV o Parquet según la extensión del archivo."""
+    if salida.lower().endswith(".parquet"):
+        try:
+            resultado_df.to_parquet(salida, index=False)
+        except ImportError:
+            raise SystemExit("Para escribir Parquet instale pyarrow (pip install pyarrow) o use una salida .csv")
+    else:
+        resultado_df.to_csv(salida, index=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Costeo masivo de recetas × volúmenes × envases.")
+    parser.add_argument("--db", default=DB_PATH, help="Ruta a la base SQLite (default: minerva.db)")
+    parser.add_argument("--litros", type=float, nargs="+", default=[200.0], help="Volúmenes de tanda a costear")
+    parser.add_argument("--envases", type=int, nargs="*", default=None, help="IDs de envase (default: todos)")
+    parser.add_argument("--sin-granel", action="store_true", help="No incluir la fila a granel (sin envase)")
+    parser.add_argument("--recetas", type=int, nargs="*", default=None, help="IDs de receta (default: todas)")
+    parser.add_argument("--dolar", type=float, default=None, help="Cotización ARS/USD (default: última cotización de venta registrada)")
+    parser.add_argument("--flete", type=float, default=5000.0, help="Flete base por tanda de 200L (ARS)")
+    parser.add_argument("--overhead-litro", type=float, default=None, help="Costo indirecto por litro (ARS/L)")
+    parser.add_argument("--gasto-fijo-mensual", type=float, default=0.0, help="Gasto fijo mensual para calcular el overhead por litro")
+    parser.add_argument("--volumen-mensual", type=float, default=32000.0, help="Volumen mensual (L) para calcular el overhead por litro")
+    parser.add_argument("--etiqueta", type=float, default=0.0, help="Costo de etiqueta por envase (ARS)")
+    parser.add_argument("--caja", type=float, default=0.0, help="Costo de caja por envase (ARS)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (default: CPUs)")
+    parser.add_argument("--salida", default="lista_precios.csv", help="Archivo de salida .csv o .parquet")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"No existe la base de datos: {args.db}")
+
+    costo_indirecto_litro = costo_indirecto_por_litro(args.gasto_fijo_mensual, args.volumen_mensual, args.overhead_litro or 0.0)
+
+    inicio = time.perf_counter()
+    try:
+        resultado_df = costear_lote(
+            args.db, args.litros, args.envases, not args.sin_granel, args.recetas, args.dolar,
+            args.flete, costo_indirecto_litro, args.etiqueta, args.caja, args.procesos
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    guardar_resultado(resultado_df, args.salida)
+    print(f"{len(resultado_df)} combinaciones costeadas en {time.perf_counter() - inicio:.2f}s -> {args.salida}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Migraciones versionadas de minerva.db (la versión aplicada se guarda en PRAGMA user_version).
+
+    python -m costeo.migraciones                # aplica las pendientes y corre ANALYZE
+    python -m costeo.migraciones --verificar    # además muestra el plan de las consultas calientes
+"""
+import argparse
+import re
+import sys
+
+from costeo.conexion import abrir_conexion
+
+# =================================================================================================
+# MIGRACIONES (versión, descripción, sentencias). Nunca modificar una ya publicada: agregar otra.
+# =================================================================================================
+MIGRACIONES = [
+    (1, "Índices de cobertura para las consultas de precios, recetas y composiciones", [
+        # Última compra / último precio por MP (ORDER BY fecha DESC, id DESC sin ordenar en memoria)
+        """CREATE INDEX IF NOT EXISTS idx_compras_mp_fecha
+           ON compras_materia_prima (materia_prima_id, fecha DESC, id DESC, precio_unitario, cotizacion_usd, moneda)""",
+        """CREATE INDEX IF NOT EXISTS idx_precios_mp_fecha
+           ON precios_materias_primas (materia_prima_id, fecha DESC, id DESC, precio_unitario, costo_flete, otros_costos, cotizacion_usd)""",
+        """CREATE INDEX IF NOT EXISTS idx_entradas_envases_fecha
+           ON entradas_envases (envase_id, fecha_ingreso DESC, id DESC, precio_unitario)""",
+        """CREATE INDEX IF NOT EXISTS idx_receta_ingredientes_receta
+           ON receta_ingredientes (receta_id, materia_prima_id, cantidad)""",
+        """CREATE INDEX IF NOT EXISTS idx_composicion_combinado
+           ON composicion_colorantes (colorante_combinado_id, colorante_primario_id, proporcion)""",
+        """CREATE INDEX IF NOT EXISTS idx_gastos_fecha
+           ON gastos (fecha_factura, categoria_id, importe_total)""",
+    ]),
+    (2, "Resumen gastos_mensuales (mes × categoría) mantenido por triggers", [
+        """CREATE TABLE IF NOT EXISTS gastos_mensuales (
+               anio_mes TEXT NOT NULL,
+               categoria_id INTEGER NOT NULL,
+               total REAL NOT NULL DEFAULT 0,
+               cantidad INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (anio_mes, categoria_id)
+           )""",
+        "DELETE FROM gastos_mensuales",
+        """INSERT INTO gastos_mensuales (anio_mes, categoria_id, total, cantidad)
+           SELECT substr(fecha_factura, 1, 7), categoria_id, SUM(importe_total), COUNT(*)
+           FROM gastos
+           GROUP BY substr(fecha_factura, 1, 7), categoria_id""",
+        """CREATE TRIGGER IF NOT EXISTS trg_gastos_mensuales_insert AFTER INSERT ON gastos
+           BEGIN
+               INSERT INTO gastos_mensuales (anio_mes, categoria_id, total, cantidad)
+               VALUES (substr(NEW.fecha_factura, 1, 7), NEW.categoria_id, NEW.importe_total, 1)
+               ON CONFLICT (anio_mes, categoria_id)
+               DO UPDATE SET total = total + excluded.total, cantidad = cantidad + 1;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_gastos_mensuales_delete AFTER DELETE ON gastos
+           BEGIN
+               UPDATE gastos_mensuales
+               SET total = total - OLD.importe_total, cantidad = cantidad - 1
+               WHERE anio_mes = substr(OLD.fecha_factura, 1, 7) AND categoria_id = OLD.categoria_id;
+               DELETE FROM gastos_mensuales WHERE cantidad <= 0;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_gastos_mensuales_update
+           AFTER UPDATE OF fecha_factura, categoria_id, importe_total ON gastos
+           BEGIN
+               UPDATE gastos_mensuales
+               SET total = total - OLD.importe_total, cantidad = cantidad - 1
+               WHERE anio_mes = substr(OLD.fecha_factura, 1, 7) AND categoria_id = OLD.categoria_id;
+               INSERT INTO gastos_mensuales (anio_mes, categoria_id, total, cantidad)
+               VALUES (substr(NEW.fecha_factura, 1, 7), NEW.categoria_id, NEW.importe_total, 1)
+               ON CONFLICT (anio_mes, categoria_id)
+               DO UPDATE SET total = total + excluded.total, cantidad = cantidad + 1;
+               DELETE FROM gastos_mensuales WHERE cantidad <= 0;
+           END""",
+    ]),
+    (3, "Renglones de presupuestos en presupuesto_items (carga inicial desde detalle_simulaciones_json)", [
+        # La crean los simuladores; acá también, para que la carga inicial funcione en una base nueva
+        """CREATE TABLE IF NOT EXISTS presupuestos (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               cliente_id INTEGER NOT NULL,
+               fecha TEXT NOT NULL,
+               porcentaje_ganancia REAL NOT NULL,
+               volumen_total_litros REAL NOT NULL,
+               costo_total_ars REAL NOT NULL,
+               precio_final_ars REAL NOT NULL,
+               detalle_simulaciones_json TEXT,
+               FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+           )""",
+        """CREATE TABLE IF NOT EXISTS presupuesto_items (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               presupuesto_id INTEGER NOT NULL,
+               renglon INTEGER NOT NULL,
+               receta TEXT NOT NULL,
+               receta_id INTEGER,
+               litros REAL NOT NULL,
+               envase TEXT,
+               capacidad_litros REAL,
+               unidades INTEGER,
+               costo_total_ars REAL,
+               precio_venta_ars REAL,
+               precio_venta_usd REAL,
+               margen REAL,
+               UNIQUE (presupuesto_id, renglon),
+               FOREIGN KEY (presupuesto_id) REFERENCES presupuestos(id)
+           )""",
+        """CREATE INDEX IF NOT EXISTS idx_presupuesto_items_receta
+           ON presupuesto_items (receta_id, presupuesto_id)""",
+        """CREATE INDEX IF NOT EXISTS idx_presupuestos_fecha
+           ON presupuestos (fecha, cliente_id)""",
+        """CREATE TRIGGER IF NOT EXISTS trg_presupuesto_items_delete AFTER DELETE ON presupuestos
+           BEGIN
+               DELETE FROM presupuesto_items WHERE presupuesto_id = OLD.id;
+           END""",
+        # Carga inicial de los renglones desde el detalle JSON. Copia congelada de la consulta de
+        # costeo.presupuestos tal como se publicó: si aquélla cambia, esta migración no debe cambiar.
+        """WITH renglones AS (
+               SELECT
+                   p.id AS presupuesto_id,
+                   j.key + 1 AS renglon,
+                   j.value AS r,
+                   CASE WHEN json_valid(json_extract(j.value, '$.envase_info_json'))
+                        THEN json_extract(j.value, '$.envase_info_json') END AS e
+               FROM presupuestos p,
+                    json_each(CASE WHEN json_valid(p.detalle_simulaciones_json) THEN p.detalle_simulaciones_json ELSE '[]' END) j
+           ),
+           campos AS (
+               SELECT
+                   presupuesto_id,
+                   renglon,
+                   COALESCE(json_extract(r, '$.Receta'), json_extract(r, '$.nombre_receta'), '') AS receta,
+                   COALESCE(json_extract(r, '$.Litros'), json_extract(r, '$.litros'), 0.0) AS litros,
+                   COALESCE(json_extract(r, '$.Envase_Nombre'), json_extract(e, '$.Envase_Nombre')) AS envase,
+                   COALESCE(json_extract(r, '$.Capacidad_Litros'), json_extract(e, '$.Capacidad_Litros')) AS capacidad_litros,
+                   COALESCE(json_extract(r, '$.Unidades_Envase_Total'), json_extract(e, '$.Unidades_Envase_Total')) AS unidades,
+                   COALESCE(json_extract(r, '$."Costo Total ARS"'), json_extract(r, '$.costo_total_ars')) AS costo_total_ars,
+                   COALESCE(json_extract(r, '$.Precio_Venta_Total_ARS'), json_extract(r, '$.precio_venta_total_ars')) AS precio_venta_ars,
+                   COALESCE(json_extract(r, '$.Precio_Venta_Total_USD'), json_extract(r, '$.precio_venta_total_usd')) AS precio_venta_usd,
+                   COALESCE(json_extract(r, '$.Margen_Ganancia'), json_extract(r, '$.margen_ganancia')) AS margen
+               FROM renglones
+           )
+           INSERT INTO presupuesto_items (
+               presupuesto_id, renglon, receta, receta_id, litros, envase, capacidad_litros, unidades,
+               costo_total_ars, precio_venta_ars, precio_venta_usd, margen
+           )
+           SELECT
+               presupuesto_id,
+               renglon,
+               receta,
+               (SELECT MIN(id) FROM recetas WHERE nombre = campos.receta),
+               litros,
+               envase,
+               capacidad_litros,
+               unidades,
+               costo_total_ars,
+               precio_venta_ars,
+               precio_venta_usd,
+               COALESCE(margen, CASE WHEN costo_total_ars > 0 THEN (precio_venta_ars - costo_total_ars) / costo_total_ars * 100.0 END)
+           FROM campos
+           WHERE true
+           ON CONFLICT (presupuesto_id, renglon) DO NOTHING""",
+    ]),
+    (4, "Historial de presupuestos: índices para paginar por (fecha, id) y filtrar por cliente", [
+        # Cubre el listado (sin el detalle JSON): reemplaza a idx_presupuestos_fecha
+        """CREATE INDEX IF NOT EXISTS idx_presupuestos_historial
+           ON presupuestos (fecha, id, cliente_id, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars)""",
+        "DROP INDEX IF EXISTS idx_presupuestos_fecha",
+        """CREATE INDEX IF NOT EXISTS idx_presupuestos_cliente
+           ON presupuestos (cliente_id, fecha, id)""",
+    ]),
+]
+
+def version_actual(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def aplicar_migraciones(conn):
+    """
+    Aplica las migraciones pendientes (cada una en su transacción) y, si hubo alguna,
+    actualiza las estadísticas con ANALYZE. Devuelve la lista de versiones aplicadas.
+    """
+    version = version_actual(conn)
+    aplicadas = []
+    for numero, _, sentencias in MIGRACIONES:
+        if numero <= version:
+            continue
+        with conn:
+            for sentencia in sentencias:
+                conn.execute(sentencia)
+            conn.execute(f"PRAGMA user_version = {int(numero)}")
+        aplicadas.append(numero)
+    if aplicadas:
+        conn.execute("ANALYZE")
+        conn.commit()
+    return aplicadas
+
+# =================================================================================================
+# VERIFICACIÓN DE PLANES (EXPLAIN QUERY PLAN)
+# =================================================================================================
+
+def consultas_calientes():
+    """
+    (consultas_puntuales, cargas_completas): {nombre: (sql, params)} de las consultas que revisa
+    `verificar_planes`. Las consultas se importan acá y no al cargar el módulo: las páginas sólo
+    llaman a `aplicar_migraciones` y no deben cargar los módulos de lote y recosteo por eso.
+    """
+    from costeo.gastos import SQL_DETALLE_GASTOS_MES, SQL_TOTAL_GASTOS_MES
+    from costeo.lote import SQL_INGREDIENTES_RECETAS
+    from costeo.precios import _SQL_PRECIOS_ACTUALES
+    from costeo.presupuestos import SQL_ITEMS_DE_PRESUPUESTO, SQL_ITEMS_PRESUPUESTO, SQL_RESUMEN_RECETAS, sql_historial
+    from costeo.recosteo import SQL_RENGLONES_RANGO
+    from costeo.snapshot import _SQL_ENVASES
+
+    # Consultas puntuales que se ejecutan en cada simulación: no deben recorrer tablas completas.
+    consultas_puntuales = {
+        "precios_actuales (ids)": (_SQL_PRECIOS_ACTUALES.format(filtro="WHERE materia_prima_id IN (?, ?)"), (1, 2, 1, 2)),
+        "ultima_compra_mp": ("""
+            SELECT precio_unitario, cotizacion_usd, moneda
+            FROM compras_materia_prima
+            WHERE materia_prima_id = ?
+            ORDER BY fecha DESC, id DESC
+            LIMIT 1
+        """, (1,)),
+        "ultimo_precio_mp": ("""
+            SELECT precio_unitario, costo_flete, otros_costos, cotizacion_usd
+            FROM precios_materias_primas
+            WHERE materia_prima_id = ?
+            ORDER BY fecha DESC
+            LIMIT 1
+        """, (1,)),
+        "ultimo_ingreso_envase": ("""
+            SELECT precio_unitario
+            FROM entradas_envases
+            WHERE envase_id = ?
+            ORDER BY fecha_ingreso DESC, id DESC
+            LIMIT 1
+        """, (1,)),
+        "ingredientes_receta": ("""
+            SELECT ri.id, mp.id, mp.nombre, mp.unidad, ri.cantidad
+            FROM receta_ingredientes ri
+            JOIN materias_primas mp ON ri.materia_prima_id = mp.id
+            WHERE ri.receta_id = ?
+            ORDER BY mp.nombre
+        """, (1,)),
+        "ingredientes_recetas (lote)": (SQL_INGREDIENTES_RECETAS, ("[1, 2]",)),
+        "items_presupuesto": (SQL_ITEMS_PRESUPUESTO, (1,)),
+        "resumen_recetas": (SQL_RESUMEN_RECETAS, ("2025-01-01", "2025-12-31")),
+        "historial (página siguiente)": sql_historial("2025-01-01", "2025-12-31", margen_min=10.0, despues_de=("2025-06-30", 1000)),
+        "historial (clientes)": sql_historial("2025-01-01", "2025-12-31", cliente_ids=[1, 2]),
+        "items_de_presupuesto": (SQL_ITEMS_DE_PRESUPUESTO, (1,)),
+        "renglones_rango (recosteo)": (SQL_RENGLONES_RANGO, ("2025-01-01", "2025-12-31")),
+        "detalle_gastos_mes": (SQL_DETALLE_GASTOS_MES, ("2025-09-01", "2025-10-01")),
+        "total_gastos_mes": (SQL_TOTAL_GASTOS_MES, ("2025-09",)),
+        "es_combinada": ("""
+            SELECT 1
+            FROM composicion_colorantes
+            WHERE colorante_combinado_id = ?
+            LIMIT 1
+        """, (1,)),
+    }
+
+    # Cargas completas de la foto de precios (una vez por cambio de precios): leen todas las filas
+    # a propósito, pero deben hacerlo por el índice ordenado, sin ordenar en memoria.
+    cargas_completas = {
+        "precios_actuales (todas)": (_SQL_PRECIOS_ACTUALES.format(filtro=""), ()),
+        "envases": (_SQL_ENVASES, ()),
+    }
+    return consultas_puntuales, cargas_completas
+
+_TABLAS_CTE = {"ultima_compra", "ultimo_precio", "ultimo_ingreso"}
+
+def plan_consulta(conn, sql, params=()):
+    """Líneas de EXPLAIN QUERY PLAN de una consulta."""
+    return [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def _scan_completo(linea):
+    """True si la línea del plan recorre una tabla real sin usar índice."""
+    coincidencia = re.match(r"SCAN (\w+)(?: AS \w+)?$", linea.strip())
+    return bool(coincidencia) and coincidencia.group(1) not in _TABLAS_CTE and not coincidencia.group(1).startswith("subquery")
+
+def _scans_internos(conn, sql, params=()):
+    """
+    Líneas SCAN del lado interno de un join: en el plan tienen un hermano anterior (mismo padre)
+    que ya recorre o busca otra tabla, así que se repiten por cada fila de ese hermano. Incluye los
+    CTE materializados (que `_scan_completo` deja pasar) recorridos una vez por fila externa.
+    Las tablas virtuales (json_each) no cuentan: recorren el JSON de la fila externa, no una tabla.
+    """
+    internos = []
+    anteriores = {}
+    for _, padre, _, linea in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+        linea = linea.strip()
+        es_bucle = linea.startswith(("SCAN ", "SEARCH ")) and not linea.startswith("SCAN CONSTANT ROW")
+        if es_bucle and linea.startswith("SCAN ") and "VIRTUAL TABLE" not in linea and anteriores.get(padre):
+            internos.append(linea)
+        anteriores[padre] = anteriores.get(padre, False) or es_bucle
+    return internos
+
+def verificar_planes(conn):
+    """
+    Revisa el plan de las consultas calientes. Devuelve {nombre: [problemas]} sólo con las que fallan:
+    las puntuales no pueden tener SCAN de tablas, las cargas completas no pueden usar TEMP B-TREE y
+    ninguna puede recorrer una tabla o un CTE en el lado interno de un join.
+    """
+    consultas_puntuales, cargas_completas = consultas_calientes()
+    problemas = {}
+    for nombre, (sql, params) in consultas_puntuales.items():
+        malas = [linea for linea in plan_consulta(conn, sql, params) if _scan_completo(linea)]
+        malas += [linea for linea in _scans_internos(conn, sql, params) if linea not in malas]
+        if malas:
+            problemas[nombre] = malas
+    for nombre, (sql, params) in cargas_completas.items():
+        malas = [linea for linea in plan_consulta(conn, sql, params) if "TEMP B-TREE" in linea]
+        malas += _scans_internos(conn, sql, params)
+        if malas:
+            problemas[nombre] = malas
+    return problemas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migraciones versionadas de minerva.db.")
+    parser.add_argument("--db", default="minerva.db", help="Ruta a la base SQLite (default: minerva.db)")
+    parser.add_argument("--verificar", action="store_true", help="Mostrar EXPLAIN QUERY PLAN de las consultas calientes")
+    args = parser.parse_args(argv)
+
+    conn = abrir_conexion(args.db)
+    try:
+        aplicadas = aplicar_migraciones(conn)
+        print(f"Versión de esquema: {version_actual(conn)} (aplicadas ahora: {aplicadas or 'ninguna'})")
+        if args.verificar:
+            consultas_puntuales, cargas_completas = consultas_calientes()
+            for nombre, (sql, params) in {**consultas_puntuales, **cargas_completas}.items():
+                print(f"\n[{nombre}]")
+                for linea in plan_consulta(conn, sql, params):
+                    print(f"  {linea}")
+            problemas = verificar_planes(conn)
+            if problemas:
+                print(f"\nConsultas con SCAN completo u orden en memoria: {problemas}")
+                sys.exit(1)
+            print("\nOK: ninguna consulta caliente recorre tablas completas.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+# =================================================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =================================================================================================
+RECARGO_FIJO_USD_PERCENT = 0.03 # 3%
+
+# Columnas de la tabla de precios resuelta (una fila por materia_prima_id)
+COLUMNAS_PRECIO = ["precio_unitario", "costo_flete", "otros_costos", "cotizacion_usd"]
+
+# Columnas del detalle de costo, en el mismo orden que muestran los simuladores
+COLUMNAS_DETALLE = [
+    "Materia Prima",
+    "Unidad",
+    "Cantidad (Simulada)",
+    "Moneda Origen",
+    "Costo Unit. ARS (Base)",
+    "Recargo 3% ARS (Unit.)",
+    "Costo Unit. ARS (Total)",
+    "Costo Total ARS",
+    "Costo Unit. USD (Base)",
+    "Recargo 3% USD (Unit.)",
+    "Costo Unit. USD (Total)",
+    "Costo Total USD",
+]
+
+# =================================================================================================
+# TABLA DE PRECIOS
+# =================================================================================================
+
+def tabla_precios(precios_por_id):
+    """
+    Convierte {materia_prima_id: (precio_unitario, costo_flete, otros_costos, cotizacion_usd)}
+    en la tabla de precios que consume el motor (indexada por materia_prima_id).
+    """
+    tabla = pd.DataFrame.from_dict(precios_por_id, orient="index", columns=COLUMNAS_PRECIO)
+    tabla.index.name = "materia_prima_id"
+    return tabla.astype(float)
+
+def ids_a_resolver(ingredientes_df):
+    """Devuelve los materia_prima_id (sin repetir) que necesitan precio de la DB."""
+    if ingredientes_df.empty:
+        return []
+    precio_manual = _columna(ingredientes_df, "precio_unitario_manual", 0.0)
+    mp_ids = ingredientes_df["materia_prima_id"]
+    requiere_db = (precio_manual <= 0.0) & (mp_ids != -1)
+    return [int(mp_id) for mp_id in pd.unique(mp_ids[requiere_db])]
+
+def precio_unitario_usd_base(ingredientes_df, precios_df, incluir_manual=False):
+    """
+    Precio unitario base en USD por ingrediente (columna 'Precio Unitario (USD) BASE' del editor).
+    Toma el precio de la DB si la MP no tiene precio manual y está cotizada en USD; con
+    `incluir_manual=True` también muestra el precio manual cargado en USD.
+    """
+    if ingredientes_df.empty:
+        return pd.Series(0.0, index=ingredientes_df.index, dtype=float)
+
+    precio_manual = _columna(ingredientes_df, "precio_unitario_manual", 0.0)
+    cotizacion_manual = _columna(ingredientes_df, "cotizacion_usd_manual", 1.0)
+    mp_ids = ingredientes_df["materia_prima_id"]
+
+    precios = precios_df.reindex(mp_ids.to_numpy())
+    precio_db = precios["precio_unitario"].fillna(0.0).to_numpy(dtype=float)
+    cotizacion_db = precios["cotizacion_usd"].fillna(1.0).to_numpy(dtype=float)
+
+    usa_db = ((mp_ids != -1) & (precio_manual == 0.0)).to_numpy() & (cotizacion_db > 1.0)
+    precio_usd = np.where(usa_db, precio_db, 0.0)
+    if incluir_manual:
+        usa_manual = ((precio_manual > 0.0) & (cotizacion_manual > 1.0)).to_numpy()
+        precio_usd = np.where(usa_manual, precio_manual.to_numpy(), precio_usd)
+    return pd.Series(precio_usd, index=ingredientes_df.index, dtype=float)
+
+def _columna(df, nombre, defecto):
+    """Columna numérica del DataFrame, o una serie constante si no existe."""
+    if nombre in df.columns:
+        return df[nombre].fillna(defecto).astype(float)
+    return pd.Series(defecto, index=df.index, dtype=float)
+
+# =================================================================================================
+# MOTOR DE COSTEO DE MATERIA PRIMA (VECTORIZADO)
+# =================================================================================================
+
+def calcular_costo_mp(ingredientes_df, precios_df, cotizacion_dolar_actual):
+    """
+    Calcula el costo de Materia Prima en ARS y USD con operaciones por columna.
+
+    `ingredientes_df` debe traer 'materia_prima_id', 'Materia Prima', 'Unidad' y 'cantidad_simulada'
+    (opcionalmente 'precio_unitario_manual' y 'cotizacion_usd_manual').
+    `precios_df` es la tabla de precios resuelta (ver `tabla_precios`).
+
+    Devuelve la misma tupla que `calcular_costo_total` de los simuladores:
+    (costo_mp_total, detalle_df, costo_total_mp_ars, costo_total_recargo_mp_ars, costo_total_mp_usd)
+    """
+    if ingredientes_df.empty:
+        return 0.0, pd.DataFrame(columns=COLUMNAS_DETALLE), 0.0, 0.0, 0.0
+
+    mp_ids = ingredientes_df["materia_prima_id"].to_numpy()
+    cantidad = ingredientes_df["cantidad_simulada"].to_numpy(dtype=float)
+    precio_manual = _columna(ingredientes_df, "precio_unitario_manual", 0.0).to_numpy()
+    cotizacion_manual = _columna(ingredientes_df, "cotizacion_usd_manual", 1.0).to_numpy()
+
+    # 1. Precio y cotización registrados en la DB (0.0 / 1.0 si la MP no tiene precio)
+    precios = precios_df.reindex(mp_ids)
+    precio_db = precios["precio_unitario"].fillna(0.0).to_numpy(dtype=float)
+    cotizacion_db = precios["cotizacion_usd"].fillna(1.0).to_numpy(dtype=float)
+
+    # 2. Prioridad: precio manual > precio de la DB > sin precio (MP temporal)
+    es_manual = precio_manual > 0.0
+    es_db = ~es_manual & (mp_ids != -1)
+
+    precio_elegido = np.where(es_manual, precio_manual, np.where(es_db, precio_db, 0.0))
+    cotizacion_elegida = np.where(es_manual, cotizacion_manual, np.where(es_db, cotizacion_db, 1.0))
+
+    # Cotización > 1.0 => el precio está en USD; si no, es un costo fijo en ARS
+    es_usd = cotizacion_elegida > 1.0
+    precio_base_usd = np.where(es_usd, precio_elegido, 0.0)
+    costo_unitario_ars_registrado = np.where(es_usd, 0.0, precio_elegido)
+
+    # 3. Recargo 3% (sólo MP en USD) y conversión a ARS con el dólar de la simulación
+    aplica_usd = precio_base_usd > 0.0
+    precio_base_usd_final = np.where(aplica_usd, precio_base_usd, 0.0)
+    recargo_unitario_usd = precio_base_usd_final * RECARGO_FIJO_USD_PERCENT
+    recargo_unitario_ars = recargo_unitario_usd * cotizacion_dolar_actual
+    costo_base_mp_ars_real = np.where(aplica_usd, precio_base_usd_final * cotizacion_dolar_actual, costo_unitario_ars_registrado)
+
+    costo_unitario_final_ars = costo_base_mp_ars_real + recargo_unitario_ars
+    costo_unitario_usd_total = precio_base_usd_final + recargo_unitario_usd
+
+    moneda_origen = np.where(
+        aplica_usd,
+        [f'USD ({cotizacion:.2f})' for cotizacion in cotizacion_elegida],
+        'ARS (Fijo)'
+    )
+
+    detalle_df = pd.DataFrame({
+        "Materia Prima": ingredientes_df["Materia Prima"].to_numpy(),
+        "Unidad": ingredientes_df["Unidad"].to_numpy(),
+        "Cantidad (Simulada)": cantidad,
+        "Moneda Origen": moneda_origen.astype(object),
+        "Costo Unit. ARS (Base)": costo_base_mp_ars_real,
+        "Recargo 3% ARS (Unit.)": recargo_unitario_ars,
+        "Costo Unit. ARS (Total)": costo_unitario_final_ars,
+        "Costo Total ARS": cantidad * costo_unitario_final_ars,
+        "Costo Unit. USD (Base)": precio_base_usd_final,
+        "Recargo 3% USD (Unit.)": recargo_unitario_usd,
+        "Costo Unit. USD (Total)": costo_unitario_usd_total,
+        "Costo Total USD": cantidad * costo_unitario_usd_total,
+    })
+
+    costo_total_mp_ars = float(np.sum(cantidad * costo_base_mp_ars_real))
+    costo_total_recargo_mp_ars = float(np.sum(cantidad * recargo_unitario_ars))
+    costo_total_mp_usd = float(detalle_df["Costo Total USD"].sum())
+    costo_mp_total = float(detalle_df["Costo Total ARS"].sum())
+
+    return costo_mp_total, detalle_df, costo_total_mp_ars, costo_total_recargo_mp_ars, costo_total_mp_usd
@@ -0,0 +1,159 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# =================================================================================================
+# PERFIL DE UN RERUN (opcional): tiempos por sección y consultas SQL
+# =================================================================================================
+_local = threading.local()
+
+def _normalizar_sql(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+class PerfilRerun:
+    """
+    Mide un rerun de una página: las secciones se marcan en orden con `marcar()` (cada una termina
+    donde empieza la siguiente) y las consultas de las conexiones del pool se atribuyen a la sección vigente.
+    """
+
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.fecha = datetime.now().isoformat(timespec="seconds")
+        self.inicio = time.perf_counter()
+        self.fin = None
+        self.secciones = [["(inicio)", self.inicio, None]]
+        self.consultas = []
+
+    def marcar(self, nombre):
+        """Cierra la sección vigente y abre `nombre`."""
+        ahora = time.perf_counter()
+        self.secciones[-1][2] = ahora
+        self.secciones.append([nombre, ahora, None])
+
+    def registrar_consulta(self, sql, parametros, ms):
+        """Agrega una sentencia ejecutada; devuelve el registro para sumarle el tiempo de lectura."""
+        consulta = {
+            "sql": _normalizar_sql(sql),
+            "parametros": list(parametros) if isinstance(parametros, (list, tuple)) else parametros,
+            "ms": ms,
+            "seccion": self.secciones[-1][0],
+        }
+        self.consultas.append(consulta)
+        return consulta
+
+    def cerrar(self):
+        self.fin = time.perf_counter()
+        self.secciones[-1][2] = self.fin
+
+    def resumen(self, conn=None, lentas=5):
+        """
+        Dict serializable con el total, el detalle por sección y las `lentas` consultas más lentas.
+        Con `conn` se agrega el EXPLAIN QUERY PLAN de cada consulta lenta (sólo SELECT/WITH).
+        """
+        if self.fin is None:
+            self.cerrar()
+        secciones = []
+        for nombre, inicio, fin in self.secciones:
+            propias = [c for c in self.consultas if c["seccion"] == nombre]
+            if nombre == "(inicio)" and not propias and fin - inicio < 0.001:
+                continue
+            secciones.append({
+                "seccion": nombre,
+                "ms": round((fin - inicio) * 1000.0, 3),
+                "consultas": len(propias),
+                "ms_sql": round(sum(c["ms"] for c in propias), 3),
+            })
+
+        mas_lentas = []
+        for consulta in sorted(self.consultas, key=lambda c: c["ms"], reverse=True)[:lentas]:
+            lenta = {k: consulta[k] for k in ("sql", "ms", "seccion")}
+            lenta["ms"] = round(lenta["ms"], 3)
+            if conn is not None and re.match(r"(?i)\s*(SELECT|WITH)\b", consulta["sql"]):
+                try:
+                    plan = conn.execute("EXPLAIN QUERY PLAN " + consulta["sql"], consulta["parametros"] or ()).fetchall()
+                    lenta["plan"] = [fila[3] for fila in plan]
+                except (sqlite3.Error, TypeError, ValueError):
+                    lenta["plan"] = []
+            mas_lentas.append(lenta)
+
+        return {
+            "pagina": self.pagina,
+            "fecha": self.fecha,
+            "total_ms": round((self.fin - self.inicio) * 1000.0, 3),
+            "consultas": len(self.consultas),
+            "ms_sql": round(sum(c["ms"] for c in self.consultas), 3),
+            "secciones": secciones,
+            "lentas": mas_lentas,
+        }
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que informa al perfil activo cada sentencia (ejecución + lectura de filas)."""
+
+    _consulta = None
+
+    def _ejecutar(self, metodo, sql, parametros, parametros_plan):
+        inicio = time.perf_counter()
+        try:
+            return metodo(sql, parametros)
+        finally:
+            perfil = perfil_activo()
+            if perfil is not None:
+                self._consulta = perfil.registrar_consulta(sql, parametros_plan, (time.perf_counter() - inicio) * 1000.0)
+
+    def _leer(self, metodo, *args):
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            if self._consulta is not None:
+                self._consulta["ms"] += (time.perf_counter() - inicio) * 1000.0
+
+    def execute(self, sql, parametros=()):
+        return self._ejecutar(super().execute, sql, parametros, parametros)
+
+    def executemany(self, sql, parametros):
+        return self._ejecutar(super().executemany, sql, parametros, None)
+
+    def fetchone(self):
+        return self._leer(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._leer(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._leer(super().fetchall)
+
+# =================================================================================================
+# PERFIL ACTIVO DEL HILO (cada rerun de Streamlit corre en su hilo)
+# =================================================================================================
+
+def iniciar_perfil(pagina):
+    """Activa un perfil nuevo para el hilo actual y lo devuelve."""
+    _local.perfil = PerfilRerun(pagina)
+    return _local.perfil
+
+def perfil_activo():
+    """Perfil del hilo actual o None si no se está midiendo."""
+    return getattr(_local, "perfil", None)
+
+def marcar_seccion(nombre):
+    """Empieza la sección `nombre` del perfil activo (no hace nada si no hay perfil)."""
+    perfil = perfil_activo()
+    if perfil is not None:
+        perfil.marcar(nombre)
+
+def terminar_perfil():
+    """Desactiva y cierra el perfil del hilo actual; lo devuelve (o None)."""
+    perfil = perfil_activo()
+    _local.perfil = None
+    if perfil is not None:
+        perfil.cerrar()
+    return perfil
+
+def guardar_jsonl(resumen, ruta):
+    """Agrega el resumen de un rerun como una línea JSON al final de `ruta`."""
+    with open(ruta, "a", encoding="utf-8") as archivo:
+        archivo.write(json.dumps(resumen, ensure_ascii=False, default=str) + "\n")
@@ -0,0 +1,83 @@
+import pandas as pd
+
+from costeo.motor import COLUMNAS_PRECIO
+
+# =================================================================================================
+# RESOLUCIÓN MASIVA DE PRECIOS DE MATERIA PRIMA
+# =================================================================================================
+
+# Último registro por MP en cada tabla (ROW_NUMBER por materia_prima_id). Se usa la compra más
+# reciente y, si la MP nunca se compró, el último precio cargado en precios_materias_primas.
+_SQL_PRECIOS_ACTUALES = """
+    WITH ultima_compra AS (
+        SELECT
+            materia_prima_id,
+            precio_unitario,
+            0.0 AS costo_flete,
+            0.0 AS otros_costos,
+            CASE
+                WHEN moneda = 'ARS' AND COALESCE(cotizacion_usd, 1.0) <= 1.0 THEN 1.0
+                ELSE COALESCE(cotizacion_usd, 1.0)
+            END AS cotizacion_usd,
+            ROW_NUMBER() OVER (PARTITION BY materia_prima_id ORDER BY fecha DESC, id DESC) AS orden
+        FROM compras_materia_prima
+        {filtro}
+    ),
+    ultimo_precio AS (
+        SELECT
+            materia_prima_id,
+            precio_unitario,
+            costo_flete,
+            otros_costos,
+            cotizacion_usd,
+            ROW_NUMBER() OVER (PARTITION BY materia_prima_id ORDER BY fecha DESC, id DESC) AS orden
+        FROM precios_materias_primas
+        {filtro}
+    )
+    SELECT materia_prima_id, precio_unitario, costo_flete, otros_costos, cotizacion_usd
+    FROM ultima_compra
+    WHERE orden = 1
+    UNION ALL
+    SELECT materia_prima_id, precio_unitario, costo_flete, otros_costos, cotizacion_usd
+    FROM ultimo_precio
+    WHERE orden = 1
+      AND materia_prima_id NOT IN (SELECT materia_prima_id FROM ultima_compra)
+"""
+
+PRECIO_VACIO = (0.0, 0.0, 0.0, 1.0)
+
+def obtener_precios_actuales(conn, materia_prima_ids=None):
+    """
+    Obtiene en una sola consulta el último precio de varias materias primas.
+
+    Aplica la misma regla que `obtener_precio_actual_materia_prima`: última compra en
+    compras_materia_prima y, si no hay, último registro de precios_materias_primas.
+    Con `materia_prima_ids=None` resuelve todas las MP con precio registrado.
+    Devuelve la tabla de precios del motor (indexada por materia_prima_id); las MP pedidas
+    que no tienen precio quedan con (0.0, 0.0, 0.0, 1.0).
+    """
+    if materia_prima_ids is None:
+        query = _SQL_PRECIOS_ACTUALES.format(filtro="")
+        params = ()
+    else:
+        materia_prima_ids = sorted({int(mp_id) for mp_id in materia_prima_ids if mp_id != -1})
+        if not materia_prima_ids:
+            return pd.DataFrame(columns=COLUMNAS_PRECIO, index=pd.Index([], name="materia_prima_id"), dtype=float)
+        marcadores = ", ".join("?" * len(materia_prima_ids))
+        query = _SQL_PRECIOS_ACTUALES.format(filtro=f"WHERE materia_prima_id IN ({marcadores})")
+        params = tuple(materia_prima_ids) * 2
+
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    filas = cursor.fetchall()
+
+    tabla = pd.DataFrame([tuple(fila) for fila in filas], columns=["materia_prima_id"] + COLUMNAS_PRECIO)
+    tabla = tabla.set_index("materia_prima_id").astype(float)
+    tabla["costo_flete"] = tabla["costo_flete"].fillna(0.0)
+    tabla["otros_costos"] = tabla["otros_costos"].fillna(0.0)
+
+    if materia_prima_ids is not None:
+        tabla = tabla.reindex(materia_prima_ids)
+        for columna, defecto in zip(COLUMNAS_PRECIO, PRECIO_VACIO):
+            tabla[columna] = tabla[columna].fillna(defecto)
+    return tabla
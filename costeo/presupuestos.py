@@ -0,0 +1,165 @@
+import json
+
+import pandas as pd
+
+# =================================================================================================
+# RENGLONES DE PRESUPUESTOS (tabla presupuesto_items, derivada de detalle_simulaciones_json)
+# =================================================================================================
+
+# Pasa el detalle JSON de los presupuestos a renglones. Acepta los tres formatos guardados:
+# A Granel (Receta, "Costo Total ARS", Margen_Ganancia), Produccion Envases (Receta, Envase_Nombre, ...)
+# y simulacion_envasases (filas de sesión: nombre_receta, costo_total_ars, envase_info_json anidado).
+_SQL_ITEMS_DESDE_DETALLE = """
+    WITH renglones AS (
+        SELECT
+            p.id AS presupuesto_id,
+            j.key + 1 AS renglon,
+            j.value AS r,
+            CASE WHEN json_valid(json_extract(j.value, '$.envase_info_json'))
+                 THEN json_extract(j.value, '$.envase_info_json') END AS e
+        FROM presupuestos p,
+             json_each(CASE WHEN json_valid(p.detalle_simulaciones_json) THEN p.detalle_simulaciones_json ELSE '[]' END) j
+        {filtro}
+    ),
+    campos AS (
+        SELECT
+            presupuesto_id,
+            renglon,
+            COALESCE(json_extract(r, '$.Receta'), json_extract(r, '$.nombre_receta'), '') AS receta,
+            COALESCE(json_extract(r, '$.Litros'), json_extract(r, '$.litros'), 0.0) AS litros,
+            COALESCE(json_extract(r, '$.Envase_Nombre'), json_extract(e, '$.Envase_Nombre')) AS envase,
+            COALESCE(json_extract(r, '$.Capacidad_Litros'), json_extract(e, '$.Capacidad_Litros')) AS capacidad_litros,
+            COALESCE(json_extract(r, '$.Unidades_Envase_Total'), json_extract(e, '$.Unidades_Envase_Total')) AS unidades,
+            COALESCE(json_extract(r, '$."Costo Total ARS"'), json_extract(r, '$.costo_total_ars')) AS costo_total_ars,
+            COALESCE(json_extract(r, '$.Precio_Venta_Total_ARS'), json_extract(r, '$.precio_venta_total_ars')) AS precio_venta_ars,
+            COALESCE(json_extract(r, '$.Precio_Venta_Total_USD'), json_extract(r, '$.precio_venta_total_usd')) AS precio_venta_usd,
+            COALESCE(json_extract(r, '$.Margen_Ganancia'), json_extract(r, '$.margen_ganancia')) AS margen
+        FROM renglones
+    )
+    INSERT INTO presupuesto_items (
+        presupuesto_id, renglon, receta, receta_id, litros, envase, capacidad_litros, unidades,
+        costo_total_ars, precio_venta_ars, precio_venta_usd, margen
+    )
+    SELECT
+        presupuesto_id,
+        renglon,
+        receta,
+        (SELECT MIN(id) FROM recetas WHERE nombre = campos.receta),
+        litros,
+        envase,
+        capacidad_litros,
+        unidades,
+        costo_total_ars,
+        precio_venta_ars,
+        precio_venta_usd,
+        COALESCE(margen, CASE WHEN costo_total_ars > 0 THEN (precio_venta_ars - costo_total_ars) / costo_total_ars * 100.0 END)
+    FROM campos
+    WHERE true
+    ON CONFLICT (presupuesto_id, renglon) DO NOTHING
+"""
+
+# Renglones de un presupuesto recién guardado (la carga inicial tiene su copia congelada en la migración 3)
+SQL_ITEMS_PRESUPUESTO = _SQL_ITEMS_DESDE_DETALLE.format(filtro="WHERE p.id = ?")
+
+# Por receta en un rango de fechas: cantidad de renglones, litros, venta y margen promedio
+SQL_RESUMEN_RECETAS = """
+    SELECT
+        i.receta AS receta,
+        COUNT(*) AS renglones,
+        COUNT(DISTINCT i.presupuesto_id) AS presupuestos,
+        SUM(i.litros) AS litros,
+        SUM(i.costo_total_ars) AS costo_total_ars,
+        SUM(i.precio_venta_ars) AS precio_venta_ars,
+        AVG(i.margen) AS margen_promedio
+    FROM presupuestos p
+    JOIN presupuesto_items i ON i.presupuesto_id = p.id
+    WHERE p.fecha BETWEEN ? AND ?
+    GROUP BY i.receta
+    ORDER BY precio_venta_ars DESC
+"""
+
+def guardar_items_presupuesto(conn, presupuesto_id):
+    """Escribe los renglones del presupuesto `presupuesto_id` a partir de su detalle (no confirma)."""
+    conn.execute(SQL_ITEMS_PRESUPUESTO, (int(presupuesto_id),))
+
+def resumen_recetas(conn, desde, hasta):
+    """DataFrame con SQL_RESUMEN_RECETAS para los presupuestos entre `desde` y `hasta` (ISO, inclusive)."""
+    return pd.read_sql_query(SQL_RESUMEN_RECETAS, conn, params=(str(desde), str(hasta)))
+
+# =================================================================================================
+# HISTORIAL DE PRESUPUESTOS (paginación por clave: (fecha, id) descendente)
+# =================================================================================================
+
+# Sólo columnas del índice idx_presupuestos_historial (no lee el detalle JSON)
+_SQL_HISTORIAL = """
+    SELECT
+        p.id,
+        p.fecha,
+        p.cliente_id,
+        c.nombre AS cliente,
+        p.volumen_total_litros,
+        p.costo_total_ars,
+        p.precio_final_ars,
+        p.porcentaje_ganancia
+    FROM presupuestos p
+    LEFT JOIN clientes c ON c.id = p.cliente_id
+    WHERE {condiciones}
+    ORDER BY p.fecha DESC, p.id DESC
+    LIMIT ?
+"""
+
+# Renglones de un presupuesto (vista de detalle, se pide sólo al abrirlo)
+SQL_ITEMS_DE_PRESUPUESTO = """
+    SELECT renglon, receta, litros, envase, capacidad_litros, unidades,
+           costo_total_ars, precio_venta_ars, precio_venta_usd, margen
+    FROM presupuesto_items
+    WHERE presupuesto_id = ?
+    ORDER BY renglon
+"""
+
+def sql_historial(desde, hasta, cliente_ids=None, margen_min=None, margen_max=None,
+                  volumen_min=None, volumen_max=None, despues_de=None, tamanio=50):
+    """
+    (sql, parámetros) de una página del historial con los filtros dados. `despues_de` es la clave
+    (fecha, id) del último presupuesto de la página anterior: la página siguiente arranca en el
+    índice justo después de esa clave, así la página N cuesta lo mismo que la primera.
+    """
+    if despues_de is not None:
+        hasta = min(str(hasta), str(despues_de[0]))
+    condiciones = ["p.fecha BETWEEN ? AND ?"]
+    parametros = [str(desde), str(hasta)]
+    if despues_de is not None:
+        condiciones.append("(p.fecha, p.id) < (?, ?)")
+        parametros += [str(despues_de[0]), int(despues_de[1])]
+    if cliente_ids:
+        condiciones.append("p.cliente_id IN (SELECT value FROM json_each(?))")
+        parametros.append(json.dumps([int(cliente_id) for cliente_id in cliente_ids]))
+    for columna, operador, valor in (
+        ("porcentaje_ganancia", ">=", margen_min),
+        ("porcentaje_ganancia", "<=", margen_max),
+        ("volumen_total_litros", ">=", volumen_min),
+        ("volumen_total_litros", "<=", volumen_max),
+    ):
+        if valor is not None:
+            condiciones.append(f"p.{columna} {operador} ?")
+            parametros.append(float(valor))
+    # Se pide un renglón de más para saber si hay página siguiente
+    parametros.append(int(tamanio) + 1)
+    return _SQL_HISTORIAL.format(condiciones=" AND ".join(condiciones)), tuple(parametros)
+
+def pagina_historial(conn, desde, hasta, tamanio=50, despues_de=None, **filtros):
+    """
+    Una página del historial: (DataFrame, clave de la página siguiente o None si es la última).
+    `filtros`: cliente_ids, margen_min, margen_max, volumen_min, volumen_max.
+    """
+    sql, parametros = sql_historial(desde, hasta, despues_de=despues_de, tamanio=tamanio, **filtros)
+    pagina_df = pd.read_sql_query(sql, conn, params=parametros)
+    if len(pagina_df) <= tamanio:
+        return pagina_df, None
+    pagina_df = pagina_df.iloc[:tamanio]
+    ultimo = pagina_df.iloc[-1]
+    return pagina_df, (ultimo["fecha"], int(ultimo["id"]))
+
+def items_de_presupuesto(conn, presupuesto_id):
+    """Renglones guardados de un presupuesto (presupuesto_items)."""
+    return pd.read_sql_query(SQL_ITEMS_DE_PRESUPUESTO, conn, params=(int(presupuesto_id),))
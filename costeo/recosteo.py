@@ -0,0 +1,180 @@
+"""
+Recosteo de presupuestos guardados a los precios y dólar de hoy.
+
+    python -m costeo.recosteo --desde 2025-09-01 --hasta 2025-09-30 --salida recosteo.csv
+    python -m costeo.recosteo --desde 2025-01-01 --hasta 2025-12-31 --dolar 1480 --flete 5000 --por-presupuesto
+
+Toma los renglones de presupuesto_items del rango, los vuelve a costear en lotes por columnas
+(costeo.lote.costear_items) con la foto de precios vigente y devuelve la deriva de costo y el
+margen nuevo por renglón y por presupuesto, ordenados por pérdida de margen.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from costeo.catalogos import CATALOGOS
+from costeo.conexion import abrir_conexion
+from costeo.lote import _ultima_cotizacion, costear_items, ingredientes_recetas
+from costeo.motor import ids_a_resolver
+from costeo.snapshot import SnapshotPrecios
+
+# =================================================================================================
+# CONFIGURACIÓN
+# =================================================================================================
+DB_PATH = "minerva.db"
+TAMANIO_LOTE = 5000
+
+# Renglones de los presupuestos del rango (usa idx_presupuestos_historial y la clave de presupuesto_items)
+SQL_RENGLONES_RANGO = """
+    SELECT
+        i.presupuesto_id,
+        i.renglon,
+        p.fecha,
+        p.cliente_id,
+        i.receta,
+        i.receta_id,
+        i.litros,
+        i.envase,
+        i.costo_total_ars AS costo_original_ars,
+        i.precio_venta_ars,
+        i.margen AS margen_original
+    FROM presupuestos p
+    JOIN presupuesto_items i ON i.presupuesto_id = p.id
+    WHERE p.fecha BETWEEN ? AND ?
+"""
+
+def _porcentaje_sobre(valor, base):
+    """(valor - base) / base en %: margen si valor es el precio y base el costo; NaN si no hay base."""
+    valor = np.asarray(valor, dtype=float)
+    base = np.asarray(base, dtype=float)
+    return np.divide(valor - base, base, out=np.full(base.shape, np.nan), where=base > 0) * 100.0
+
+# =================================================================================================
+# RECOSTEO
+# =================================================================================================
+
+def renglones_rango(conn, desde, hasta):
+    """Renglones guardados de los presupuestos entre `desde` y `hasta` (ISO, inclusive)."""
+    return pd.read_sql_query(SQL_RENGLONES_RANGO, conn, params=(str(desde), str(hasta)))
+
+def recostear_renglones(conn, renglones_df, snapshot, dolar, flete=0.0, costo_indirecto_litro=0.0,
+                        etiqueta=0.0, caja=0.0, tamanio_lote=TAMANIO_LOTE):
+    """
+    Agrega a `renglones_df` el costo de hoy de cada renglón ('costo_actual_ars'), la deriva contra
+    el costo guardado y el margen nuevo con el mismo precio de venta. Cada renglón se costea como
+    una tanda de sus litros totales. Los renglones cuya receta ya no existe quedan en NaN.
+    El envase se busca por descripción; si no existe (o es a granel) se costea sin envase.
+    """
+    renglones_df = renglones_df.reset_index(drop=True)
+    costo_actual = np.full(len(renglones_df), np.nan)
+
+    envases = pd.read_sql_query(CATALOGOS["envases"], conn)
+    envase_por_nombre = dict(zip(envases["descripcion"].astype(str).str.strip().str.lower(), envases["id"]))
+    envase_ids = renglones_df["envase"].map(lambda nombre: envase_por_nombre.get(str(nombre).strip().lower()) if pd.notna(nombre) else None)
+
+    costeables = renglones_df["receta_id"].notna() & (renglones_df["litros"] > 0)
+    items_df = pd.DataFrame({
+        "receta_id": renglones_df.loc[costeables, "receta_id"].astype(int),
+        "litros": renglones_df.loc[costeables, "litros"].astype(float),
+        "envase_id": envase_ids[costeables],
+    })
+    if not items_df.empty:
+        # Una consulta para los ingredientes de todas las recetas y una tabla de precios para todas sus MP
+        ingredientes_df = ingredientes_recetas(conn, items_df["receta_id"].unique())
+        precios_df = snapshot.precios_mp(ids_a_resolver(ingredientes_df), combinados=True)
+        posiciones = np.flatnonzero(costeables.to_numpy())
+        for inicio in range(0, len(items_df), int(tamanio_lote)):
+            lote_df = items_df.iloc[inicio:inicio + int(tamanio_lote)]
+            costos_df = costear_items(lote_df, ingredientes_df, precios_df, snapshot, dolar, flete,
+                                      costo_indirecto_litro, etiqueta, caja)
+            costo_actual[posiciones[inicio:inicio + len(lote_df)]] = costos_df["costo_total_final"].to_numpy()
+
+    resultado = renglones_df.copy()
+    resultado["costo_actual_ars"] = costo_actual
+    resultado["deriva_ars"] = resultado["costo_actual_ars"] - resultado["costo_original_ars"]
+    resultado["deriva_pct"] = _porcentaje_sobre(resultado["costo_actual_ars"], resultado["costo_original_ars"])
+    resultado["margen_original"] = resultado["margen_original"].fillna(
+        pd.Series(_porcentaje_sobre(resultado["precio_venta_ars"], resultado["costo_original_ars"]), index=resultado.index)
+    )
+    resultado["margen_actual"] = _porcentaje_sobre(resultado["precio_venta_ars"], resultado["costo_actual_ars"])
+    resultado["erosion_margen"] = resultado["margen_original"] - resultado["margen_actual"]
+    return resultado.sort_values("erosion_margen", ascending=False, na_position="last").reset_index(drop=True)
+
+def resumen_por_presupuesto(renglones_df):
+    """
+    Totales por presupuesto (de `recostear_renglones`), ordenados por pérdida de margen.
+    Costos y precio se suman sólo sobre los renglones comparables (costo guardado, costo de hoy y
+    precio de venta): así deriva y márgenes comparan el mismo conjunto de renglones. Los demás se
+    cuentan en 'sin_recostear'; si no queda ninguno comparable, los totales quedan en NaN.
+    """
+    comparable = (
+        renglones_df["costo_original_ars"].notna()
+        & renglones_df["costo_actual_ars"].notna()
+        & renglones_df["precio_venta_ars"].notna()
+    )
+    columnas = ["costo_original_ars", "costo_actual_ars", "precio_venta_ars"]
+    agrupado = renglones_df[["presupuesto_id", "fecha", "cliente_id", "renglon"]].assign(
+        comparable=comparable.astype(int),
+        **{columna: renglones_df[columna].where(comparable) for columna in columnas},
+    ).groupby(["presupuesto_id", "fecha", "cliente_id"])
+    totales = agrupado.agg(renglones=("renglon", "count"), renglones_comparables=("comparable", "sum"))
+    totales["sin_recostear"] = totales["renglones"] - totales["renglones_comparables"]
+    # min_count=1: si ningún renglón es comparable, el total queda NaN (no 0)
+    totales = totales.join(agrupado[columnas].sum(min_count=1)).reset_index()
+    totales["deriva_ars"] = totales["costo_actual_ars"] - totales["costo_original_ars"]
+    totales["deriva_pct"] = _porcentaje_sobre(totales["costo_actual_ars"], totales["costo_original_ars"])
+    totales["margen_original"] = _porcentaje_sobre(totales["precio_venta_ars"], totales["costo_original_ars"])
+    totales["margen_actual"] = _porcentaje_sobre(totales["precio_venta_ars"], totales["costo_actual_ars"])
+    totales["erosion_margen"] = totales["margen_original"] - totales["margen_actual"]
+    return totales.sort_values("erosion_margen", ascending=False, na_position="last").reset_index(drop=True)
+
+def recostear_presupuestos(db_path, desde, hasta, dolar=None, flete=5000.0, costo_indirecto_litro=0.0,
+                           etiqueta=0.0, caja=0.0, tamanio_lote=TAMANIO_LOTE):
+    """Recosteo completo del rango con la foto de precios de hoy: (renglones_df, presupuestos_df)."""
+    conn = abrir_conexion(db_path, solo_lectura=True)
+    try:
+        if dolar is None:
+            dolar = _ultima_cotizacion(conn)
+        if not dolar:
+            raise ValueError("No hay cotización del dólar registrada; indique --dolar.")
+        snapshot = SnapshotPrecios.cargar(conn)
+        renglones_df = recostear_renglones(conn, renglones_rango(conn, desde, hasta), snapshot, float(dolar),
+                                           flete, costo_indirecto_litro, etiqueta, caja, tamanio_lote)
+    finally:
+        conn.close()
+    return renglones_df, resumen_por_presupuesto(renglones_df)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recosteo de presupuestos guardados a precios de hoy.")
+    parser.add_argument("--db", default=DB_PATH, help="Ruta a la base SQLite (default: minerva.db)")
+    parser.add_argument("--desde", required=True, help="Fecha inicial (AAAA-MM-DD, inclusive)")
+    parser.add_argument("--hasta", required=True, help="Fecha final (AAAA-MM-DD, inclusive)")
+    parser.add_argument("--dolar", type=float, default=None, help="Cotización ARS/USD (default: última cotización de venta registrada)")
+    parser.add_argument("--flete", type=float, default=5000.0, help="Flete base por tanda de 200L (ARS)")
+    parser.add_argument("--overhead-litro", type=float, default=0.0, help="Costo indirecto por litro (ARS/L)")
+    parser.add_argument("--etiqueta", type=float, default=0.0, help="Costo de etiqueta por envase (ARS)")
+    parser.add_argument("--caja", type=float, default=0.0, help="Costo de caja por envase (ARS)")
+    parser.add_argument("--por-presupuesto", action="store_true", help="Escribir el resumen por presupuesto en lugar de los renglones")
+    parser.add_argument("--salida", default="recosteo.csv", help="Archivo CSV de salida")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"No existe la base de datos: {args.db}")
+
+    inicio = time.perf_counter()
+    try:
+        renglones_df, presupuestos_df = recostear_presupuestos(
+            args.db, args.desde, args.hasta, args.dolar, args.flete, args.overhead_litro, args.etiqueta, args.caja
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    (presupuestos_df if args.por_presupuesto else renglones_df).to_csv(args.salida, index=False)
+    print(f"{len(presupuestos_df)} presupuestos ({len(renglones_df)} renglones) recosteados en "
+          f"{time.perf_counter() - inicio:.2f}s -> {args.salida}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# =================================================================================================
+# SENSIBILIDAD DEL PRESUPUESTO AL DÓLAR (MONTE CARLO)
+# =================================================================================================
+
+# Últimos cambios de la cotización de venta (valor anterior -> nuevo)
+SQL_HISTORIAL_VENTA = """
+    SELECT fecha_cambio, valor_anterior, valor_nuevo
+    FROM historial_cambios_dolar
+    WHERE tipo_cambio = 'venta'
+    ORDER BY fecha_cambio DESC
+    LIMIT ?
+"""
+
+PERCENTILES = (5, 50, 95)
+
+def historial_dolar(conn, ultimos=60):
+    """Los `ultimos` cambios del dólar de venta, del más viejo al más nuevo."""
+    historial = pd.read_sql_query(SQL_HISTORIAL_VENTA, conn, params=(int(ultimos),))
+    return historial.iloc[::-1].reset_index(drop=True)
+
+def variaciones_dolar(historial_df):
+    """
+    Variaciones logarítmicas ln(nuevo / anterior) de cada cambio y cuántos cambios hubo por día
+    en el período. Devuelve (variaciones, cambios_por_dia).
+    """
+    validos = historial_df[(historial_df["valor_anterior"] > 0) & (historial_df["valor_nuevo"] > 0)]
+    variaciones = np.log(validos["valor_nuevo"].to_numpy(dtype=float) / validos["valor_anterior"].to_numpy(dtype=float))
+    if len(validos) < 2:
+        return variaciones, 0.0
+    fechas = pd.to_datetime(validos["fecha_cambio"])
+    dias = (fechas.max() - fechas.min()).total_seconds() / 86400.0
+    return variaciones, (len(validos) / dias if dias > 0 else 0.0)
+
+def escenarios_dolar(cotizacion_actual, variaciones, cambios_por_dia, dias_validez=7, escenarios=5000, semilla=None):
+    """
+    Cotizaciones posibles al cabo de `dias_validez` días: se sortean (con reposición) tantas variaciones
+    históricas como cambios se esperan en ese plazo y se aplican a la cotización actual.
+    Sin historial devuelve siempre la cotización actual.
+    """
+    escenarios = int(escenarios)
+    pasos = max(1, int(round(cambios_por_dia * dias_validez)))
+    if len(variaciones) == 0:
+        return np.full(escenarios, float(cotizacion_actual))
+    rng = np.random.default_rng(semilla)
+    sorteo = rng.choice(np.asarray(variaciones, dtype=float), size=(escenarios, pasos))
+    return float(cotizacion_actual) * np.exp(sorteo.sum(axis=1))
+
+def sensibilidad_presupuesto(items_df, cotizaciones, percentiles=PERCENTILES):
+    """
+    Recostea todos los ítems del presupuesto en cada escenario de dólar con una sola operación de matrices.
+
+    `items_df` trae por ítem 'Receta', 'costo_total_ars', 'costo_usd' (la parte del costo cotizada en USD),
+    'cotizacion_dolar' (el dólar con que se costeó) y 'precio_venta_ars' (el precio cotizado, fijo en ARS).
+    Devuelve un DataFrame con los percentiles de costo (ARS) y margen (%) por ítem y para el TOTAL.
+    """
+    costo_usd = items_df["costo_usd"].to_numpy(dtype=float)
+    costo_fijo_ars = items_df["costo_total_ars"].to_numpy(dtype=float) - costo_usd * items_df["cotizacion_dolar"].to_numpy(dtype=float)
+    precio = items_df["precio_venta_ars"].to_numpy(dtype=float)
+
+    # (escenarios × ítems): la parte en ARS no cambia, la parte en USD se multiplica por cada dólar sorteado
+    costos = costo_fijo_ars[None, :] + np.outer(np.asarray(cotizaciones, dtype=float), costo_usd)
+    costos = np.column_stack([costos, costos.sum(axis=1)])
+    precios = np.append(precio, precio.sum())
+    margenes = np.divide(precios - costos, costos, out=np.zeros_like(costos), where=costos > 0) * 100.0
+
+    resultado = pd.DataFrame({"Receta": list(items_df["Receta"]) + ["TOTAL"]})
+    resultado["Precio Venta (ARS)"] = precios
+    for p, costo_p in zip(percentiles, np.percentile(costos, percentiles, axis=0)):
+        resultado[f"Costo P{p} (ARS)"] = costo_p
+    # El margen peor (P5) corresponde al costo alto (P95)
+    for p, margen_p in zip(percentiles, np.percentile(margenes, percentiles, axis=0)):
+        resultado[f"Margen P{p} (%)"] = margen_p
+    return resultado
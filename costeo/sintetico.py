@@ -0,0 +1,257 @@
+"""
+Generador de una minerva.db sintética con el mismo esquema que la real y volúmenes configurables.
+
+    python -m costeo.sintetico --salida /tmp/minerva_x10.db --escala 10
+    python -m costeo.sintetico --salida /tmp/profunda.db --compras-por-mp 200 --profundidad-combinados 5
+
+El esquema se copia de la base plantilla (default minerva.db) y después se aplican las migraciones,
+así los índices, el resumen de gastos y los triggers son los mismos que en producción.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from costeo.conexion import abrir_conexion
+from costeo.migraciones import aplicar_migraciones
+
+# =================================================================================================
+# VOLÚMENES POR DEFECTO (escala 1 ≈ la base real)
+# =================================================================================================
+VOLUMENES_BASE = {
+    "materias_primas": 100,
+    "combinados": 12,
+    "recetas": 90,
+    "envases": 100,
+    "proveedores": 20,
+    "clientes": 6,
+}
+# Profundidad / densidad: no se multiplican por la escala salvo que se pidan explícitamente
+INGREDIENTES_POR_RECETA = 10
+COMPRAS_POR_MP = 2
+PRECIOS_POR_MP = 1
+ENTRADAS_POR_ENVASE = 1
+GASTOS_POR_MES = 12
+MESES_GASTOS = 12
+PROFUNDIDAD_COMBINADOS = 2
+CATEGORIAS_GASTO = 10
+DIAS_HISTORIAL = 365
+DOLAR_BASE = 1450.0
+
+# =================================================================================================
+# ESQUEMA
+# =================================================================================================
+
+def copiar_esquema(plantilla, conn):
+    """Crea en `conn` las tablas de la base plantilla (sin datos, índices ni tablas de migraciones)."""
+    origen = sqlite3.connect(f"file:{plantilla}?mode=ro", uri=True)
+    try:
+        tablas = origen.execute("""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'table' AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+            ORDER BY rootpage
+        """).fetchall()
+    finally:
+        origen.close()
+    generadas = {"gastos_mensuales"}  # las crea aplicar_migraciones
+    for nombre, sql in tablas:
+        if nombre not in generadas:
+            conn.execute(sql)
+
+# =================================================================================================
+# DATOS
+# =================================================================================================
+
+def _fechas(rng, cantidad, hasta, dias):
+    """`cantidad` fechas ISO al azar en los `dias` anteriores a `hasta`."""
+    desplazamientos = rng.integers(0, dias, size=cantidad)
+    return [(hasta - timedelta(days=int(d))).isoformat() for d in desplazamientos]
+
+def _niveles_combinados(cantidad, profundidad):
+    """Reparte `cantidad` MP combinadas en `profundidad` niveles (al menos una por nivel si alcanza)."""
+    profundidad = max(1, min(profundidad, cantidad)) if cantidad else 0
+    return [cantidad // profundidad + (1 if nivel < cantidad % profundidad else 0) for nivel in range(profundidad)]
+
+def poblar(conn, volumenes, ingredientes_por_receta=INGREDIENTES_POR_RECETA, compras_por_mp=COMPRAS_POR_MP,
+           precios_por_mp=PRECIOS_POR_MP, entradas_por_envase=ENTRADAS_POR_ENVASE, gastos_por_mes=GASTOS_POR_MES,
+           meses_gastos=MESES_GASTOS, profundidad_combinados=PROFUNDIDAD_COMBINADOS, semilla=0, hasta=None):
+    """Inserta datos sintéticos reproducibles (misma semilla = misma base). Devuelve {tabla: filas}."""
+    rng = np.random.default_rng(semilla)
+    hasta = hasta or date.today()
+    filas = {}
+
+    def insertar(tabla, columnas, valores):
+        marcadores = ", ".join("?" * len(columnas))
+        conn.executemany(f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({marcadores})", valores)
+        filas[tabla] = filas.get(tabla, 0) + len(valores)
+
+    insertar("proveedores", ("id", "nombre"), [(i, f"Proveedor {i}") for i in range(1, volumenes["proveedores"] + 1)])
+    insertar("clientes", ("id", "nombre"), [(i, f"Cliente {i}") for i in range(1, volumenes["clientes"] + 1)])
+    insertar("categorias_imputacion", ("id", "nombre", "tipo"),
+             [(i, f"Categoría {i}", "EGRESO") for i in range(1, CATEGORIAS_GASTO + 1)])
+
+    # --- Materias primas: simples + combinadas en niveles (cada nivel usa al menos una del anterior) ---
+    n_combinados = min(volumenes["combinados"], max(volumenes["materias_primas"] - 2, 0))
+    n_simples = volumenes["materias_primas"] - n_combinados
+    unidades = np.array(["kg", "litro"])
+    insertar("materias_primas", ("id", "nombre", "unidad"), [
+        (i, f"MP {i:06d}" if i <= n_simples else f"COMBINADO {i:06d}", str(unidades[i % 2]))
+        for i in range(1, volumenes["materias_primas"] + 1)
+    ])
+
+    composicion = []
+    previos = np.arange(1, n_simples + 1)
+    siguiente_id = n_simples + 1
+    disponibles = previos
+    for cantidad_nivel in _niveles_combinados(n_combinados, profundidad_combinados):
+        nivel = np.arange(siguiente_id, siguiente_id + cantidad_nivel)
+        for combinado_id in nivel:
+            partes = int(rng.integers(2, 4))
+            componentes = {int(rng.choice(previos))}
+            while len(componentes) < min(partes, len(disponibles)):
+                componentes.add(int(rng.choice(disponibles)))
+            proporciones = rng.dirichlet(np.ones(len(componentes)))
+            composicion.extend((int(combinado_id), c, float(p)) for c, p in zip(sorted(componentes), proporciones))
+        previos = nivel
+        disponibles = np.concatenate([disponibles, nivel])
+        siguiente_id += cantidad_nivel
+    insertar("composicion_colorantes", ("colorante_combinado_id", "colorante_primario_id", "proporcion"), composicion)
+
+    # --- Historial de compras y precios (sólo MP simples) ---
+    n_compras = n_simples * compras_por_mp
+    mp_compras = np.repeat(np.arange(1, n_simples + 1), compras_por_mp)
+    en_usd = rng.random(n_compras) < 0.5
+    precios_usd = rng.uniform(0.5, 40.0, n_compras)
+    cotizaciones = rng.uniform(DOLAR_BASE * 0.8, DOLAR_BASE * 1.05, n_compras)
+    cantidades = rng.uniform(5, 500, n_compras)
+    fechas = _fechas(rng, n_compras, hasta, DIAS_HISTORIAL)
+    compras = []
+    for i in range(n_compras):
+        precio = precios_usd[i] if en_usd[i] else precios_usd[i] * cotizaciones[i]
+        compras.append((
+            int(rng.integers(1, volumenes["proveedores"] + 1)), int(mp_compras[i]), fechas[i], float(cantidades[i]),
+            float(precio), float(precio * cantidades[i]), "USD" if en_usd[i] else "ARS", float(cotizaciones[i]),
+        ))
+    insertar("compras_materia_prima", ("proveedor_id", "materia_prima_id", "fecha", "cantidad", "precio_unitario",
+                                       "costo_total", "moneda", "cotizacion_usd"), compras)
+
+    n_precios = n_simples * precios_por_mp
+    mp_precios = np.repeat(np.arange(1, n_simples + 1), precios_por_mp)
+    insertar("precios_materias_primas", ("materia_prima_id", "precio_unitario", "fecha", "costo_flete", "otros_costos", "cotizacion_usd"), [
+        (int(mp), float(precio), fecha, 0.0, 0.0, 1.0)
+        for mp, precio, fecha in zip(mp_precios, rng.uniform(0.5, 40.0, n_precios), _fechas(rng, n_precios, hasta, DIAS_HISTORIAL))
+    ])
+
+    # --- Recetas e ingredientes (sin MP repetidas dentro de una receta) ---
+    insertar("recetas", ("id", "nombre", "cliente_id"), [
+        (i, f"Receta {i:06d}", int(rng.integers(1, volumenes["clientes"] + 1))) for i in range(1, volumenes["recetas"] + 1)
+    ])
+    por_receta = min(ingredientes_por_receta, volumenes["materias_primas"])
+    ingredientes = []
+    for receta_id in range(1, volumenes["recetas"] + 1):
+        for mp in rng.choice(volumenes["materias_primas"], size=por_receta, replace=False) + 1:
+            ingredientes.append((receta_id, int(mp), float(rng.uniform(0.05, 40.0)), str(unidades[mp % 2])))
+    insertar("receta_ingredientes", ("receta_id", "materia_prima_id", "cantidad", "unidad"), ingredientes)
+
+    # --- Envases y sus ingresos ---
+    capacidades = np.array([0.25, 0.5, 1.0, 5.0, 10.0, 20.0, 200.0])
+    insertar("envases", ("id", "descripcion", "unidad", "cliente_id", "capacidad_litros"), [
+        (i, f"Envase {i:06d}", "unidad", int(rng.integers(1, volumenes["clientes"] + 1)), float(rng.choice(capacidades)))
+        for i in range(1, volumenes["envases"] + 1)
+    ])
+    n_entradas = volumenes["envases"] * entradas_por_envase
+    env_entradas = np.repeat(np.arange(1, volumenes["envases"] + 1), entradas_por_envase)
+    insertar("entradas_envases", ("proveedor_id", "fecha_ingreso", "numero_comprobante", "envase_id", "cantidad_ingresada", "precio_unitario"), [
+        (int(rng.integers(1, volumenes["proveedores"] + 1)), fecha, f"E-{i:09d}", int(env), int(rng.integers(100, 5000)), float(precio))
+        for i, (env, precio, fecha) in enumerate(zip(env_entradas, rng.uniform(0.05, 3.0, n_entradas), _fechas(rng, n_entradas, hasta, DIAS_HISTORIAL)))
+    ])
+
+    # --- Gastos operativos: `gastos_por_mes` en cada uno de los últimos `meses_gastos` meses ---
+    gastos = []
+    anio, mes = hasta.year, hasta.month
+    for _ in range(meses_gastos):
+        for dia in rng.integers(1, 29, size=gastos_por_mes):
+            gastos.append((
+                f"{anio:04d}-{mes:02d}-{int(dia):02d}", f"Beneficiario {int(rng.integers(1, 200))}",
+                int(rng.integers(1, CATEGORIAS_GASTO + 1)), f"G-{len(gastos):09d}", float(rng.uniform(10_000, 2_000_000)),
+            ))
+        anio, mes = (anio - 1, 12) if mes == 1 else (anio, mes - 1)
+    insertar("gastos", ("fecha_factura", "beneficiario_nombre", "categoria_id", "numero_comprobante", "importe_total"), gastos)
+
+    # --- Dólar: cotización vigente + un cambio de venta por día del historial ---
+    ventas = DOLAR_BASE * np.cumprod(1 + rng.normal(0.0005, 0.004, DIAS_HISTORIAL))[::-1]
+    cambios = []
+    for dias, (anterior, nuevo) in enumerate(zip(ventas[1:], ventas[:-1])):
+        cambios.append(((hasta - timedelta(days=dias)).isoformat() + " 12:00:00", "venta", float(anterior), float(nuevo)))
+    insertar("historial_cambios_dolar", ("fecha_cambio", "tipo_cambio", "valor_anterior", "valor_nuevo"), cambios)
+    insertar("cotizacion_dolar", ("fecha_hora", "compra", "venta", "fecha"),
+             [(hasta.isoformat() + " 12:00:00", float(ventas[0]) * 0.97, float(ventas[0]), hasta.isoformat())])
+    return filas
+
+def generar_base(salida, plantilla="minerva.db", escala=1.0, semilla=0, **parametros):
+    """
+    Crea `salida` (la reemplaza si existe) con el esquema de `plantilla`, datos sintéticos
+    (VOLUMENES_BASE × escala y los parámetros de profundidad) y las migraciones aplicadas.
+    Devuelve {tabla: filas insertadas}.
+    """
+    volumenes = {tabla: max(1, int(round(n * escala))) for tabla, n in VOLUMENES_BASE.items()}
+    for tabla in VOLUMENES_BASE:
+        if parametros.get(tabla) is not None:
+            volumenes[tabla] = parametros.pop(tabla)
+    parametros = {k: v for k, v in parametros.items() if v is not None}
+    for archivo in (salida, salida + "-wal", salida + "-shm"):
+        if os.path.exists(archivo):
+            os.remove(archivo)
+
+    conn = abrir_conexion(salida)
+    try:
+        copiar_esquema(plantilla, conn)
+        with conn:
+            filas = poblar(conn, volumenes, semilla=semilla, **parametros)
+        aplicar_migraciones(conn)
+    finally:
+        conn.close()
+    return filas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera una minerva.db sintética con volúmenes configurables.")
+    parser.add_argument("--salida", required=True, help="Archivo .db a crear (se reemplaza si existe)")
+    parser.add_argument("--plantilla", default="minerva.db", help="Base de la que se copia el esquema (default: minerva.db)")
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplica recetas, MP, combinadas, envases, proveedores y clientes")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador (misma semilla = misma base)")
+    parser.add_argument("--recetas", type=int, default=None, help="Cantidad de recetas (pisa la escala)")
+    parser.add_argument("--materias-primas", type=int, default=None, help="Cantidad de MP, incluidas las combinadas (pisa la escala)")
+    parser.add_argument("--combinados", type=int, default=None, help="Cantidad de MP combinadas (pisa la escala)")
+    parser.add_argument("--envases", type=int, default=None, help="Cantidad de envases (pisa la escala)")
+    parser.add_argument("--ingredientes-por-receta", type=int, default=INGREDIENTES_POR_RECETA)
+    parser.add_argument("--compras-por-mp", type=int, default=COMPRAS_POR_MP, help="Profundidad del historial de compras")
+    parser.add_argument("--precios-por-mp", type=int, default=PRECIOS_POR_MP)
+    parser.add_argument("--entradas-por-envase", type=int, default=ENTRADAS_POR_ENVASE)
+    parser.add_argument("--gastos-por-mes", type=int, default=GASTOS_POR_MES)
+    parser.add_argument("--meses-gastos", type=int, default=MESES_GASTOS)
+    parser.add_argument("--profundidad-combinados", type=int, default=PROFUNDIDAD_COMBINADOS,
+                        help="Niveles de MP combinadas (combinadas hechas de combinadas)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.plantilla):
+        parser.error(f"No existe la base plantilla: {args.plantilla}")
+
+    inicio = time.perf_counter()
+    filas = generar_base(
+        args.salida, args.plantilla, args.escala, args.semilla,
+        recetas=args.recetas, materias_primas=args.materias_primas, combinados=args.combinados, envases=args.envases,
+        ingredientes_por_receta=args.ingredientes_por_receta, compras_por_mp=args.compras_por_mp,
+        precios_por_mp=args.precios_por_mp, entradas_por_envase=args.entradas_por_envase,
+        gastos_por_mes=args.gastos_por_mes, meses_gastos=args.meses_gastos,
+        profundidad_combinados=args.profundidad_combinados,
+    )
+    for tabla, cantidad in filas.items():
+        print(f"{tabla:<28}{cantidad:>12,}")
+    print(f"Base sintética generada en {time.perf_counter() - inicio:.2f}s -> {args.salida}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
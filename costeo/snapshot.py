@@ -0,0 +1,160 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from costeo.composicion import cargar_composiciones, componentes_simples, orden_topologico, resolver_precios_combinados
+from costeo.conexion import abrir_conexion
+from costeo.motor import COLUMNAS_PRECIO
+from costeo.precios import PRECIO_VACIO, obtener_precios_actuales
+
+# =================================================================================================
+# FOTO DE PRECIOS EN MEMORIA (MP + ENVASES)
+# =================================================================================================
+
+# Último ingreso por envase (misma regla que `obtener_precio_envase_actual`) y su capacidad.
+# La subconsulta correlacionada lee una sola entrada de idx_entradas_envases_fecha por envase.
+_SQL_ENVASES = """
+    SELECT
+        e.id,
+        COALESCE((
+            SELECT precio_unitario
+            FROM entradas_envases
+            WHERE envase_id = e.id
+            ORDER BY fecha_ingreso DESC, id DESC
+            LIMIT 1
+        ), 0.0),
+        COALESCE(e.capacidad_litros, 0.0)
+    FROM envases e
+    ORDER BY e.id
+"""
+
+# Huella de las tablas de precios: cambia si se agregan o borran filas y, por las sumas de los
+# valores, también si se editan precios, cotizaciones, capacidades o proporciones en el lugar
+_SQL_FIRMA = """
+    SELECT * FROM
+        (SELECT MAX(id), COUNT(*), TOTAL(precio_unitario), TOTAL(cotizacion_usd) FROM compras_materia_prima),
+        (SELECT MAX(id), COUNT(*), TOTAL(precio_unitario), TOTAL(costo_flete) + TOTAL(otros_costos) + TOTAL(cotizacion_usd)
+         FROM precios_materias_primas),
+        (SELECT MAX(id), COUNT(*), TOTAL(precio_unitario) FROM entradas_envases),
+        (SELECT MAX(id), COUNT(*), TOTAL(capacidad_litros) FROM envases),
+        (SELECT COUNT(*), TOTAL(proporcion) FROM composicion_colorantes)
+"""
+
+def firma_precios(conn):
+    """Tupla (max(id), count, sumas de valores) de las tablas de precios; si cambia, la foto quedó vieja."""
+    return tuple(conn.execute(_SQL_FIRMA).fetchone())
+
+class SnapshotPrecios:
+    """
+    Últimos precios de todas las MP y envases en arrays numpy ordenados por id.
+    Se arma con pocas consultas y después se consulta sin tocar la DB.
+    """
+
+    def __init__(self, mp_ids, mp_precios, envase_ids, envase_precios, envase_capacidades, composiciones, firma):
+        self.mp_ids = mp_ids                          # int64, ordenado
+        self.mp_precios = mp_precios                  # float64 (n, 4) en el orden de COLUMNAS_PRECIO
+        self.envase_ids = envase_ids                  # int64, ordenado
+        self.envase_precios = envase_precios          # float64, USD base
+        self.envase_capacidades = envase_capacidades  # float64, litros
+        self.composiciones = composiciones
+        self.firma = firma
+
+    @classmethod
+    def cargar(cls, conn):
+        """Lee de la DB todos los precios vigentes."""
+        firma = firma_precios(conn)
+        precios = obtener_precios_actuales(conn).sort_index()
+        envases = conn.execute(_SQL_ENVASES).fetchall()
+        envases = np.array([tuple(fila) for fila in envases], dtype=float).reshape(-1, 3)
+        return cls(
+            mp_ids=precios.index.to_numpy(dtype=np.int64),
+            mp_precios=precios[COLUMNAS_PRECIO].to_numpy(dtype=np.float64),
+            envase_ids=envases[:, 0].astype(np.int64),
+            envase_precios=envases[:, 1].copy(),
+            envase_capacidades=envases[:, 2].copy(),
+            composiciones=cargar_composiciones(conn),
+            firma=firma,
+        )
+
+    def precios_mp(self, materia_prima_ids, combinados=False):
+        """
+        Tabla de precios del motor para las MP pedidas (las que no tienen precio quedan con
+        (0.0, 0.0, 0.0, 1.0)). Con `combinados=True` las MP combinadas se costean por sus
+        componentes y puede lanzar ComposicionCiclicaError.
+        """
+        ids = sorted({int(mp_id) for mp_id in materia_prima_ids if mp_id != -1})
+        if not combinados:
+            return self._tabla_mp(ids)
+
+        orden = orden_topologico(self.composiciones, ids)
+        simples = componentes_simples(self.composiciones, orden)
+        precios_df = self._tabla_mp(sorted(simples.union(ids)))
+        resolver_precios_combinados(precios_df, self.composiciones, orden)
+        return precios_df.loc[ids]
+
+    def precio_mp(self, materia_prima_id, combinados=False):
+        """(precio_unitario, costo_flete, otros_costos, cotizacion_usd) de una MP."""
+        if materia_prima_id == -1:
+            return PRECIO_VACIO
+        return tuple(float(valor) for valor in self.precios_mp([materia_prima_id], combinados).iloc[0])
+
+    def precio_envase(self, envase_id):
+        """(precio_unitario_usd_base, capacidad_litros) de un envase; (0.0, 0.0) si no existe."""
+        if envase_id is None or envase_id == -1:
+            return 0.0, 0.0
+        posicion = np.searchsorted(self.envase_ids, envase_id)
+        if posicion < len(self.envase_ids) and self.envase_ids[posicion] == envase_id:
+            return float(self.envase_precios[posicion]), float(self.envase_capacidades[posicion])
+        return 0.0, 0.0
+
+    def precios_envases(self, envase_ids):
+        """Versión por columnas de `precio_envase`: arrays (precio_unitario_usd_base, capacidad_litros)."""
+        ids = pd.to_numeric(pd.Series(envase_ids, dtype=object), errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        precios = np.zeros(len(ids))
+        capacidades = np.zeros(len(ids))
+        if len(self.envase_ids):
+            posiciones = np.searchsorted(self.envase_ids, ids).clip(max=len(self.envase_ids) - 1)
+            encontrado = self.envase_ids[posiciones] == ids
+            precios[encontrado] = self.envase_precios[posiciones[encontrado]]
+            capacidades[encontrado] = self.envase_capacidades[posiciones[encontrado]]
+        return precios, capacidades
+
+    def _tabla_mp(self, ids):
+        """Arma la tabla de precios (indexada por materia_prima_id) con búsqueda binaria."""
+        ids = np.asarray(ids, dtype=np.int64)
+        valores = np.tile(np.array(PRECIO_VACIO, dtype=np.float64), (len(ids), 1))
+        if len(self.mp_ids):
+            posiciones = np.searchsorted(self.mp_ids, ids).clip(max=len(self.mp_ids) - 1)
+            encontrado = self.mp_ids[posiciones] == ids
+            valores[encontrado] = self.mp_precios[posiciones[encontrado]]
+        return pd.DataFrame(valores, columns=COLUMNAS_PRECIO, index=pd.Index(ids, name="materia_prima_id"))
+
+class CacheSnapshotPrecios:
+    """
+    Mantiene una `SnapshotPrecios` por base de datos y la rearma sólo cuando hay compras nuevas.
+    Primero mira `PRAGMA data_version` (no lee tablas); si otra conexión escribió algo,
+    compara la firma de las tablas de precios antes de volver a cargar.
+    """
+
+    def __init__(self, db_path):
+        self._conn = abrir_conexion(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._snapshot = None
+
+    def obtener(self):
+        """Devuelve la foto vigente, recargándola si cambiaron los precios."""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._snapshot is not None and data_version == self._data_version:
+                return self._snapshot
+            if self._snapshot is None or firma_precios(self._conn) != self._snapshot.firma:
+                self._snapshot = SnapshotPrecios.cargar(self._conn)
+            self._data_version = data_version
+            return self._snapshot
+
+    def invalidar(self):
+        """Fuerza la recarga en la próxima consulta."""
+        with self._lock:
+            self._snapshot = None
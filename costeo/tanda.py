@@ -0,0 +1,257 @@
+import hashlib
+import math
+
+import numpy as np
+import pandas as pd
+
+from costeo.motor import calcular_costo_mp
+
+# =================================================================================================
+# CONSTANTES DE PRODUCCIÓN
+# =================================================================================================
+BASE_LITROS = 200.0 # Cantidad base de la receta original (Litros)
+# CONSTANTES CLAVE BASADAS EN LA LÓGICA DE PRESUPUESTO
+RECETAS_DIARIAS = 8.0
+DIAS_HABILES_FIJOS_MENSUAL = 20.0
+VOLUMEN_MENSUAL_AUTOMATICO = RECETAS_DIARIAS * DIAS_HABILES_FIJOS_MENSUAL * BASE_LITROS # 32000.0 L
+
+# =================================================================================================
+# RECETA ESCALADA
+# =================================================================================================
+
+def factor_escala(cantidad_litros, base_litros=BASE_LITROS):
+    """Relación entre los litros simulados y la receta base."""
+    return cantidad_litros / base_litros if base_litros > 0 else 0.0
+
+def ingredientes_receta(conn, receta_id, cantidad_litros=BASE_LITROS):
+    """
+    Ingredientes de una receta en el formato del motor ('materia_prima_id', 'Materia Prima',
+    'Unidad', 'Cantidad Base (200L)', 'cantidad_simulada') escalados a `cantidad_litros`.
+    """
+    ingredientes_df = pd.read_sql_query("""
+        SELECT
+            mp.id AS materia_prima_id,
+            mp.nombre AS "Materia Prima",
+            mp.unidad AS "Unidad",
+            ri.cantidad AS "Cantidad Base (200L)"
+        FROM receta_ingredientes ri
+        JOIN materias_primas mp ON ri.materia_prima_id = mp.id
+        WHERE ri.receta_id = ?
+        ORDER BY mp.nombre
+    """, conn, params=(int(receta_id),))
+    ingredientes_df["cantidad_simulada"] = ingredientes_df["Cantidad Base (200L)"] * factor_escala(cantidad_litros)
+    return ingredientes_df
+
+# =================================================================================================
+# COSTO DE MP DE LA RECETA BASE (se escala sin volver a costear)
+# =================================================================================================
+
+# Entradas del motor que cambian el costo por litro (los litros no: el costo es lineal en el factor)
+COLUMNAS_CLAVE_BASE = ["materia_prima_id", "Materia Prima", "Unidad", "Cantidad Base (200L)", "precio_unitario_manual", "cotizacion_usd_manual"]
+
+# Columnas del detalle que dependen de la cantidad; el resto son costos unitarios
+COLUMNAS_DETALLE_ESCALABLES = ["Cantidad (Simulada)", "Costo Total ARS", "Costo Total USD"]
+
+def clave_costo_base(ingredientes_df, precios_df, cotizacion_dolar_actual):
+    """
+    Huella de todo lo que determina el costo de la receta base: ingredientes (cantidades base,
+    precios manuales), precios resueltos y dólar. Si sólo cambian los litros, la clave no cambia.
+    """
+    huella = hashlib.blake2b(digest_size=16)
+    columnas = [c for c in COLUMNAS_CLAVE_BASE if c in ingredientes_df.columns]
+    huella.update(repr(columnas).encode())
+    huella.update(pd.util.hash_pandas_object(ingredientes_df[columnas], index=False).to_numpy().tobytes())
+    huella.update(pd.util.hash_pandas_object(precios_df, index=True).to_numpy().tobytes())
+    return huella.hexdigest(), float(cotizacion_dolar_actual)
+
+def costear_mp_base(ingredientes_df, precios_df, cotizacion_dolar_actual):
+    """
+    Costo de MP de la receta base (factor 1) con el motor: la misma tupla de `calcular_costo_mp`,
+    con 'Cantidad (Simulada)' igual a 'Cantidad Base (200L)'. Se escala con `escalar_costo_mp`.
+    """
+    base_df = ingredientes_df.assign(cantidad_simulada=ingredientes_df["Cantidad Base (200L)"] if not ingredientes_df.empty else 0.0)
+    return calcular_costo_mp(base_df, precios_df, cotizacion_dolar_actual)
+
+def escalar_costo_mp(costo_base, factor):
+    """Escala la tupla de `costear_mp_base` a una tanda de `factor` veces la receta base."""
+    costo_mp_total, detalle_df, costo_total_mp_ars, costo_total_recargo_mp_ars, costo_total_mp_usd = costo_base
+    detalle_df = detalle_df.copy()
+    for columna in COLUMNAS_DETALLE_ESCALABLES:
+        detalle_df[columna] = detalle_df[columna] * factor
+    return (
+        costo_mp_total * factor,
+        detalle_df,
+        costo_total_mp_ars * factor,
+        costo_total_recargo_mp_ars * factor,
+        costo_total_mp_usd * factor,
+    )
+
+# =================================================================================================
+# FLETE, OVERHEAD Y EMPAQUE
+# =================================================================================================
+
+def costo_flete(flete_base, cantidad_litros, base_litros=BASE_LITROS):
+    """Flete de la tanda: el flete de la receta base escalado por litros."""
+    if cantidad_litros <= 0:
+        return 0.0
+    return flete_base * factor_escala(cantidad_litros, base_litros)
+
+def costo_indirecto_por_litro(gasto_fijo_mensual, volumen_mensual_litros, manual=0.0):
+    """Overhead por litro: el valor manual si es > 0, si no gasto fijo mensual / volumen mensual."""
+    if manual > 0.0:
+        return manual
+    if volumen_mensual_litros > 0:
+        return gasto_fijo_mensual / volumen_mensual_litros
+    return 0.0
+
+def unidades_envase(cantidad_litros, capacidad_litros):
+    """Envases necesarios para la tanda (redondeo hacia arriba al entero)."""
+    if cantidad_litros <= 0 or capacidad_litros <= 0:
+        return 0
+    return int(math.ceil(cantidad_litros / capacidad_litros))
+
+def precio_envase_ars(precio_usd_base_db, cotizacion_dolar_actual, precio_manual_ars=0.0):
+    """
+    Precio unitario del envase en ARS y en USD base: el manual (ARS) tiene prioridad;
+    si no, el último precio de la DB (USD) convertido con el dólar del día.
+    Devuelve (precio_envase_unitario_ars, precio_envase_unitario_usd_base).
+    """
+    if precio_manual_ars > 0.0:
+        return precio_manual_ars, precio_manual_ars / cotizacion_dolar_actual
+    return precio_usd_base_db * cotizacion_dolar_actual, precio_usd_base_db
+
+def calcular_empaque(cantidad_litros, capacidad_litros, precio_envase_unitario_ars, costo_etiqueta_por_envase=0.0, costo_caja_por_envase=0.0):
+    """
+    Costo de envase principal, etiqueta y caja de la tanda (todo en ARS).
+    Devuelve un dict con 'unidades_necesarias', 'costo_envase_total_ars', 'costo_etiqueta_total_ars',
+    'costo_caja_total_ars', 'costo_total_empaque_ars' y 'costo_envase_por_litro'.
+    """
+    unidades_necesarias = unidades_envase(cantidad_litros, capacidad_litros)
+    costo_envase_total_ars = unidades_necesarias * precio_envase_unitario_ars
+    costo_etiqueta_total_ars = unidades_necesarias * costo_etiqueta_por_envase
+    costo_caja_total_ars = unidades_necesarias * costo_caja_por_envase
+    costo_total_empaque_ars = costo_envase_total_ars + costo_etiqueta_total_ars + costo_caja_total_ars
+    return {
+        'unidades_necesarias': unidades_necesarias,
+        'costo_envase_total_ars': costo_envase_total_ars,
+        'costo_etiqueta_total_ars': costo_etiqueta_total_ars,
+        'costo_caja_total_ars': costo_caja_total_ars,
+        'costo_total_empaque_ars': costo_total_empaque_ars,
+        'costo_envase_por_litro': costo_total_empaque_ars / cantidad_litros if cantidad_litros > 0 else 0.0,
+    }
+
+# =================================================================================================
+# TOTALES DE LA TANDA Y MARGEN
+# =================================================================================================
+
+def totales_tanda(costo_mp_total, costo_total_mp_usd, cantidad_litros, cotizacion_dolar_actual, flete_base=0.0, costo_indirecto_litro=0.0, costo_total_empaque_ars=0.0):
+    """
+    Suma MP + Flete + Overhead + Empaque de la tanda.
+    'costo_total_final_usd' toma la MP a su valor USD registrado y el resto convertido al dólar del día;
+    'costo_por_litro_usd' convierte el costo por litro en ARS.
+    """
+    costo_flete_total_ars = costo_flete(flete_base, cantidad_litros)
+    gasto_indirecto_tanda = costo_indirecto_litro * cantidad_litros
+    costo_total_final = costo_mp_total + costo_flete_total_ars + gasto_indirecto_tanda + costo_total_empaque_ars
+
+    costo_no_mp_usd = (costo_flete_total_ars + gasto_indirecto_tanda + costo_total_empaque_ars) / cotizacion_dolar_actual
+    costo_por_litro_ars = costo_total_final / cantidad_litros if cantidad_litros > 0 else 0.0
+    return {
+        'costo_flete_total_ars': costo_flete_total_ars,
+        'gasto_indirecto_tanda': gasto_indirecto_tanda,
+        'costo_total_empaque_ars': costo_total_empaque_ars,
+        'costo_total_final': costo_total_final,
+        'costo_total_final_usd': costo_total_mp_usd + costo_no_mp_usd,
+        'costo_por_litro_ars': costo_por_litro_ars,
+        'costo_por_litro_usd': costo_por_litro_ars / cotizacion_dolar_actual if cotizacion_dolar_actual > 0 else 0.0,
+    }
+
+def precio_con_margen(costo, margen_ganancia):
+    """Precio de venta aplicando el margen (%) sobre el costo. Acepta escalares o Series."""
+    return costo * (1 + margen_ganancia / 100.0)
+
+def margen_desde_precio(precio_venta, costo):
+    """Margen (%) que resulta de vender a `precio_venta` algo que cuesta `costo`."""
+    return (precio_venta - costo) / costo * 100 if costo > 0 else 0.0
+
+def costear_tanda(ingredientes_df, precios_df, cantidad_litros, cotizacion_dolar_actual, flete_base=0.0, costo_indirecto_litro=0.0, empaque=None):
+    """
+    Costeo completo de una tanda sin interfaz: MP (motor vectorizado) + Flete + Overhead + Empaque.
+    `empaque` es el dict de `calcular_empaque` (o None si la tanda es a granel).
+    Devuelve un dict con los totales de `totales_tanda`, los de MP y 'detalle_df'.
+    """
+    costo_mp_total, detalle_df, costo_mp_base_ars, costo_recargo_mp_ars, costo_total_mp_usd = calcular_costo_mp(
+        ingredientes_df, precios_df, cotizacion_dolar_actual
+    )
+    costo_total_empaque_ars = empaque['costo_total_empaque_ars'] if empaque else 0.0
+    resultado = totales_tanda(
+        costo_mp_total, costo_total_mp_usd, cantidad_litros, cotizacion_dolar_actual,
+        flete_base, costo_indirecto_litro, costo_total_empaque_ars
+    )
+    resultado.update({
+        'costo_mp_total': costo_mp_total,
+        'costo_mp_base_ars': costo_mp_base_ars,
+        'costo_recargo_mp_ars': costo_recargo_mp_ars,
+        'costo_total_mp_usd': costo_total_mp_usd,
+        'detalle_df': detalle_df,
+    })
+    if empaque:
+        resultado.update(empaque)
+    return resultado
+
+# =================================================================================================
+# BARRIDO DE VOLUMEN (costo por litro para muchos litros a la vez)
+# =================================================================================================
+
+def volumenes_barrido(minimo, maximo, puntos, extra=(), capacidad_litros=0.0, max_saltos=2000):
+    """
+    Grilla ordenada de litros: `puntos` valores equiespaciados entre `minimo` y `maximo` más los de `extra`.
+    Con `capacidad_litros` agrega cada múltiplo de la capacidad y un valor apenas mayor (hasta `max_saltos`
+    múltiplos), para que el gráfico muestre el salto de cada envase nuevo.
+    """
+    grilla = [np.linspace(float(minimo), float(maximo), max(int(puntos), 2))]
+    grilla.append(np.asarray([v for v in extra if minimo <= v <= maximo], dtype=float))
+    if capacidad_litros > 0:
+        multiplos = np.arange(math.ceil(minimo / capacidad_litros), math.floor(maximo / capacidad_litros) + 1) * capacidad_litros
+        if 0 < len(multiplos) <= max_saltos:
+            grilla.append(multiplos)
+            grilla.append(np.minimum(multiplos + min(capacidad_litros, 1.0) * 1e-3, maximo))
+    return np.unique(np.concatenate(grilla))
+
+def barrido_volumen(litros, costo_mp_base, costo_mp_base_usd, cotizacion_dolar_actual, flete_base=0.0, costo_indirecto_litro=0.0,
+                    capacidad_litros=0.0, precio_envase_unitario_ars=0.0, costo_etiqueta_por_envase=0.0, costo_caja_por_envase=0.0,
+                    base_litros=BASE_LITROS):
+    """
+    Costeo de la tanda para cada volumen de `litros` en una sola pasada por columnas, con las mismas reglas
+    que `totales_tanda` y `calcular_empaque`: MP y flete escalados desde la receta base (`costo_mp_base` en ARS
+    y `costo_mp_base_usd` para `base_litros`), overhead por litro y envases/etiquetas/cajas redondeados hacia arriba.
+    Devuelve un DataFrame con una fila por volumen.
+    """
+    litros = np.asarray(litros, dtype=float)
+    factor = litros / base_litros if base_litros > 0 else np.zeros_like(litros)
+    validos = litros > 0
+
+    costo_mp = costo_mp_base * factor
+    costo_flete_total = np.where(validos, flete_base * factor, 0.0)
+    gasto_indirecto = costo_indirecto_litro * litros
+    if capacidad_litros > 0:
+        unidades = np.where(validos, np.ceil(litros / capacidad_litros), 0.0)
+    else:
+        unidades = np.zeros_like(litros)
+    costo_empaque = unidades * (precio_envase_unitario_ars + costo_etiqueta_por_envase + costo_caja_por_envase)
+
+    costo_total = costo_mp + costo_flete_total + gasto_indirecto + costo_empaque
+    costo_no_mp_usd = (costo_flete_total + gasto_indirecto + costo_empaque) / cotizacion_dolar_actual
+    costo_por_litro = np.divide(costo_total, litros, out=np.zeros_like(litros), where=validos)
+    return pd.DataFrame({
+        "Litros": litros,
+        "Unidades": unidades.astype(int),
+        "Costo MP (ARS)": costo_mp,
+        "Flete (ARS)": costo_flete_total,
+        "Overhead (ARS)": gasto_indirecto,
+        "Empaque (ARS)": costo_empaque,
+        "Costo Total (ARS)": costo_total,
+        "Costo Total (USD)": costo_mp_base_usd * factor + costo_no_mp_usd,
+        "Costo por Litro (ARS/L)": costo_por_litro,
+        "Costo por Litro (USD/L)": costo_por_litro / cotizacion_dolar_actual if cotizacion_dolar_actual > 0 else 0.0,
+    })
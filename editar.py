@@ -2,6 +2,9 @@ import streamlit as st
 import sqlite3
 import pandas as pd
 
+from costeo.catalogos import obtener_catalogo
+from costeo.conexion import obtener_conexion
+
 # =================================================================================================
 # CONFIGURACIÓN Y CONSTANTES
 # =================================================================================================
@@ -12,10 +15,8 @@ DB_PATH = "minerva.db"
 # =================================================================================================
 
 def get_connection():
-    """Establece la conexión a la base de datos."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row 
-    return conn
+    """Conexión a la base de datos: la del pool del hilo actual (WAL y PRAGMAs ya aplicados)."""
+    return obtener_conexion(DB_PATH)
 
 def fetch_df(query, params=()):
     """Ejecuta una consulta SELECT y devuelve los resultados como un DataFrame de Pandas."""
@@ -30,17 +31,15 @@ def fetch_df(query, params=()):
     return df
 
 def get_recetas():
-    """Obtiene todas las recetas."""
-    query = "SELECT id, nombre FROM recetas ORDER BY nombre"
-    df = fetch_df(query)
+    """Obtiene todas las recetas (catálogo en memoria)."""
+    df = obtener_catalogo(DB_PATH, "recetas")
     if df.empty:
         return {}
     return df.set_index('id')['nombre'].to_dict()
 
 def get_materias_primas():
-    """Obtiene todas las materias primas para validación y referencia."""
-    query = "SELECT id, nombre, unidad FROM materias_primas ORDER BY nombre"
-    df = fetch_df(query)
+    """Obtiene todas las materias primas para validación y referencia (catálogo en memoria)."""
+    df = obtener_catalogo(DB_PATH, "materias_primas")
     if df.empty:
         return {}
     
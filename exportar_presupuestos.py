@@ -0,0 +1,175 @@
+"""
+Reemisión masiva de presupuestos guardados en PDF, en un solo ZIP.
+
+    python exportar_presupuestos.py --desde 2025-09-01 --hasta 2025-09-30 --salida presupuestos_septiembre.zip
+    python exportar_presupuestos.py --clientes 3 7 --desde 2025-01-01 --hasta 2025-12-31 --procesos 4
+
+Cada PDF se rearma desde `detalle_simulaciones_json` y se genera con el mismo ReportLab de los
+simuladores (a granel: simulador_costo.py; con envase: pdf_produccion_envases.py para los de
+Produccion Envases y simulacion_envasases.py para las filas de sesión) en un pool de
+procesos. Los PDFs se escriben en el ZIP a medida que terminan: en memoria sólo quedan los que
+están en curso.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+from costeo.conexion import abrir_conexion
+
+# =================================================================================================
+# CONFIGURACIÓN
+# =================================================================================================
+DB_PATH = "minerva.db"
+
+# Presupuestos de los clientes pedidos (lista de ids como JSON; NULL = todos) entre dos fechas
+SQL_PRESUPUESTOS_EXPORTAR = """
+    SELECT p.id, p.fecha, p.precio_final_ars, p.volumen_total_litros, p.detalle_simulaciones_json, c.nombre AS cliente_nombre
+    FROM presupuestos p
+    JOIN clientes c ON c.id = p.cliente_id
+    WHERE p.fecha BETWEEN ? AND ?
+      AND (?3 IS NULL OR p.cliente_id IN (SELECT value FROM json_each(?3)))
+    ORDER BY p.fecha, p.id
+"""
+
+# Columnas de las filas de sesión guardadas tal cual -> columnas que usan los PDFs
+COLUMNAS_SESION = {
+    "nombre_receta": "Receta",
+    "litros": "Litros",
+    "precio_venta_total_ars": "Precio_Venta_Total_ARS",
+    "precio_venta_total_usd": "Precio_Venta_Total_USD",
+}
+
+# =================================================================================================
+# DATOS DE IMPRESIÓN A PARTIR DEL JSON GUARDADO
+# =================================================================================================
+
+def presupuestos_a_exportar(conn, desde, hasta, cliente_ids=None):
+    """Presupuestos guardados entre `desde` y `hasta` (ISO, inclusive), opcionalmente de algunos clientes."""
+    clientes = json.dumps([int(cliente_id) for cliente_id in cliente_ids]) if cliente_ids else None
+    return pd.read_sql_query(SQL_PRESUPUESTOS_EXPORTAR, conn, params=(str(desde), str(hasta), clientes))
+
+def datos_impresion(presupuesto):
+    """
+    (tipo, data) para `generate_pdf_reportlab` a partir de una fila de `presupuestos_a_exportar`.
+    Tipo 'produccion_envases' si el detalle trae Envase_Nombre/Capacidad_Litros en cada fila (Produccion
+    Envases), 'envase' si trae el envase como JSON anidado (simulacion_envasases.py), si no 'granel'.
+    La cotización no se guarda con el presupuesto: se deduce de los totales ARS/USD del detalle. La fecha
+    impresa es la del presupuesto guardado, no la de la exportación.
+    """
+    detalle_df = pd.DataFrame(json.loads(presupuesto["detalle_simulaciones_json"] or "[]"))
+    produccion_envases = "Envase_Nombre" in detalle_df.columns
+    if "envase_info_json" in detalle_df.columns:
+        # simulacion_envasases.py guarda las filas de la sesión con el envase como JSON anidado
+        envase_df = detalle_df.pop("envase_info_json").apply(lambda x: json.loads(x) if isinstance(x, str) else {}).apply(pd.Series)
+        detalle_df = pd.concat([detalle_df, envase_df], axis=1)
+    detalle_df = detalle_df.rename(columns={
+        nombre: nuevo for nombre, nuevo in COLUMNAS_SESION.items()
+        if nombre in detalle_df.columns and nuevo not in detalle_df.columns
+    })
+    if produccion_envases:
+        tipo = "produccion_envases"
+    else:
+        tipo = "envase" if "Envase_Nombre" in detalle_df.columns else "granel"
+    if tipo == "granel" and "Precio_Venta_Unitario_ARS" not in detalle_df.columns and not detalle_df.empty:
+        detalle_df["Precio_Venta_Unitario_ARS"] = detalle_df["Precio_Venta_Total_ARS"] / detalle_df["Litros"]
+        detalle_df["Precio_Venta_Unitario_USD"] = detalle_df["Precio_Venta_Total_USD"] / detalle_df["Litros"]
+
+    total_usd = detalle_df["Precio_Venta_Total_USD"].sum() if "Precio_Venta_Total_USD" in detalle_df else 0.0
+    total_ars = detalle_df["Precio_Venta_Total_ARS"].sum() if "Precio_Venta_Total_ARS" in detalle_df else 0.0
+    litros = float(presupuesto["volumen_total_litros"] or 0.0)
+    precio_final_ars = float(presupuesto["precio_final_ars"] or 0.0)
+    return tipo, {
+        "cliente_nombre": presupuesto["cliente_nombre"],
+        "cotizacion_dolar_actual": total_ars / total_usd if total_usd > 0 else 1.0,
+        "presupuesto_id": int(presupuesto["id"]),
+        "fecha": presupuesto["fecha"],
+        "precio_unitario_ars_litro": precio_final_ars / litros if litros > 0 else 0.0,
+        "precio_final_ars": precio_final_ars,
+        "litros_total_acumulado": litros,
+        "df_detalle_final_presupuesto": detalle_df,
+    }
+
+def nombre_archivo(presupuesto):
+    """Nombre del PDF dentro del ZIP (mismo formato que la descarga de los simuladores)."""
+    return f"Presupuesto_{int(presupuesto['id'])}_{str(presupuesto['cliente_nombre']).replace(' ', '_')}.pdf"
+
+# =================================================================================================
+# WORKERS (cada proceso importa los simuladores una sola vez)
+# =================================================================================================
+_renderizadores = {}
+
+def _iniciar_worker():
+    import pdf_produccion_envases
+    import simulacion_envasases
+    import simulador_costo
+    _renderizadores["granel"] = simulador_costo.generate_pdf_reportlab
+    _renderizadores["envase"] = simulacion_envasases.generate_pdf_reportlab
+    _renderizadores["produccion_envases"] = pdf_produccion_envases.generate_pdf_reportlab
+
+def renderizar_presupuesto(presupuesto):
+    """(nombre del archivo, bytes del PDF) de un presupuesto guardado."""
+    tipo, data = datos_impresion(presupuesto)
+    return nombre_archivo(presupuesto), _renderizadores[tipo](data)
+
+# =================================================================================================
+# ORQUESTACIÓN
+# =================================================================================================
+
+def exportar_zip(presupuestos_df, destino, procesos=None, en_curso=None, progreso=None):
+    """
+    Genera los PDFs de `presupuestos_df` en un pool de procesos y los agrega a `destino` (ruta o archivo
+    binario) a medida que salen. Hay como máximo `en_curso` PDFs pendientes (default: 2 por proceso).
+    `progreso(hechos, total)` se llama después de cada PDF. Devuelve la cantidad exportada.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    en_curso = en_curso or 2 * procesos
+    presupuestos = iter(presupuestos_df.to_dict("records"))
+    total = len(presupuestos_df)
+    hechos = 0
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker) as pool, \
+            zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zip_salida:
+        pendientes = deque(pool.submit(renderizar_presupuesto, p) for p in islice(presupuestos, en_curso))
+        while pendientes:
+            nombre, pdf = pendientes.popleft().result()
+            zip_salida.writestr(nombre, pdf)
+            hechos += 1
+            siguiente = next(presupuestos, None)
+            if siguiente is not None:
+                pendientes.append(pool.submit(renderizar_presupuesto, siguiente))
+            if progreso:
+                progreso(hechos, total)
+    return hechos
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reemisión masiva de presupuestos en PDF (un ZIP).")
+    parser.add_argument("--db", default=DB_PATH, help="Ruta a la base SQLite (default: minerva.db)")
+    parser.add_argument("--desde", required=True, help="Fecha inicial (AAAA-MM-DD, inclusive)")
+    parser.add_argument("--hasta", required=True, help="Fecha final (AAAA-MM-DD, inclusive)")
+    parser.add_argument("--clientes", type=int, nargs="*", default=None, help="IDs de cliente (default: todos)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (default: CPUs)")
+    parser.add_argument("--salida", default="presupuestos.zip", help="Archivo ZIP de salida")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"No existe la base de datos: {args.db}")
+
+    conn = abrir_conexion(args.db, solo_lectura=True)
+    try:
+        presupuestos_df = presupuestos_a_exportar(conn, args.desde, args.hasta, args.clientes)
+    finally:
+        conn.close()
+
+    inicio = time.perf_counter()
+    cantidad = exportar_zip(presupuestos_df, args.salida, args.procesos)
+    print(f"{cantidad} presupuestos exportados en {time.perf_counter() - inicio:.2f}s -> {args.salida}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
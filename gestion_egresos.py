@@ -3,6 +3,9 @@ import sqlite3
 import pandas as pd
 from datetime import date
 
+from costeo.catalogos import obtener_catalogo
+from costeo.conexion import obtener_conexion
+
 # =================================================================================================
 # CONFIG
 # =================================================================================================
@@ -12,10 +15,8 @@ DB_PATH = "minerva.db"
 # UTILIDADES DB (Tomadas de sus otros archivos)
 # =================================================================================================
 def get_connection():
-    """Establece la conexión a la base de datos."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Conexión a la base de datos: la del pool del hilo actual (WAL y PRAGMAs ya aplicados)."""
+    return obtener_conexion(DB_PATH)
 
 def fetch_df(query, params=()):
     """Ejecuta una consulta SELECT y devuelve los resultados como un DataFrame de Pandas."""
@@ -61,8 +62,9 @@ def crear_tabla_gastos():
         conn.close()
 
 def get_categorias_egreso():
-    """Obtiene solo las categorías de tipo EGRESO para la clasificación de gastos."""
-    return fetch_df("SELECT id, nombre FROM categorias_imputacion WHERE tipo = 'EGRESO' ORDER BY nombre")
+    """Obtiene solo las categorías de tipo EGRESO para la clasificación de gastos (catálogo en memoria)."""
+    df = obtener_catalogo(DB_PATH, "categorias_imputacion")
+    return df.loc[df["tipo"] == "EGRESO", ["id", "nombre"]].reset_index(drop=True)
 
 def registrar_gasto(fecha_factura, fecha_pago, beneficiario, categoria_id, comprobante, importe, obs):
     """Inserta un nuevo registro de gasto en la base de datos."""
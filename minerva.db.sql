@@ -640,4 +640,42 @@ CREATE TABLE IF NOT EXISTS "ventas" (
 	PRIMARY KEY("id" AUTOINCREMENT),
 	FOREIGN KEY("cliente_id") REFERENCES "clientes"("id")
 );
+CREATE INDEX IF NOT EXISTS "idx_compras_mp_fecha" ON "compras_materia_prima" (
+	"materia_prima_id",
+	"fecha"	DESC,
+	"id"	DESC,
+	"precio_unitario",
+	"cotizacion_usd",
+	"moneda"
+);
+CREATE INDEX IF NOT EXISTS "idx_precios_mp_fecha" ON "precios_materias_primas" (
+	"materia_prima_id",
+	"fecha"	DESC,
+	"id"	DESC,
+	"precio_unitario",
+	"costo_flete",
+	"otros_costos",
+	"cotizacion_usd"
+);
+CREATE INDEX IF NOT EXISTS "idx_entradas_envases_fecha" ON "entradas_envases" (
+	"envase_id",
+	"fecha_ingreso"	DESC,
+	"id"	DESC,
+	"precio_unitario"
+);
+CREATE INDEX IF NOT EXISTS "idx_receta_ingredientes_receta" ON "receta_ingredientes" (
+	"receta_id",
+	"materia_prima_id",
+	"cantidad"
+);
+CREATE INDEX IF NOT EXISTS "idx_composicion_combinado" ON "composicion_colorantes" (
+	"colorante_combinado_id",
+	"colorante_primario_id",
+	"proporcion"
+);
+CREATE INDEX IF NOT EXISTS "idx_gastos_fecha" ON "gastos" (
+	"fecha_factura",
+	"categoria_id",
+	"importe_total"
+);
 COMMIT;
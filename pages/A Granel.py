@@ -7,6 +7,30 @@ import json
 import base64 
 import io
 
+from cache_costeo import calcular_costo_tanda_mp
+from cache_precios import dolar_sugerido, obtener_precios_materias_primas
+from costeo import (
+    BASE_LITROS,
+    VOLUMEN_MENSUAL_AUTOMATICO,
+    SQL_DETALLE_GASTOS_MES,
+    calcular_costo_mp,
+    costo_indirecto_por_litro,
+    factor_escala,
+    ids_a_resolver,
+    precio_con_margen,
+    precio_unitario_usd_base,
+    rango_mes,
+    total_gastos_mes,
+    totales_tanda,
+)
+from costeo.catalogos import invalidar_catalogos, obtener_catalogo
+from costeo.conexion import obtener_conexion
+from costeo.migraciones import aplicar_migraciones
+from costeo.presupuestos import guardar_items_presupuesto
+from costeo.perfil import marcar_seccion
+from panel_perfil import perfil_pagina
+from panel_sensibilidad import items_sensibilidad, mostrar_sensibilidad_dolar
+
 # =================================================================================================
 # IMPORTACIONES REPORTLAB 
 # =================================================================================================
@@ -21,21 +45,15 @@ from reportlab.lib.pagesizes import A4, landscape
 # CONFIGURACIÓN Y CONSTANTES
 # =================================================================================================
 DB_PATH = "minerva.db"
-BASE_LITROS = 200.0 # Cantidad base de la receta original (Litros)
-# CONSTANTES CLAVE BASADAS EN LA LÓGICA DE PRESUPUESTO
-RECETAS_DIARIAS = 8.0 
-DIAS_HABILES_FIJOS_MENSUAL = 20.0 
-VOLUMEN_MENSUAL_AUTOMATICO = RECETAS_DIARIAS * DIAS_HABILES_FIJOS_MENSUAL * BASE_LITROS # 32000.0 L
+# BASE_LITROS y VOLUMEN_MENSUAL_AUTOMATICO vienen de `costeo` (compartidas por todos los simuladores)
 
 # =================================================================================================
 # UTILIDADES DB
 # =================================================================================================
 
 def get_connection():
-    """Establece la conexión a la base de datos."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row 
-    return conn
+    """Conexión a la base de datos: la del pool del hilo actual (WAL y PRAGMAs ya aplicados)."""
+    return obtener_conexion(DB_PATH)
 
 def fetch_df(query, params=()):
     """Ejecuta una consulta SELECT y devuelve los resultados como un DataFrame de Pandas."""
@@ -51,12 +69,12 @@ def fetch_df(query, params=()):
     return df
 
 def get_categoria_id_by_name(category_name):
-    """Busca el ID de una categoría por su nombre."""
-    query = "SELECT id FROM categorias_imputacion WHERE nombre = ?"
-    df = fetch_df(query, (category_name,))
+    """Busca el ID de una categoría por su nombre (en el catálogo en memoria)."""
+    df = obtener_catalogo(DB_PATH, "categorias_imputacion")
+    df = df[df["nombre"] == category_name]
     if df.empty:
         return None
-    return df.iloc[0, 0]
+    return df["id"].iloc[0]
 
 # NOTA: La función 'get_detalle_gastos_mensual' fue eliminada ya que el total ahora se calcula
 # directamente desde el st.data_editor en el sidebar.
@@ -90,16 +108,20 @@ def create_tables_if_not_exists(conn):
     
     conn.commit()
 
+    # Índices y demás cambios de esquema versionados (no hace nada si ya están aplicados)
+    aplicar_migraciones(conn)
+
 def get_or_create_client(conn, client_name):
-    """Obtiene el ID del cliente o lo crea si no existe."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM clientes WHERE nombre = ?", (client_name,))
-    row = cursor.fetchone()
-    if row:
-        return row['id']
+    """Obtiene el ID del cliente (del catálogo en memoria) o lo crea si no existe."""
+    df_clientes = obtener_catalogo(DB_PATH, "clientes")
+    existentes = df_clientes.loc[df_clientes["nombre"] == client_name, "id"]
+    if not existentes.empty:
+        return int(existentes.iloc[0])
     else:
+        cursor = conn.cursor()
         cursor.execute("INSERT INTO clientes (nombre) VALUES (?)", (client_name,))
         conn.commit()
+        invalidar_catalogos(DB_PATH, "clientes")
         return cursor.lastrowid
 
 def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json):
@@ -110,6 +132,8 @@ def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros
         INSERT INTO presupuestos (cliente_id, fecha, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json)
         VALUES (?, ?, ?, ?, ?, ?, ?)
     """, (cliente_id, fecha_hoy, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json))
+    # Renglones en presupuesto_items (misma transacción) para los reportes por receta
+    guardar_items_presupuesto(conn, cursor.lastrowid)
     conn.commit()
     return cursor.lastrowid 
 
@@ -119,23 +143,11 @@ def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros
 # =================================================================================================
 
 def get_detalle_gastos_operativos_mensual(mes: int, anio: int):
-    """Obtiene el detalle de gastos operativos para un mes y año específico."""
-    query = f"""
-    SELECT
-        g.fecha_factura AS Fecha,
-        ci.nombre AS Categoria,
-        g.beneficiario_nombre AS Beneficiario,
-        g.importe_total AS Monto_ARS
-    FROM
-        gastos g
-    JOIN
-        categorias_imputacion ci ON g.categoria_id = ci.id
-    WHERE
-        strftime('%Y', g.fecha_factura) = '{anio}' AND strftime('%m', g.fecha_factura) = '{mes:02d}'
-    ORDER BY
-        g.fecha_factura, ci.nombre;
     """
-    df_gastos = fetch_df(query) 
+    Obtiene el detalle de gastos operativos para un mes y año específico.
+    Filtra por rango de fechas [1° del mes, 1° del mes siguiente) para usar el índice de fecha_factura.
+    """
+    df_gastos = fetch_df(SQL_DETALLE_GASTOS_MES, rango_mes(mes, anio))
     return df_gastos
 
 # =================================================================================================
@@ -143,10 +155,8 @@ def get_detalle_gastos_operativos_mensual(mes: int, anio: int):
 # =================================================================================================
 
 def obtener_todas_materias_primas(conn):
-    """Obtiene la lista completa de materias primas disponibles con IDs."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, nombre, unidad FROM materias_primas ORDER BY nombre")
-    return [dict(row) for row in cursor.fetchall()]
+    """Obtiene la lista completa de materias primas disponibles con IDs (catálogo en memoria)."""
+    return obtener_catalogo(DB_PATH, "materias_primas")[["id", "nombre", "unidad"]].to_dict("records")
 
 def obtener_ingredientes_receta(conn, receta_id):
     """Obtiene los ingredientes actuales de una receta."""
@@ -168,133 +178,21 @@ def obtener_ingredientes_receta(conn, receta_id):
 def obtener_precio_actual_materia_prima(conn, materia_prima_id):
     """
     Obtiene el último precio unitario y la cotización USD registrada.
+    Las MP combinadas (ej: SERUM) se costean sumando sus partes.
     """
     if materia_prima_id == -1:
         return 0.0, 0.0, 0.0, 1.0
+    return tuple(obtener_precios_materias_primas(DB_PATH, [materia_prima_id]).iloc[0])
 
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT precio_unitario, cotizacion_usd, moneda
-        FROM compras_materia_prima
-        WHERE materia_prima_id = ?
-        ORDER BY fecha DESC, id DESC
-        LIMIT 1
-    """, (materia_prima_id,))
-    
-    compra = cursor.fetchone()
-    if compra:
-        precio_base = compra['precio_unitario']
-        costo_flete = 0.0 
-        otros_costos = 0.0 
-        cotizacion_usd_reg = compra['cotizacion_usd'] if compra['cotizacion_usd'] is not None else 1.0
-        moneda = compra['moneda']
-        
-        if moneda == 'ARS' and cotizacion_usd_reg <= 1.0:
-            return precio_base, costo_flete, otros_costos, 1.0
-        else:
-            return precio_base, costo_flete, otros_costos, cotizacion_usd_reg
-    else:
-        cursor.execute("""
-            SELECT precio_unitario, costo_flete, otros_costos, cotizacion_usd
-            FROM precios_materias_primas
-            WHERE materia_prima_id = ?
-            ORDER BY fecha DESC
-            LIMIT 1
-        """, (materia_prima_id,))
-        precio = cursor.fetchone()
-        if precio:
-            return precio['precio_unitario'], precio['costo_flete'], precio['otros_costos'], precio['cotizacion_usd']
-        
-        return 0.0, 0.0, 0.0, 1.0
-
-def calcular_costo_total(ingredientes_df, cotizacion_dolar_actual, conn):
+def calcular_costo_total(ingredientes_df, cotizacion_dolar_actual, conn, precios_df=None):
     """
     Calcula el costo total SÓLO de la Materia Prima en ARS.
+    Los precios salen de la foto en memoria (o se reutiliza `precios_df`)
+    y el cálculo por columnas lo hace el motor de `costeo`.
     """
-    detalle_costo = []
-    
-    RECARGO_FIJO_USD_PERCENT = 0.03 # 3%
-    
-    costo_total_mp_ars = 0.0
-    costo_total_recargo_mp_ars = 0.0 
-    costo_total_mp_usd = 0.0 # <-- AÑADIDO: Costo total de MP (Base + Recargo) en USD
-    
-    for index, ingrediente in ingredientes_df.iterrows():
-        materia_prima_id = ingrediente["materia_prima_id"]
-        cantidad_usada = ingrediente["cantidad_simulada"]
-        nombre_mp = ingrediente["Materia Prima"]
-        
-        precio_manual_unitario = ingrediente.get('precio_unitario_manual', 0.0)
-        cotizacion_manual = ingrediente.get('cotizacion_usd_manual', 1.0)
-
-        cotizacion_usd_reg_bd = 1.0 
-
-        precio_base_usd_final = 0.0 
-        costo_unitario_ars_registrado = 0.0 
-
-        if precio_manual_unitario > 0.0:
-            if cotizacion_manual > 1.0:
-                precio_base_usd_final = precio_manual_unitario
-                cotizacion_usd_reg_bd = cotizacion_manual
-            else:
-                costo_unitario_ars_registrado = precio_manual_unitario
-        
-        elif materia_prima_id != -1:
-            precio_unitario_reg_base, _, _, cotizacion_usd_reg_bd = \
-                obtener_precio_actual_materia_prima(conn, materia_prima_id)
-            
-            if cotizacion_usd_reg_bd > 1.0:
-                precio_base_usd_final = precio_unitario_reg_base 
-            else:
-                costo_unitario_ars_registrado = precio_unitario_reg_base
-                
-        recargo_unitario_ars = 0.0
-        recargo_unitario_usd = 0.0 
-        
-        if precio_base_usd_final > 0.0:
-            recargo_unitario_usd = precio_base_usd_final * RECARGO_FIJO_USD_PERCENT
-            recargo_unitario_ars = recargo_unitario_usd * cotizacion_dolar_actual
-            costo_base_mp_ars_real = precio_base_usd_final * cotizacion_dolar_actual
-            moneda_origen = f'USD ({cotizacion_usd_reg_bd:.2f})'
-        else:
-            costo_base_mp_ars_real = costo_unitario_ars_registrado
-            moneda_origen = 'ARS (Fijo)'
-            precio_base_usd_final = 0.0
-        
-        costo_base_mp_total_ars = cantidad_usada * costo_base_mp_ars_real
-        recargo_mp_total_ars_ingrediente = cantidad_usada * recargo_unitario_ars
-        
-        costo_unitario_final_ars = costo_base_mp_ars_real + recargo_unitario_ars
-        costo_ingrediente_total = cantidad_usada * costo_unitario_final_ars
-        
-        costo_unitario_usd_total = precio_base_usd_final + recargo_unitario_usd 
-        costo_total_usd_ingrediente = cantidad_usada * costo_unitario_usd_total 
-        
-        costo_total_mp_ars += costo_base_mp_total_ars
-        costo_total_recargo_mp_ars += recargo_mp_total_ars_ingrediente 
-        costo_total_mp_usd += costo_total_usd_ingrediente # <-- AÑADIDO: Acumular costo total MP en USD
-        
-        detalle_costo.append({
-            "Materia Prima": nombre_mp,
-            "Unidad": ingrediente["Unidad"],
-            "Cantidad (Simulada)": cantidad_usada,
-            "Moneda Origen": moneda_origen, 
-            "Costo Unit. ARS (Base)": costo_base_mp_ars_real, 
-            "Recargo 3% ARS (Unit.)": recargo_unitario_ars, 
-            "Costo Unit. ARS (Total)": costo_unitario_final_ars,
-            "Costo Total ARS": costo_ingrediente_total,
-            "Costo Unit. USD (Base)": precio_base_usd_final, 
-            "Recargo 3% USD (Unit.)": recargo_unitario_usd, 
-            "Costo Unit. USD (Total)": costo_unitario_usd_total, 
-            "Costo Total USD": costo_total_usd_ingrediente 
-        })
-
-    detalle_df = pd.DataFrame(detalle_costo) 
-    costo_mp_total = detalle_df["Costo Total ARS"].sum() 
-    
-    # <-- RETORNO MODIFICADO: Ahora incluye el costo_total_mp_usd
-    return costo_mp_total, detalle_df, costo_total_mp_ars, costo_total_recargo_mp_ars, costo_total_mp_usd
-
+    if precios_df is None:
+        precios_df = obtener_precios_materias_primas(DB_PATH, ids_a_resolver(ingredientes_df))
+    return calcular_costo_mp(ingredientes_df, precios_df, cotizacion_dolar_actual)
 
 # =================================================================================================
 # FUNCIONES DE GENERACIÓN DE REPORTE (PDF con ReportLab) (MODIFICADO)
@@ -306,7 +204,8 @@ def generate_pdf_reportlab(data):
     """
     
     cliente_nombre = data['cliente_nombre']
-    fecha_hoy = date.today().strftime('%d/%m/%Y')
+    # Fecha con que se guardó el presupuesto (reemisión); en una cotización en curso, la de hoy
+    fecha_presupuesto = (date.fromisoformat(str(data['fecha'])[:10]) if data.get('fecha') else date.today()).strftime('%d/%m/%Y')
     cotizacion_dolar_actual = data['cotizacion_dolar_actual']
     presupuesto_id = data['presupuesto_id']
     
@@ -339,7 +238,7 @@ def generate_pdf_reportlab(data):
     
     # MODIFICACIÓN: Número de Presupuesto encima de la fecha
     story.append(Paragraph(f"**Número de Presupuesto:** {presupuesto_id}", styles['BodyTextBold']))
-    story.append(Paragraph(f"**Fecha del Presupuesto:** {fecha_hoy}", styles['BodyTextBold']))
+    story.append(Paragraph(f"**Fecha del Presupuesto:** {fecha_presupuesto}", styles['BodyTextBold']))
     story.append(Paragraph(f"**Cotización del Dólar (Referencia):** ${cotizacion_dolar_actual:,.2f} ARS/USD", styles['BodyTextBold']))
     story.append(Spacer(1, 0.3*inch))
     
@@ -416,54 +315,20 @@ def generate_pdf_reportlab(data):
 
 
 # =================================================================================================
-# INTERFAZ STREAMLIT (LÓGICA ACTUALIZADA)
+# SIDEBAR EN FRAGMENTOS (editar gastos, flete o dólar re-ejecuta sólo el fragmento, no el costeo)
 # =================================================================================================
 
-def main():
-    st.set_page_config(layout="wide")
-    st.title("Simulador de Costo de Receta (ARS y USD) 💰 - SOLO SIMULACIÓN")
-
-    # Inicializar Session State
-    if 'ingredientes_temporales' not in st.session_state:
-        st.session_state.ingredientes_temporales = []
-    if 'receta_id_actual' not in st.session_state:
-        st.session_state.receta_id_actual = None
-    
-    if 'costo_total' not in st.session_state:
-        st.session_state['costo_total'] = 0.0
-        st.session_state['detalle_costo'] = pd.DataFrame()
-        st.session_state['litros'] = BASE_LITROS
-        st.session_state['dolar'] = 1000.0
-        st.session_state['gasto_fijo_mensual'] = 0.0 
-        st.session_state['flete_base_200l'] = 5000.0 
-        
-    if 'simulaciones_presupuesto' not in st.session_state:
-        st.session_state['simulaciones_presupuesto'] = []
-    
-    if 'presupuesto_data_for_print' not in st.session_state:
-        st.session_state['presupuesto_data_for_print'] = {}
-        
-    # NUEVOS ESTADOS PARA LA EDICIÓN DE GASTOS
-    if 'gastos_temporales_simulacion' not in st.session_state:
-        st.session_state.gastos_temporales_simulacion = []
-    # Usaremos esto para almacenar el último total de gastos fijos calculado por el editor/temporales
-    if 'gasto_fijo_mensual_total' not in st.session_state:
-        st.session_state.gasto_fijo_mensual_total = 0.0
-        
-    conn = get_connection()
-    create_tables_if_not_exists(conn)
-    
-    # --- Side Bar Configuration (Gasto Fijo, Flete, Overhead, Dólar) ---
-    
-    # --- FIJAR MES A SEPTIEMBRE (9) ---
-    MES_SIMULACION = 9 
-    
-    st.sidebar.subheader(f"Costos Fijos Operativos (Simulación de {calendar.month_name[MES_SIMULACION].capitalize()})")
-    
+@st.fragment
+def sidebar_gastos_y_overhead(MES_SIMULACION):
+    """
+    Año, gastos temporales, editor de gastos operativos y overhead por litro.
+    Deja el overhead en st.session_state['costo_indirecto_litro']; el costeo lo toma en el
+    próximo rerun completo (o al pulsar 'Aplicar Overhead al Costeo').
+    """
     # -----------------------------------------------------------
     # 1. ENTRADA DEL AÑO DE SIMULACIÓN
     # -----------------------------------------------------------
-    anio_simulacion = st.sidebar.number_input(
+    anio_simulacion = st.number_input(
         "Año de Gasto Fijo a Simular:", 
         min_value=2020, 
         value=date.today().year, 
@@ -471,24 +336,21 @@ def main():
         key="anio_simulacion_value"
     )
     
-    # El valor 'gasto_fijo_mensual_auto' ahora se toma del Session State (actualizado por el editor)
-    gasto_fijo_mensual_auto = st.session_state.gasto_fijo_mensual_total
-    st.session_state['gasto_fijo_mensual'] = gasto_fijo_mensual_auto
-
-    st.sidebar.markdown(f"**Gasto Operativo Total ({calendar.month_name[MES_SIMULACION].capitalize()} {anio_simulacion}):**")
-    st.sidebar.success(f"${gasto_fijo_mensual_auto:,.2f} ARS (Calculado con Cambios)")
+    # El total se muestra acá pero se calcula después del editor de gastos (sección 3)
+    st.markdown(f"**Gasto Operativo Total ({calendar.month_name[MES_SIMULACION].capitalize()} {anio_simulacion}):**")
+    total_gastos_placeholder = st.empty()
 
     # -----------------------------------------------------------
     # 2. SECCIÓN PARA CARGAR GASTO TEMPORAL (NUEVA IMPLEMENTACIÓN)
     # -----------------------------------------------------------
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("➕ Cargar Gasto Temporal (Simulación)")
+    st.markdown("---")
+    st.subheader("➕ Cargar Gasto Temporal (Simulación)")
     
     # Obtener categorías de la DB para el selectbox
-    df_categorias = fetch_df("SELECT nombre FROM categorias_imputacion ORDER BY nombre")
+    df_categorias = obtener_catalogo(DB_PATH, "categorias_imputacion")
     categorias = df_categorias['nombre'].tolist() if not df_categorias.empty else ["Sin Categorías"]
     
-    with st.sidebar.form("form_gasto_temporal_sidebar"):
+    with st.form("form_gasto_temporal_sidebar"):
         gasto_categoria = st.selectbox("Categoría:", categorias, key="temp_gasto_categoria")
         gasto_beneficiario = st.text_input("Beneficiario/Descripción:", key="temp_gasto_beneficiario")
         gasto_monto = st.number_input("Monto (ARS):", min_value=0.0, value=1000.0, step=100.0, format="%.2f", key="temp_gasto_monto")
@@ -506,16 +368,15 @@ def main():
                     # ID único temporal, necesario para dataframes
                     'ID_Gasto_Unico': f"TEMP_{len(st.session_state.gastos_temporales_simulacion) + 1}", 
                 })
-                st.success("Gasto temporal agregado. El total se actualizará al abrir/cerrar el detalle.")
-                st.rerun()
+                st.success("Gasto temporal agregado.")
+                st.rerun(scope="fragment")
 
     # Botón para limpiar los gastos temporales
-    if st.sidebar.button("Limpiar Gastos Temporales"):
+    if st.button("Limpiar Gastos Temporales"):
         st.session_state.gastos_temporales_simulacion = []
-        st.session_state.gasto_fijo_mensual_total = 0.0
-        st.rerun()
+        st.rerun(scope="fragment")
         
-    st.sidebar.markdown("---")
+    st.markdown("---")
 
     # -----------------------------------------------------------
     # 3. DETALLE DE GASTOS Y EDITOR (IMPLEMENTACIÓN DEL EDITOR)
@@ -523,8 +384,10 @@ def main():
     MES_GASTOS = MES_SIMULACION
     ANIO_GASTOS = anio_simulacion 
     
-    # NUEVA FUNCIONALIDAD: DETALLE DE GASTOS con expander y EDITOR
-    with st.sidebar.expander(f"Ver/Editar Detalle de Gasto Operativo ({calendar.month_name[MES_GASTOS].capitalize()} {ANIO_GASTOS})"):
+    # NUEVA FUNCIONALIDAD: DETALLE DE GASTOS y EDITOR. El detalle se lee de la DB sólo con el toggle
+    # activado (el cuerpo de un expander se ejecuta aunque esté cerrado)
+    montos_editados = False
+    if st.toggle(f"Ver/Editar Detalle de Gasto Operativo ({calendar.month_name[MES_GASTOS].capitalize()} {ANIO_GASTOS})", key="ver_detalle_gastos"):
         st.markdown(f"**Detalle de Gastos Operativos ({MES_GASTOS:02d}/{ANIO_GASTOS}):**")
         st.info("⚠️ Doble clic en el monto (ARS) para editarlo en la simulación.")
         
@@ -577,10 +440,11 @@ def main():
                 key="editor_gastos_operativos"
             )
 
-            # 5. Recalcular el total y actualizar el session state
+            # 5. Recalcular el total; sólo si se editó algún monto pasa a ser el que usa el Overhead
             total_db_simulacion = edited_df_gastos['Monto_ARS'].sum()
-            # CLAVE: Actualizar el valor que usa el Overhead
-            st.session_state.gasto_fijo_mensual_total = total_db_simulacion 
+            montos_editados = bool(st.session_state["editor_gastos_operativos"].get("edited_rows"))
+            if montos_editados:
+                st.session_state.gasto_fijo_mensual_total = total_db_simulacion
             
             # Recálculo de subtotales por categoría (usando el DF editado)
             total_por_categoria = edited_df_gastos.groupby('Categoria')['Monto_ARS'].sum().reset_index()
@@ -596,51 +460,40 @@ def main():
             
             st.markdown(f"**Total General (Simulación):** **${total_db_simulacion:,.2f} ARS**")
             
-            # CLAVE: Forzar rerun si el editor ha sido modificado para que el Overhead se actualice.
-            # NOTA: st.data_editor fuerza un rerun por defecto si hay cambios.
+            # NOTA: editar un monto re-ejecuta sólo este fragmento (no recostea la receta).
 
         else:
             st.warning(f"No se encontraron gastos para {calendar.month_name[MES_GASTOS].capitalize()} de {ANIO_GASTOS} en la base de datos ni se han cargado gastos temporales.")
 
-    # -----------------------------------------------------------
-    # 4. COSTO DE FLETE BASE (200L) - INGRESO MANUAL
-    # -----------------------------------------------------------
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("Costo de Flete General (Directo)")
-    
-    costo_flete_x_receta_ars = st.sidebar.number_input(
-        f"Costo Flete Base por Receta ({BASE_LITROS:.0f}L) ARS:",
-        min_value=0.0,
-        value=st.session_state.get('flete_base_200l', 5000.0),
-        step=100.0,
-        format="%.2f",
-        key="flete_base_input",
-        help="Costo fijo de flete asociado a un batch base de 200L."
-    )
-    st.session_state['flete_base_200l'] = costo_flete_x_receta_ars
+    # Total del mes: el resumen gastos_mensuales (una sola lectura) más los gastos temporales,
+    # salvo que se haya editado algún monto del detalle (entonces, el total del editor)
+    if montos_editados:
+        gasto_fijo_mensual_auto = st.session_state.gasto_fijo_mensual_total
+    else:
+        gasto_fijo_mensual_auto = total_gastos_mes(get_connection(), MES_SIMULACION, anio_simulacion) + sum(
+            gasto['Monto_ARS'] for gasto in st.session_state.gastos_temporales_simulacion
+        )
+    st.session_state['gasto_fijo_mensual'] = gasto_fijo_mensual_auto
+    total_gastos_placeholder.success(f"${gasto_fijo_mensual_auto:,.2f} ARS (Calculado con Cambios)")
 
+    st.markdown("---")
 
-    st.sidebar.markdown("---")
-    
     # -----------------------------------------------------------
     # 5. VOLUMEN MENSUAL Y CÁLCULO DE OVERHEAD POR LITRO 
     # -----------------------------------------------------------
-    st.sidebar.subheader("Asignación de Costos por Overhead (Gasto Indirecto Tanda)")
+    st.subheader("Asignación de Costos por Overhead (Gasto Indirecto Tanda)")
     
     volumen_mensual_litros = VOLUMEN_MENSUAL_AUTOMATICO
     
-    st.sidebar.markdown(f"**Volumen Mensual de Producción (8 Recetas/Día):**")
-    st.sidebar.info(f"{volumen_mensual_litros:,.0f} Litros/Mes")
+    st.markdown(f"**Volumen Mensual de Producción (8 Recetas/Día):**")
+    st.info(f"{volumen_mensual_litros:,.0f} Litros/Mes")
 
-    # Calcular Costo Indirecto por Litro (Automático) - USA EL VALOR EDITADO/TEMPORAL
-    if volumen_mensual_litros > 0:
-        costo_indirecto_por_litro_auto = gasto_fijo_mensual_auto / volumen_mensual_litros
-    else:
-        costo_indirecto_por_litro_auto = 0.0
+    # Calcular Costo Indirecto por Litro (Automático) - USA EL TOTAL DE ARRIBA (resumen + temporales, o el editado)
+    costo_indirecto_por_litro_auto = costo_indirecto_por_litro(gasto_fijo_mensual_auto, volumen_mensual_litros)
         
-    st.sidebar.metric("Costo Indirecto Operativo por Litro (Auto)", f"${costo_indirecto_por_litro_auto:,.2f} ARS/L")
+    st.metric("Costo Indirecto Operativo por Litro (Auto)", f"${costo_indirecto_por_litro_auto:,.2f} ARS/L")
 
-    costo_indirecto_por_litro_manual = st.sidebar.number_input(
+    costo_indirecto_por_litro_manual = st.number_input(
         "Costo Indirecto por Litro (Manual ARS/L):",
         min_value=0.0,
         value=0.0, 
@@ -650,22 +503,48 @@ def main():
         help="Ingrese un valor manual para anular el cálculo automático de Overhead por Litro. (0.0 usa el valor Auto)"
     )
 
+    costo_indirecto_litro = costo_indirecto_por_litro(gasto_fijo_mensual_auto, volumen_mensual_litros, costo_indirecto_por_litro_manual)
     if costo_indirecto_por_litro_manual > 0.0:
-        costo_indirecto_por_litro = costo_indirecto_por_litro_manual
-        st.sidebar.info(f"Usando Overhead Manual: ${costo_indirecto_por_litro:,.2f} ARS/L")
-    else:
-        costo_indirecto_por_litro = costo_indirecto_por_litro_auto
-
-    st.sidebar.markdown("---")
+        st.info(f"Usando Overhead Manual: ${costo_indirecto_litro:,.2f} ARS/L")
+    st.session_state['costo_indirecto_litro'] = costo_indirecto_litro
+
+    # En un rerun del fragmento el costeo sigue con el overhead anterior hasta que se aplique
+    costo_indirecto_litro_aplicado = st.session_state.get('costo_indirecto_litro_aplicado', costo_indirecto_litro)
+    if not st.session_state.get('sidebar_en_rerun_completo') and costo_indirecto_litro != costo_indirecto_litro_aplicado:
+        st.warning(f"El costeo usa ${costo_indirecto_litro_aplicado:,.2f} ARS/L. Nuevo Overhead: ${costo_indirecto_litro:,.2f} ARS/L.")
+        if st.button("Aplicar Overhead al Costeo", key="aplicar_overhead_costeo", use_container_width=True):
+            st.rerun(scope="app")
+
+@st.fragment
+def sidebar_flete_y_dolar():
+    """Flete base y dólar del día. Entran directo al costeo: si cambian se recostea la tanda."""
+    # -----------------------------------------------------------
+    # 4. COSTO DE FLETE BASE (200L) - INGRESO MANUAL
+    # -----------------------------------------------------------
+    st.markdown("---")
+    st.subheader("Costo de Flete General (Directo)")
     
+    costo_flete_x_receta_ars = st.number_input(
+        f"Costo Flete Base por Receta ({BASE_LITROS:.0f}L) ARS:",
+        min_value=0.0,
+        value=st.session_state.get('flete_base_200l', 5000.0),
+        step=100.0,
+        format="%.2f",
+        key="flete_base_input",
+        help="Costo fijo de flete asociado a un batch base de 200L."
+    )
+    st.session_state['flete_base_200l'] = costo_flete_x_receta_ars
+
+    st.markdown("---")
+
     # -----------------------------------------------------------
     # 6. ENTRADA DEL DÓLAR DEL DÍA
     # -----------------------------------------------------------
-    st.sidebar.subheader("Cotización Dólar del Día")
-    cotizacion_dolar_actual = st.sidebar.number_input(
+    st.subheader("Cotización Dólar del Día")
+    cotizacion_dolar_actual = st.number_input(
         "Precio de Venta del Dólar (ARS)",
         min_value=1.0,
-        value=st.session_state.get('dolar_value', 1000.0), 
+        value=st.session_state.get('dolar_value', dolar_sugerido(DB_PATH)), 
         step=0.1,
         format="%.2f",
         key="dolar_input"
@@ -673,16 +552,78 @@ def main():
     st.session_state['dolar_value'] = cotizacion_dolar_actual
     st.session_state['dolar'] = cotizacion_dolar_actual
 
+    if not st.session_state.get('sidebar_en_rerun_completo') and (costo_flete_x_receta_ars, cotizacion_dolar_actual) != st.session_state.get('flete_dolar_aplicados'):
+        st.rerun(scope="app")
+
+# =================================================================================================
+# INTERFAZ STREAMLIT (LÓGICA ACTUALIZADA)
+# =================================================================================================
+
+def main():
+    st.set_page_config(layout="wide")
+    st.title("Simulador de Costo de Receta (ARS y USD) 💰 - SOLO SIMULACIÓN")
+
+    # Inicializar Session State
+    if 'ingredientes_temporales' not in st.session_state:
+        st.session_state.ingredientes_temporales = []
+    if 'receta_id_actual' not in st.session_state:
+        st.session_state.receta_id_actual = None
+    
+    if 'costo_total' not in st.session_state:
+        st.session_state['costo_total'] = 0.0
+        st.session_state['detalle_costo'] = pd.DataFrame()
+        st.session_state['litros'] = BASE_LITROS
+        st.session_state['dolar'] = dolar_sugerido(DB_PATH)
+        st.session_state['gasto_fijo_mensual'] = 0.0 
+        st.session_state['flete_base_200l'] = 5000.0 
+        
+    if 'simulaciones_presupuesto' not in st.session_state:
+        st.session_state['simulaciones_presupuesto'] = []
+    
+    if 'presupuesto_data_for_print' not in st.session_state:
+        st.session_state['presupuesto_data_for_print'] = {}
+        
+    # NUEVOS ESTADOS PARA LA EDICIÓN DE GASTOS
+    if 'gastos_temporales_simulacion' not in st.session_state:
+        st.session_state.gastos_temporales_simulacion = []
+    # Usaremos esto para almacenar el último total de gastos fijos calculado por el editor/temporales
+    if 'gasto_fijo_mensual_total' not in st.session_state:
+        st.session_state.gasto_fijo_mensual_total = 0.0
+        
+    conn = get_connection()
+    create_tables_if_not_exists(conn)
+    
+    # --- Side Bar Configuration (Gasto Fijo, Flete, Overhead, Dólar) ---
+    
+    # --- FIJAR MES A SEPTIEMBRE (9) ---
+    MES_SIMULACION = 9 
+    
+    st.sidebar.subheader(f"Costos Fijos Operativos (Simulación de {calendar.month_name[MES_SIMULACION].capitalize()})")
+    
+    marcar_seccion("Sidebar: gastos operativos")
+    # Los fragmentos del sidebar se re-ejecutan solos; el costeo usa los valores que dejan en Session State
+    st.session_state['sidebar_en_rerun_completo'] = True
+    with st.sidebar:
+        sidebar_gastos_y_overhead(MES_SIMULACION)
+    marcar_seccion("Sidebar: flete y dólar")
+    with st.sidebar:
+        sidebar_flete_y_dolar()
+    st.session_state['sidebar_en_rerun_completo'] = False
+
+    costo_indirecto_litro = st.session_state['costo_indirecto_litro']
+    cotizacion_dolar_actual = st.session_state['dolar']
+    st.session_state['costo_indirecto_litro_aplicado'] = costo_indirecto_litro
+    st.session_state['flete_dolar_aplicados'] = (st.session_state['flete_base_200l'], cotizacion_dolar_actual)
+
     # ------------------------------------------------------------------------------------------------------------------
     
+    marcar_seccion("Carga de receta")
     # =======================================================================
     # MAIN APP LOGIC 
     # =======================================================================
     
     # --- SELECCIÓN DE RECETA ---
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, nombre FROM recetas ORDER BY nombre")
-    recetas_db = cursor.fetchall()
+    recetas_db = obtener_catalogo(DB_PATH, "recetas")[["id", "nombre"]].to_dict("records")
     recetas = {r["id"]: r["nombre"] for r in recetas_db}
     recetas_nombres = [r["nombre"] for r in recetas_db]
 
@@ -712,8 +653,8 @@ def main():
         key="litros_input"
     )
     col_base.info(f"Receta Base: {BASE_LITROS:.0f} L")
-    factor_escala = cantidad_litros / BASE_LITROS
-    st.info(f"Factor de Escala (Simulación): **{factor_escala:.4f}**")
+    factor_escala_tanda = factor_escala(cantidad_litros)
+    st.info(f"Factor de Escala (Simulación): **{factor_escala_tanda:.4f}**")
 
 
     # --- CREACIÓN DEL DATAFRAME DE INGREDIENTES ---
@@ -728,7 +669,7 @@ def main():
             'materia_prima_id': ing['materia_prima_id'],
             'Unidad': ing['unidad'],
             'Cantidad Base (200L)': ing['cantidad'],
-            'cantidad_simulada': ing['cantidad'] * factor_escala,
+            'cantidad_simulada': ing['cantidad'] * factor_escala_tanda,
             'Quitar': False,
             'Temporal': False,
             'precio_unitario_manual': 0.0,
@@ -744,7 +685,7 @@ def main():
             'materia_prima_id': mp_id, 
             'Unidad': temp['unidad'],
             'Cantidad Base (200L)': temp['cantidad_base'],
-            'cantidad_simulada': temp['cantidad_base'] * factor_escala,
+            'cantidad_simulada': temp['cantidad_base'] * factor_escala_tanda,
             'Quitar': False,
             'Temporal': True,
             'precio_unitario_manual': temp['precio_unitario'], 
@@ -753,29 +694,13 @@ def main():
 
     ingredientes_df = pd.DataFrame(data)
 
+    marcar_seccion("Costeo de MP")
     st.subheader("Simulación de Costos (Vista Excel - LIVE)")
 
     # 1. CÁLCULO PREVIO DEL PRECIO UNITARIO BASE (USD) PARA LA VISUALIZACIÓN
-    ingredientes_df['Precio Unitario (USD) BASE'] = 0.0
-    
-    for index, row in ingredientes_df.iterrows():
-        
-        precio_base_usd_final = 0.0
-        precio_manual_unitario = row.get('precio_unitario_manual', 0.0)
-        cotizacion_manual = row.get('cotizacion_usd_manual', 1.0)
-        materia_prima_id = row["materia_prima_id"]
-
-        if precio_manual_unitario > 0.0 and cotizacion_manual > 1.0:
-            precio_base_usd_final = precio_manual_unitario
-        
-        elif materia_prima_id != -1 and precio_manual_unitario == 0.0:
-            precio_unitario_reg_base, _, _, cotizacion_usd_reg_bd = \
-                obtener_precio_actual_materia_prima(conn, materia_prima_id)
-            
-            if cotizacion_usd_reg_bd > 1.0:
-                precio_base_usd_final = precio_unitario_reg_base
-                
-        ingredientes_df.loc[index, 'Precio Unitario (USD) BASE'] = precio_base_usd_final
+    # Precios de la foto en memoria (sin consultar la DB en cada rerun); se reutilizan en el cálculo del costo.
+    precios_df = obtener_precios_materias_primas(DB_PATH, ingredientes_df['materia_prima_id'] if not ingredientes_df.empty else [])
+    ingredientes_df['Precio Unitario (USD) BASE'] = precio_unitario_usd_base(ingredientes_df, precios_df, incluir_manual=True)
     
     # 2. Configurar el editor de datos (vista Excel)
     column_config = {
@@ -816,42 +741,48 @@ def main():
     ingredientes_df['Cantidad Base (200L)'] = edited_df['Cantidad Base (200L)']
     ingredientes_df['Quitar'] = edited_df['Quitar']
     ingredientes_df['precio_unitario_manual'] = edited_df['precio_unitario_manual']
-    ingredientes_df['cantidad_simulada'] = ingredientes_df['Cantidad Base (200L)'] * factor_escala
+    ingredientes_df['cantidad_simulada'] = ingredientes_df['Cantidad Base (200L)'] * factor_escala_tanda
 
     # --- LÓGICA DE CÁLCULO EN VIVO ---
     ingredientes_a_calcular = ingredientes_df[~ingredientes_df['Quitar']].copy()
     
     # CAMBIO: Recibir el nuevo retorno costo_total_mp_usd
-    costo_mp_total, detalle_costo_df, costo_mp_base_ars, costo_recargo_mp_ars, costo_total_mp_usd = calcular_costo_total(
+    # Si sólo cambiaron los litros se reescala el costo de la receta base (sin recostear cada MP)
+    costo_mp_total, detalle_costo_df, costo_mp_base_ars, costo_recargo_mp_ars, costo_total_mp_usd = calcular_costo_tanda_mp(
         ingredientes_a_calcular, 
         cotizacion_dolar_actual, 
-        conn
+        precios_df,
+        factor_escala_tanda
     )
     
     # ELIMINADO: Removido el cálculo redundante/confuso de costo_mp_base_usd
     # costo_mp_base_usd = costo_mp_base_ars / cotizacion_dolar_actual
     
+    marcar_seccion("Totales de la tanda")
     # --------------------------------------------------------------------------
     # CÁLCULOS DE COSTOS FIJOS (USA EL VALOR EDITADO/TEMPORAL: gasto_fijo_mensual_auto)
     # --------------------------------------------------------------------------
     
-    gasto_indirecto_tanda = costo_indirecto_por_litro * cantidad_litros
-    
-    costo_flete_total_ars = st.session_state['flete_base_200l'] * factor_escala
-    
-    # Costo Total Final = Costo MP Base ARS + Recargo 3% USD (ARS) + Flete General + Indirecto Operativo
-    costo_total_final = costo_mp_base_ars + costo_recargo_mp_ars + costo_flete_total_ars + gasto_indirecto_tanda
-    
+    # Costo Total Final = Costo MP (Base + Recargo 3% USD) + Flete General + Indirecto Operativo
+    # Costo Total Final USD = Costo Total MP USD (Fijo) + Flete USD (Variable) + Overhead USD (Variable)
+    totales = totales_tanda(
+        costo_mp_total,
+        costo_total_mp_usd,
+        cantidad_litros,
+        cotizacion_dolar_actual,
+        flete_base=st.session_state['flete_base_200l'],
+        costo_indirecto_litro=costo_indirecto_litro,
+    )
+    gasto_indirecto_tanda = totales['gasto_indirecto_tanda']
+    costo_flete_total_ars = totales['costo_flete_total_ars']
+    costo_total_final = totales['costo_total_final']
+    costo_total_final_usd = totales['costo_total_final_usd']
+
     # --- CONVERSIÓN A DÓLARES (CORREGIDA) ---
-    
-    # Conversión de los costos en ARS a USD, usando el dólar actual
     costo_flete_total_usd = costo_flete_total_ars / cotizacion_dolar_actual
     gasto_indirecto_tanda_usd = gasto_indirecto_tanda / cotizacion_dolar_actual
     
-    # Costo Total Final USD = Costo Total MP USD (Fijo) + Flete USD (Variable) + Overhead USD (Variable)
-    costo_total_final_usd = costo_total_mp_usd + costo_flete_total_usd + gasto_indirecto_tanda_usd
-    
-    costo_por_litro_ars = costo_total_final / cantidad_litros 
+    costo_por_litro_ars = totales['costo_por_litro_ars']
     costo_por_litro_usd = costo_total_final_usd / cantidad_litros
     # -----------------------------
     
@@ -952,6 +883,7 @@ def main():
             column_config={k: v for k, v in col_config_detalle.items() if k in cols_ordenadas}
         )
     
+    marcar_seccion("Tabla de presupuesto")
     # --------------------------------------------------------------------------------------
     # SECCIÓN: GESTIÓN DE SIMULACIONES PARA PRESUPUESTO
     # --------------------------------------------------------------------------------------
@@ -996,6 +928,8 @@ def main():
             'costo_por_litro_ars': costo_por_litro_ars, 
             'gasto_indirecto_tanda': gasto_indirecto_tanda * cantidad_a_agregar,
             'costo_flete_total_ars': costo_flete_total_ars * cantidad_a_agregar,
+            'costo_total_mp_usd': costo_total_mp_usd * cantidad_a_agregar,
+            'cotizacion_dolar': cotizacion_dolar_actual,
             'margen_ganancia': margen_ganancia_inicial, 
             'cantidad_tandas': cantidad_a_agregar,
             'detalle_mp_json_unitario': detalle_costo_df.to_json(orient='records'),
@@ -1063,6 +997,17 @@ def main():
         
         st.markdown(f"**Costo Total Acumulado de Producción (ARS):** ${costo_total_acumulado:,.2f}")
         st.markdown(f"**Volumen Total (Litros):** {litros_total_acumulado:,.2f} L")
+
+        # Riesgo cambiario: costo y margen de cada ítem si el dólar se mueve mientras el presupuesto está vigente
+        mostrar_sensibilidad_dolar(
+            items_sensibilidad(
+                st.session_state['simulaciones_presupuesto'],
+                cotizacion_dolar_actual,
+                precio_con_margen(edited_df_resumen['Costo Total ARS'], edited_df_resumen['Margen de Ganancia (%)']),
+            ),
+            cotizacion_dolar_actual,
+            DB_PATH,
+        )
         st.markdown("---")
 
         # --- FORMULARIO DE GENERACIÓN DE PRESUPUESTO ---
@@ -1083,7 +1028,7 @@ def main():
                     df_final.rename(columns={'Margen de Ganancia (%)': 'Margen_Ganancia'}, inplace=True)
                     
                     df_final['Factor_Ganancia'] = 1 + (df_final['Margen_Ganancia'] / 100.0)
-                    df_final['Precio_Venta_Total_ARS'] = df_final['Costo Total ARS'] * df_final['Factor_Ganancia']
+                    df_final['Precio_Venta_Total_ARS'] = precio_con_margen(df_final['Costo Total ARS'], df_final['Margen_Ganancia'])
                     df_final['Precio_Venta_Total_USD'] = df_final['Precio_Venta_Total_ARS'] / cotizacion_dolar_actual 
                     
                     ganancia_total_ars = df_final['Precio_Venta_Total_ARS'].sum() - costo_total_acumulado
@@ -1204,6 +1149,7 @@ def main():
     else:
         st.info("No hay simulaciones cargadas en el presupuesto. Agregue simulaciones usando el botón de arriba.")
 
+    marcar_seccion("Gestión de MP temporales")
     # --------------------------------------------------------------------------------------
     # Se mantienen las secciones de Gestión de Estado Temporal y Agregar Materia Prima
     # --------------------------------------------------------------------------------------
@@ -1291,4 +1237,5 @@ def main():
     conn.close()
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with perfil_pagina("A Granel", DB_PATH):
+        main()
\ No newline at end of file
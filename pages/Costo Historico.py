@@ -0,0 +1,97 @@
+import streamlit as st
+import pandas as pd
+from datetime import date
+
+from cache_precios import dolar_sugerido, obtener_cotizaciones, obtener_linea_tiempo_precios
+from costeo import BASE_LITROS, ComposicionCiclicaError, calcular_costo_mp, ids_a_resolver, ingredientes_receta
+from costeo.catalogos import obtener_catalogo
+from costeo.conexion import obtener_conexion
+from panel_perfil import perfil_pagina
+
+# =================================================================================================
+# CONFIGURACIÓN
+# =================================================================================================
+DB_PATH = "minerva.db"
+
+# =================================================================================================
+# PÁGINA
+# =================================================================================================
+
+def main():
+    st.set_page_config(layout="wide")
+    st.title("🕰️ Costo de Recetas a Fecha")
+    st.caption("Precio de cada MP a la fecha elegida: última compra hasta ese día y, si no había compras, último precio cargado.")
+
+    conn = obtener_conexion(DB_PATH)
+    linea = obtener_linea_tiempo_precios(DB_PATH)
+    primera, ultima = linea.rango_fechas()
+    if primera is None:
+        st.info("Todavía no hay compras ni precios de materias primas registrados.")
+        return
+
+    recetas_df = obtener_catalogo(DB_PATH, "recetas")
+    nombres_recetas = dict(zip(recetas_df["id"], recetas_df["nombre"]))
+    col_receta, col_litros, col_dolar = st.columns([0.5, 0.25, 0.25])
+    receta_id = col_receta.selectbox(
+        "Receta:",
+        options=list(nombres_recetas),
+        format_func=lambda receta_id: nombres_recetas[receta_id],
+        key="historico_receta",
+    )
+    cantidad_litros = col_litros.number_input("Litros:", min_value=1.0, value=BASE_LITROS, step=50.0, key="historico_litros")
+    cotizacion_dolar = col_dolar.number_input(
+        "Cotización Dólar (ARS/USD):", min_value=1.0, value=dolar_sugerido(DB_PATH), step=1.0, format="%.2f", key="historico_dolar"
+    )
+    if receta_id is None:
+        return
+    ingredientes_df = ingredientes_receta(conn, receta_id, cantidad_litros)
+
+    # --- Costo a una fecha (con el detalle del motor) ---
+    st.subheader("Costo a una fecha")
+    fecha = st.date_input("Fecha:", value=ultima, key="historico_fecha")
+    try:
+        precios_df = linea.precios_mp(ids_a_resolver(ingredientes_df), fecha, combinados=True)
+    except ComposicionCiclicaError as e:
+        st.error(f"⚠️ {e}. Esas MP se costean con su último precio registrado a la fecha.")
+        precios_df = linea.precios_mp(ids_a_resolver(ingredientes_df), fecha)
+    costo_mp_total, detalle_df, _, _, costo_total_mp_usd = calcular_costo_mp(ingredientes_df, precios_df, cotizacion_dolar)
+    col_ars, col_usd, col_litro = st.columns(3)
+    col_ars.metric("Costo MP (ARS)", f"${costo_mp_total:,.2f}")
+    col_usd.metric("Costo MP (USD)", f"USD ${costo_total_mp_usd:,.2f}")
+    col_litro.metric("Costo MP por Litro (ARS/L)", f"${costo_mp_total / cantidad_litros:,.2f}")
+    st.dataframe(detalle_df, use_container_width=True, hide_index=True)
+
+    # --- Serie diaria: todas las fechas en una sola llamada ---
+    st.subheader("Evolución del costo")
+    col_desde, col_hasta = st.columns(2)
+    desde = col_desde.date_input("Desde:", value=primera, key="historico_desde")
+    hasta = col_hasta.date_input("Hasta:", value=max(ultima, date.today()), key="historico_hasta")
+    if desde > hasta:
+        st.warning("La fecha inicial es posterior a la final.")
+        return
+    dolar_de_cada_fecha = st.checkbox(
+        "Usar la cotización de venta de cada fecha (si no, la cotización de arriba para todas)",
+        value=False,
+        key="historico_dolar_por_fecha",
+    )
+    fechas = pd.date_range(desde, hasta, freq="D")
+    cotizaciones = obtener_cotizaciones(DB_PATH).en_fechas(fechas) if dolar_de_cada_fecha else cotizacion_dolar
+    try:
+        serie_df = linea.serie_costo_mp(ingredientes_df, fechas, cotizaciones)
+    except ComposicionCiclicaError as e:
+        st.error(f"⚠️ {e}.")
+        return
+    if dolar_de_cada_fecha:
+        serie_df["cotizacion_dolar"] = cotizaciones
+    st.line_chart(serie_df[["costo_mp_total"]].rename(columns={"costo_mp_total": "Costo MP (ARS)"}))
+    st.download_button(
+        "⬇️ Descargar serie (CSV)",
+        data=serie_df.to_csv().encode("utf-8"),
+        file_name=f"costo_{nombres_recetas[receta_id].replace(' ', '_')}_{desde.isoformat()}_{hasta.isoformat()}.csv",
+        mime="text/csv",
+        key="historico_descargar",
+    )
+
+if __name__ == "__main__":
+    with perfil_pagina("Costo Historico", DB_PATH):
+        main()
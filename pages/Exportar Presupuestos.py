@@ -0,0 +1,104 @@
+import streamlit as st
+import os
+import tempfile
+from datetime import date
+
+from costeo.catalogos import obtener_catalogo
+from costeo.conexion import obtener_conexion
+from exportar_presupuestos import exportar_zip, presupuestos_a_exportar
+from panel_perfil import perfil_pagina
+
+# =================================================================================================
+# CONFIGURACIÓN
+# =================================================================================================
+DB_PATH = "minerva.db"
+
+def existe_tabla_presupuestos(conn):
+    """La tabla la crean los simuladores al guardar el primer presupuesto."""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'presupuestos'").fetchone() is not None
+
+def borrar_zip_anterior():
+    """Borra del disco el ZIP de la exportación anterior (si quedó alguno) y lo quita de la sesión."""
+    _, ruta_zip = st.session_state.pop("exportar_zip", (None, None))
+    if ruta_zip and os.path.exists(ruta_zip):
+        os.remove(ruta_zip)
+
+# =================================================================================================
+# PÁGINA
+# =================================================================================================
+
+def main():
+    st.set_page_config(layout="wide")
+    st.title("📦 Exportar Presupuestos en PDF")
+
+    conn = obtener_conexion(DB_PATH)
+    if not existe_tabla_presupuestos(conn):
+        st.info("Todavía no hay presupuestos guardados.")
+        return
+
+    clientes_df = obtener_catalogo(DB_PATH, "clientes")
+    nombres_clientes = dict(zip(clientes_df["id"], clientes_df["nombre"]))
+
+    col_clientes, col_desde, col_hasta = st.columns([0.5, 0.25, 0.25])
+    cliente_ids = col_clientes.multiselect(
+        "Clientes (vacío = todos):",
+        options=list(nombres_clientes),
+        format_func=lambda cliente_id: nombres_clientes[cliente_id],
+        key="exportar_clientes",
+    )
+    hoy = date.today()
+    fecha_desde = col_desde.date_input("Desde:", value=hoy.replace(day=1), key="exportar_desde")
+    fecha_hasta = col_hasta.date_input("Hasta:", value=hoy, key="exportar_hasta")
+
+    presupuestos_df = presupuestos_a_exportar(conn, fecha_desde.isoformat(), fecha_hasta.isoformat(), cliente_ids)
+    st.caption(f"{len(presupuestos_df)} presupuestos en el rango seleccionado.")
+    st.dataframe(
+        presupuestos_df[["id", "fecha", "cliente_nombre", "volumen_total_litros", "precio_final_ars"]].rename(columns={
+            "id": "N°", "fecha": "Fecha", "cliente_nombre": "Cliente",
+            "volumen_total_litros": "Litros", "precio_final_ars": "Precio Final (ARS)",
+        }),
+        use_container_width=True,
+        hide_index=True,
+        column_config={"Precio Final (ARS)": st.column_config.NumberColumn(format="$%.2f")},
+    )
+
+    if presupuestos_df.empty:
+        return
+
+    if st.button("Generar ZIP con los PDFs", key="exportar_generar"):
+        borrar_zip_anterior()
+        barra = st.progress(0.0, text="Generando PDFs...")
+        # El ZIP queda en un archivo temporal en disco y en la sesión sólo se guarda su ruta:
+        # ni los PDFs ni el ZIP se acumulan en memoria entre reejecuciones
+        with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as archivo_zip:
+            try:
+                cantidad = exportar_zip(
+                    presupuestos_df,
+                    archivo_zip,
+                    progreso=lambda hechos, total: barra.progress(hechos / total, text=f"{hechos} de {total} PDFs"),
+                )
+            except Exception:
+                archivo_zip.close()
+                os.remove(archivo_zip.name)
+                raise
+        st.session_state["exportar_zip"] = (
+            f"presupuestos_{fecha_desde.isoformat()}_{fecha_hasta.isoformat()}.zip",
+            archivo_zip.name,
+        )
+        barra.empty()
+        st.success(f"✅ {cantidad} presupuestos exportados.")
+
+    nombre_zip, ruta_zip = st.session_state.get("exportar_zip", (None, None))
+    if ruta_zip and os.path.exists(ruta_zip):
+        with open(ruta_zip, "rb") as archivo_zip:
+            st.download_button(
+                f"⬇️ Descargar {nombre_zip}",
+                data=archivo_zip,
+                file_name=nombre_zip,
+                mime="application/zip",
+                key="exportar_descargar",
+            )
+
+if __name__ == "__main__":
+    with perfil_pagina("Exportar Presupuestos", DB_PATH):
+        main()
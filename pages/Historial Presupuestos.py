@@ -0,0 +1,126 @@
+import streamlit as st
+from datetime import date
+
+from costeo.catalogos import obtener_catalogo
+from costeo.conexion import obtener_conexion
+from costeo.migraciones import aplicar_migraciones
+from costeo.presupuestos import items_de_presupuesto, pagina_historial
+from panel_perfil import perfil_pagina
+
+# =================================================================================================
+# CONFIGURACIÓN
+# =================================================================================================
+DB_PATH = "minerva.db"
+TAMANIO_PAGINA = 50
+
+# =================================================================================================
+# PÁGINA
+# =================================================================================================
+
+def main():
+    st.set_page_config(layout="wide")
+    st.title("🗂️ Historial de Presupuestos")
+
+    conn = obtener_conexion(DB_PATH)
+    # Crea presupuestos/presupuesto_items y los índices del historial si la base todavía no los tiene
+    aplicar_migraciones(conn)
+
+    # --- Filtros ---
+    clientes_df = obtener_catalogo(DB_PATH, "clientes")
+    nombres_clientes = dict(zip(clientes_df["id"], clientes_df["nombre"]))
+
+    col_clientes, col_desde, col_hasta = st.columns([0.5, 0.25, 0.25])
+    cliente_ids = col_clientes.multiselect(
+        "Clientes (vacío = todos):",
+        options=list(nombres_clientes),
+        format_func=lambda cliente_id: nombres_clientes[cliente_id],
+        key="historial_clientes",
+    )
+    fecha_desde = col_desde.date_input("Desde:", value=date(date.today().year, 1, 1), key="historial_desde")
+    fecha_hasta = col_hasta.date_input("Hasta:", value=date.today(), key="historial_hasta")
+
+    col_mmin, col_mmax, col_vmin, col_vmax = st.columns(4)
+    filtros = {
+        "cliente_ids": cliente_ids,
+        "margen_min": col_mmin.number_input("Margen mínimo (%):", value=None, step=1.0, key="historial_margen_min"),
+        "margen_max": col_mmax.number_input("Margen máximo (%):", value=None, step=1.0, key="historial_margen_max"),
+        "volumen_min": col_vmin.number_input("Volumen mínimo (L):", value=None, min_value=0.0, step=100.0, key="historial_volumen_min"),
+        "volumen_max": col_vmax.number_input("Volumen máximo (L):", value=None, min_value=0.0, step=100.0, key="historial_volumen_max"),
+    }
+
+    # --- Paginación por clave: se guardan las claves de inicio de las páginas ya recorridas ---
+    clave_filtros = (
+        fecha_desde, fecha_hasta, tuple(cliente_ids),
+        filtros["margen_min"], filtros["margen_max"], filtros["volumen_min"], filtros["volumen_max"],
+    )
+    if st.session_state.get("historial_filtros") != clave_filtros:
+        st.session_state["historial_filtros"] = clave_filtros
+        st.session_state["historial_inicios"] = [None]
+
+    inicios = st.session_state["historial_inicios"]
+    pagina_df, siguiente = pagina_historial(
+        conn,
+        fecha_desde.isoformat(),
+        fecha_hasta.isoformat(),
+        tamanio=TAMANIO_PAGINA,
+        despues_de=inicios[-1],
+        **filtros,
+    )
+
+    if pagina_df.empty:
+        st.info("No hay presupuestos con esos filtros.")
+        return
+
+    st.caption(f"Página {len(inicios)} · {len(pagina_df)} presupuestos (del más nuevo al más viejo). Seleccione uno para ver su detalle.")
+    seleccion = st.dataframe(
+        pagina_df[["id", "fecha", "cliente", "volumen_total_litros", "costo_total_ars", "precio_final_ars", "porcentaje_ganancia"]].rename(columns={
+            "id": "N°", "fecha": "Fecha", "cliente": "Cliente", "volumen_total_litros": "Litros",
+            "costo_total_ars": "Costo (ARS)", "precio_final_ars": "Precio Final (ARS)", "porcentaje_ganancia": "Margen (%)",
+        }),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Litros": st.column_config.NumberColumn(format="%.2f"),
+            "Costo (ARS)": st.column_config.NumberColumn(format="$%.2f"),
+            "Precio Final (ARS)": st.column_config.NumberColumn(format="$%.2f"),
+            "Margen (%)": st.column_config.NumberColumn(format="%.2f"),
+        },
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"historial_tabla_{len(inicios)}",
+    )
+
+    col_anterior, col_siguiente = st.columns(2)
+    if col_anterior.button("◀ Anterior", disabled=len(inicios) == 1, key="historial_anterior"):
+        inicios.pop()
+        st.rerun()
+    if col_siguiente.button("Siguiente ▶", disabled=siguiente is None, key="historial_siguiente"):
+        inicios.append(siguiente)
+        st.rerun()
+
+    # --- Detalle: los renglones se leen sólo del presupuesto seleccionado ---
+    filas_seleccionadas = seleccion.selection.rows
+    if filas_seleccionadas:
+        presupuesto = pagina_df.iloc[filas_seleccionadas[0]]
+        st.markdown("---")
+        st.subheader(f"Presupuesto N° {presupuesto['id']} · {presupuesto['cliente']} · {presupuesto['fecha']}")
+        items_df = items_de_presupuesto(conn, presupuesto["id"])
+        st.dataframe(
+            items_df.rename(columns={
+                "renglon": "#", "receta": "Receta", "litros": "Litros", "envase": "Envase",
+                "capacidad_litros": "Capacidad (L)", "unidades": "Unidades", "costo_total_ars": "Costo (ARS)",
+                "precio_venta_ars": "Precio Venta (ARS)", "precio_venta_usd": "Precio Venta (USD)", "margen": "Margen (%)",
+            }),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Costo (ARS)": st.column_config.NumberColumn(format="$%.2f"),
+                "Precio Venta (ARS)": st.column_config.NumberColumn(format="$%.2f"),
+                "Precio Venta (USD)": st.column_config.NumberColumn(format="$%.2f"),
+                "Margen (%)": st.column_config.NumberColumn(format="%.2f"),
+            },
+        )
+
+if __name__ == "__main__":
+    with perfil_pagina("Historial Presupuestos", DB_PATH):
+        main()
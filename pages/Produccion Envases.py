@@ -5,27 +5,44 @@ from datetime import date
 import calendar 
 import json 
 import base64 
-import io
-
-# =================================================================================================
-# IMPORTACIONES REPORTLAB 
-# =================================================================================================
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape 
 
+from cache_pdf import encargar_pdf, obtener_pdf
+from cache_costeo import calcular_costo_tanda_mp, costo_mp_base
+from cache_precios import dolar_sugerido, obtener_precios_materias_primas, obtener_snapshot_precios
+from costeo import (
+    BASE_LITROS,
+    VOLUMEN_MENSUAL_AUTOMATICO,
+    SQL_DETALLE_GASTOS_MES,
+    barrido_volumen,
+    calcular_costo_mp,
+    calcular_empaque,
+    costo_indirecto_por_litro,
+    factor_escala,
+    ids_a_resolver,
+    margen_desde_precio,
+    precio_con_margen,
+    precio_envase_ars,
+    precio_unitario_usd_base,
+    rango_mes,
+    total_gastos_mes,
+    totales_tanda,
+    volumenes_barrido,
+)
+from costeo.catalogos import invalidar_catalogos, obtener_catalogo
+from costeo.conexion import obtener_conexion
+from costeo.lote import costear_items, ingredientes_recetas
+from costeo.migraciones import aplicar_migraciones
+from costeo.presupuestos import guardar_items_presupuesto
+from costeo.perfil import marcar_seccion
+from panel_perfil import perfil_pagina
+from panel_sensibilidad import items_sensibilidad, mostrar_sensibilidad_dolar
+from pdf_produccion_envases import generate_pdf_reportlab
 
 # =================================================================================================
 # CONFIGURACIÓN Y CONSTANTES
 # =================================================================================================
 DB_PATH = "minerva.db"
-BASE_LITROS = 200.0 # Cantidad base de la receta original (Litros)
-# CONSTANTES CLAVE BASADAS EN LA LÓGICA DE PRESUPUESTO
-RECETAS_DIARIAS = 8.0 
-DIAS_HABILES_FIJOS_MENSUAL = 20.0 
-VOLUMEN_MENSUAL_AUTOMATICO = RECETAS_DIARIAS * DIAS_HABILES_FIJOS_MENSUAL * BASE_LITROS # 32000.0 L
+# BASE_LITROS y VOLUMEN_MENSUAL_AUTOMATICO vienen de `costeo` (compartidas por todos los simuladores)
 
 # =================================================================================================
 # UTILIDADES DB
@@ -88,10 +105,8 @@ def obtener_precio_combinado(conn, materia_prima_id):
     return None
             
 def get_connection():
-    """Establece la conexión a la base de datos."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row 
-    return conn
+    """Conexión a la base de datos: la del pool del hilo actual (WAL y PRAGMAs ya aplicados)."""
+    return obtener_conexion(DB_PATH)
 
 def fetch_df(query, params=()):
     """Ejecuta una consulta SELECT y devuelve los resultados como un DataFrame de Pandas."""
@@ -107,12 +122,12 @@ def fetch_df(query, params=()):
     return df
 
 def get_categoria_id_by_name(category_name):
-    """Busca el ID de una categoría por su nombre."""
-    query = "SELECT id FROM categorias_imputacion WHERE nombre = ?"
-    df = fetch_df(query, (category_name,))
+    """Busca el ID de una categoría por su nombre (en el catálogo en memoria)."""
+    df = obtener_catalogo(DB_PATH, "categorias_imputacion")
+    df = df[df["nombre"] == category_name]
     if df.empty:
         return None
-    return df.iloc[0, 0]
+    return df["id"].iloc[0]
 
 def create_tables_if_not_exists(conn):
     """Crea las tablas de Clientes y Presupuestos si no existen."""
@@ -143,16 +158,20 @@ def create_tables_if_not_exists(conn):
     
     conn.commit()
 
+    # Índices y demás cambios de esquema versionados (no hace nada si ya están aplicados)
+    aplicar_migraciones(conn)
+
 def get_or_create_client(conn, client_name):
-    """Obtiene el ID del cliente o lo crea si no existe."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM clientes WHERE nombre = ?", (client_name,))
-    row = cursor.fetchone()
-    if row:
-        return row['id']
+    """Obtiene el ID del cliente (del catálogo en memoria) o lo crea si no existe."""
+    df_clientes = obtener_catalogo(DB_PATH, "clientes")
+    existentes = df_clientes.loc[df_clientes["nombre"] == client_name, "id"]
+    if not existentes.empty:
+        return int(existentes.iloc[0])
     else:
+        cursor = conn.cursor()
         cursor.execute("INSERT INTO clientes (nombre) VALUES (?)", (client_name,))
         conn.commit()
+        invalidar_catalogos(DB_PATH, "clientes")
         return cursor.lastrowid
 
 def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json):
@@ -163,6 +182,8 @@ def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros
         INSERT INTO presupuestos (cliente_id, fecha, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json)
         VALUES (?, ?, ?, ?, ?, ?, ?)
     """, (cliente_id, fecha_hoy, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json))
+    # Renglones en presupuesto_items (misma transacción) para los reportes por receta
+    guardar_items_presupuesto(conn, cursor.lastrowid)
     conn.commit()
     return cursor.lastrowid 
 
@@ -171,23 +192,11 @@ def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros
 # =================================================================================================
 
 def get_detalle_gastos_operativos_mensual(mes: int, anio: int):
-    """Obtiene el detalle de gastos operativos para un mes y año específico."""
-    query = f"""
-    SELECT
-        g.fecha_factura AS Fecha,
-        ci.nombre AS Categoria,
-        g.beneficiario_nombre AS Beneficiario,
-        g.importe_total AS Monto_ARS
-    FROM
-        gastos g
-    JOIN
-        categorias_imputacion ci ON g.categoria_id = ci.id
-    WHERE
-        strftime('%Y', g.fecha_factura) = '{anio}' AND strftime('%m', g.fecha_factura) = '{mes:02d}'
-    ORDER BY
-        g.fecha_factura, ci.nombre;
     """
-    df_gastos = fetch_df(query) 
+    Obtiene el detalle de gastos operativos para un mes y año específico.
+    Filtra por rango de fechas [1° del mes, 1° del mes siguiente) para usar el índice de fecha_factura.
+    """
+    df_gastos = fetch_df(SQL_DETALLE_GASTOS_MES, rango_mes(mes, anio))
     return df_gastos
 
 # =================================================================================================
@@ -195,45 +204,16 @@ def get_detalle_gastos_operativos_mensual(mes: int, anio: int):
 # =================================================================================================
 
 def obtener_envases_disponibles(conn):
-    """Obtiene la lista completa de envases disponibles con IDs y capacidad."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, descripcion, capacidad_litros FROM envases ORDER BY descripcion")
-    return [dict(row) for row in cursor.fetchall()]
+    """Obtiene la lista completa de envases disponibles con IDs y capacidad (catálogo en memoria)."""
+    df_envases = obtener_catalogo(DB_PATH, "envases")[["id", "descripcion", "capacidad_litros"]]
+    return df_envases.astype(object).where(df_envases.notna(), None).to_dict("records")
 
 def obtener_precio_envase_actual(conn, envase_id):
     """
     Obtiene el último precio unitario registrado de un envase (ASUMIDO USD BASE) y su capacidad en litros.
+    Se lee de la foto de precios en memoria (se recarga sólo si hay ingresos nuevos).
     """
-    if envase_id is None or envase_id == -1:
-        # Se asume 0.0 USD y 0.0 Litros
-        return 0.0, 0.0 # precio_unitario_usd_base, capacidad_litros
-
-    cursor = conn.cursor()
-    
-    # 1. Obtener el último precio unitario (asume que la entrada más reciente es el precio actual)
-    cursor.execute("""
-        SELECT precio_unitario
-        FROM entradas_envases
-        WHERE envase_id = ?
-        ORDER BY fecha_ingreso DESC, id DESC
-        LIMIT 1
-    """, (envase_id,))
-    
-    entrada = cursor.fetchone()
-    # Se asume que este es el precio base en USD para aplicar la cotización del día
-    precio_unitario_usd_base = entrada['precio_unitario'] if entrada and entrada['precio_unitario'] is not None else 0.0
-
-    # 2. Obtener la capacidad en litros
-    cursor.execute("""
-        SELECT capacidad_litros
-        FROM envases
-        WHERE id = ?
-    """, (envase_id,))
-    
-    envase = cursor.fetchone()
-    capacidad_litros = envase['capacidad_litros'] if envase and envase['capacidad_litros'] is not None else 0.0
-    
-    return precio_unitario_usd_base, capacidad_litros
+    return obtener_snapshot_precios(DB_PATH).precio_envase(envase_id)
 
 
 # =================================================================================================
@@ -241,10 +221,8 @@ def obtener_precio_envase_actual(conn, envase_id):
 # =================================================================================================
 
 def obtener_todas_materias_primas(conn):
-    """Obtiene la lista completa de materias primas disponibles con IDs."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, nombre, unidad FROM materias_primas ORDER BY nombre")
-    return [dict(row) for row in cursor.fetchall()]
+    """Obtiene la lista completa de materias primas disponibles con IDs (catálogo en memoria)."""
+    return obtener_catalogo(DB_PATH, "materias_primas")[["id", "nombre", "unidad"]].to_dict("records")
 
 def obtener_ingredientes_receta(conn, receta_id):
     """Obtiene los ingredientes actuales de una receta."""
@@ -266,342 +244,124 @@ def obtener_ingredientes_receta(conn, receta_id):
 def obtener_precio_actual_materia_prima(conn, materia_prima_id):
     """
     Obtiene el último precio unitario y la cotización USD registrada.
-    AHORA: Detecta si es una materia prima combinada (ej: SERUM) y suma sus partes.
+    Las MP combinadas (ej: SERUM) se costean sumando sus partes.
     """
     if materia_prima_id == -1:
         return 0.0, 0.0, 0.0, 1.0
+    return tuple(obtener_precios_materias_primas(DB_PATH, [materia_prima_id]).iloc[0])
 
-    cursor = conn.cursor()
-    
-    # -------------------------------------------------------------------------
-    # NUEVA LÓGICA: VERIFICAR SI ES UNA MATERIA PRIMA COMBINADA (Tipo SERUM)
-    # -------------------------------------------------------------------------
-    cursor.execute("""
-        SELECT colorante_primario_id, proporcion 
-        FROM composicion_colorantes 
-        WHERE colorante_combinado_id = ?
-    """, (materia_prima_id,))
-    componentes = cursor.fetchall()
-
-    if componentes:
-        precio_total_combinado = 0.0
-        # Iteramos sobre los componentes que forman el SERUM
-        for comp in componentes:
-            # comp[0] es id_primario, comp[1] es proporcion
-            id_primario = comp[0]
-            proporcion = comp[1]
-            
-            # Llamada recursiva para obtener el precio de cada ingrediente del SERUM
-            p_base, flete, otros, cotiz = obtener_precio_actual_materia_prima(conn, id_primario)
-            
-            # Sumamos el costo proporcional al total
-            precio_total_combinado += (p_base * proporcion)
-            
-        # Retornamos el costo sumado. Usamos cotización 1.0 porque el cálculo ya resolvió el valor.
-        return precio_total_combinado, 0.0, 0.0, 1.0
-    # -------------------------------------------------------------------------
-    # FIN LÓGICA DE COMBINADOS
-    # -------------------------------------------------------------------------
-
-    # Búsqueda normal en compras_materia_prima
-    cursor.execute("""
-        SELECT precio_unitario, cotizacion_usd, moneda
-        FROM compras_materia_prima
-        WHERE materia_prima_id = ?
-        ORDER BY fecha DESC, id DESC
-        LIMIT 1
-    """, (materia_prima_id,))
-    
-    compra = cursor.fetchone()
-    if compra:
-        # Nota: He usado índices numéricos por si el row_factory no está como sqlite3.Row
-        # Si usas row_factory = sqlite3.Row, puedes volver a ['precio_unitario']
-        precio_base = compra[0]
-        costo_flete = 0.0 
-        otros_costos = 0.0 
-        cotizacion_usd_reg = compra[1] if compra[1] is not None else 1.0
-        moneda = compra[2]
-        
-        if moneda == 'ARS' and cotizacion_usd_reg <= 1.0:
-            return precio_base, costo_flete, otros_costos, 1.0
-        else:
-            return precio_base, costo_flete, otros_costos, cotizacion_usd_reg
-    else:
-        # Búsqueda en precios_materias_primas
-        cursor.execute("""
-            SELECT precio_unitario, costo_flete, otros_costos, cotizacion_usd
-            FROM precios_materias_primas
-            WHERE materia_prima_id = ?
-            ORDER BY fecha DESC
-            LIMIT 1
-        """, (materia_prima_id,))
-        precio = cursor.fetchone()
-        if precio:
-            return precio[0], precio[1], precio[2], precio[3]
-        
-        return 0.0, 0.0, 0.0, 1.0
-def calcular_costo_total(ingredientes_df, cotizacion_dolar_actual, conn):
+def calcular_costo_total(ingredientes_df, cotizacion_dolar_actual, conn, precios_df=None):
     """
     Calcula el costo total SÓLO de la Materia Prima en ARS.
+    Los precios de la DB se resuelven en una sola consulta (o se reutiliza `precios_df`)
+    y el cálculo por columnas lo hace el motor de `costeo`.
     """
-    detalle_costo = []
-    
-    RECARGO_FIJO_USD_PERCENT = 0.03 # 3%
-    
-    costo_total_mp_ars = 0.0
-    costo_total_recargo_mp_ars = 0.0 
-    costo_total_mp_usd = 0.0 # <-- AÑADIDO: Costo total de MP (Base + Recargo) en USD
-    
-    for index, ingrediente in ingredientes_df.iterrows():
-        materia_prima_id = ingrediente["materia_prima_id"]
-        cantidad_usada = ingrediente["cantidad_simulada"]
-        # FIX: Ahora se espera la columna 'Materia Prima'
-        nombre_mp = ingrediente["Materia Prima"] 
-        
-        precio_manual_unitario = ingrediente.get('precio_unitario_manual', 0.0)
-        cotizacion_manual = ingrediente.get('cotizacion_usd_manual', 1.0)
-
-        cotizacion_usd_reg_bd = 1.0 
-
-        precio_base_usd_final = 0.0 
-        costo_unitario_ars_registrado = 0.0 
-
-        if precio_manual_unitario > 0.0:
-            if cotizacion_manual > 1.0:
-                precio_base_usd_final = precio_manual_unitario
-                cotizacion_usd_reg_bd = cotizacion_manual
-            else:
-                costo_unitario_ars_registrado = precio_manual_unitario
-        
-        elif materia_prima_id != -1:
-            precio_unitario_reg_base, _, _, cotizacion_usd_reg_bd = \
-                obtener_precio_actual_materia_prima(conn, materia_prima_id)
-            
-            if cotizacion_usd_reg_bd > 1.0:
-                precio_base_usd_final = precio_unitario_reg_base 
-            else:
-                costo_unitario_ars_registrado = precio_unitario_reg_base
-                
-        recargo_unitario_ars = 0.0
-        recargo_unitario_usd = 0.0 
-        
-        if precio_base_usd_final > 0.0:
-            recargo_unitario_usd = precio_base_usd_final * RECARGO_FIJO_USD_PERCENT
-            recargo_unitario_ars = recargo_unitario_usd * cotizacion_dolar_actual
-            costo_base_mp_ars_real = precio_base_usd_final * cotizacion_dolar_actual
-            moneda_origen = f'USD ({cotizacion_usd_reg_bd:.2f})'
-        else:
-            costo_base_mp_ars_real = costo_unitario_ars_registrado
-            moneda_origen = 'ARS (Fijo)'
-            precio_base_usd_final = 0.0
-        
-        costo_base_mp_total_ars = cantidad_usada * costo_base_mp_ars_real
-        recargo_mp_total_ars_ingrediente = cantidad_usada * recargo_unitario_ars
-        
-        costo_unitario_final_ars = costo_base_mp_ars_real + recargo_unitario_ars
-        costo_ingrediente_total = cantidad_usada * costo_unitario_final_ars
-        
-        costo_unitario_usd_total = precio_base_usd_final + recargo_unitario_usd 
-        costo_total_usd_ingrediente = cantidad_usada * costo_unitario_usd_total 
-        
-        costo_total_mp_ars += costo_base_mp_total_ars
-        costo_total_recargo_mp_ars += recargo_mp_total_ars_ingrediente 
-        costo_total_mp_usd += costo_total_usd_ingrediente # <-- AÑADIDO: Acumular costo total MP en USD
-        
-        detalle_costo.append({
-            "Materia Prima": nombre_mp,
-            "Unidad": ingrediente["Unidad"],
-            "Cantidad (Simulada)": cantidad_usada,
-            "Moneda Origen": moneda_origen, 
-            "Costo Unit. ARS (Base)": costo_base_mp_ars_real, 
-            "Recargo 3% ARS (Unit.)": recargo_unitario_ars, 
-            "Costo Unit. ARS (Total)": costo_unitario_final_ars,
-            "Costo Total ARS": costo_ingrediente_total,
-            "Costo Unit. USD (Base)": precio_base_usd_final, 
-            "Recargo 3% USD (Unit.)": recargo_unitario_usd, 
-            "Costo Unit. USD (Total)": costo_unitario_usd_total, 
-            "Costo Total USD": costo_total_usd_ingrediente 
-        })
-
-    detalle_df = pd.DataFrame(detalle_costo) 
-    costo_mp_total = detalle_df["Costo Total ARS"].sum() 
-    
-    # <<< CORRECCIÓN: Se usa detalle_df en lugar de detalle_costo_df >>>
-    return costo_mp_total, detalle_df, costo_total_mp_ars, costo_total_recargo_mp_ars, costo_total_mp_usd
-
+    if precios_df is None:
+        precios_df = obtener_precios_materias_primas(DB_PATH, ids_a_resolver(ingredientes_df))
+    return calcular_costo_mp(ingredientes_df, precios_df, cotizacion_dolar_actual)
 
 # =================================================================================================
-# FUNCIONES DE GENERACIÓN DE REPORTE (PDF con ReportLab) (CORREGIDO EL ERROR KEYERROR: 'BodyText')
+# CARGA MASIVA DE ÍTEMS DEL PRESUPUESTO (una sola pasada de costeo para todas las filas)
 # =================================================================================================
+COLUMNAS_CARGA_MASIVA = ["Receta", "Litros", "Envase", "Tandas", "Margen (%)"]
 
-def generate_pdf_reportlab(data):
+def resolver_carga_masiva(tabla_df, margen_por_defecto):
     """
-    Genera el contenido PDF del presupuesto usando la librería ReportLab.
-    
-    MODIFICACIÓN: Muestra el precio unitario por UNIDAD DE ENVASE (ARS/u. y USD/u.) en lugar de por Litro.
-    CORRECCIÓN: Ajuste de anchos y títulos de columna para evitar superposición.
-    
-    [MODIFICACIÓN CLAVE] Muestra el tipo de envase con su capacidad.
+    Traduce la tabla cargada (nombres de receta y envase, sin distinguir mayúsculas) a ids con los catálogos.
+    Envase vacío = a granel; Tandas vacío = 1; Margen vacío = `margen_por_defecto`.
+    Devuelve (items_df, errores) con un mensaje por cada fila que no se pudo interpretar.
     """
-    
-    cliente_nombre = data['cliente_nombre']
-    fecha_hoy = date.today().strftime('%d/%m/%Y')
-    cotizacion_dolar_actual = data['cotizacion_dolar_actual']
-    presupuesto_id = data['presupuesto_id']
-    
-    # Nota: Aquí se asume que df_detalle_final_presupuesto ya tiene la columna 'Litros' (L mayúscula)
-    # y 'Receta' (R mayúscula) y Capacidad_Litros.
-    df_detalle_final = data['df_detalle_final_presupuesto'].copy()
-    
-    precio_unitario_ars_litro_AVG = data['precio_unitario_ars_litro'] 
-    precio_final_ars = data['precio_final_ars']
-    litros_total_acumulado = data['litros_total_acumulado']
-    
-    precio_unitario_usd_litro_AVG = precio_unitario_ars_litro_AVG / cotizacion_dolar_actual
-    precio_final_usd = precio_final_ars / cotizacion_dolar_actual
-    
-    buffer = io.BytesIO()
-    
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), 
-                            leftMargin=0.5*inch, rightMargin=0.5*inch, # Reducir márgenes
-                            topMargin=0.5*inch, bottomMargin=0.5*inch)
-    
-    story = []
-    styles = getSampleStyleSheet()
-    
-    styles.add(ParagraphStyle(name='PresupuestoTitle', fontSize=18, alignment=1, spaceAfter=12, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='PresupuestoHeading2', fontSize=14, alignment=0, spaceAfter=8, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='BodyTextBold', fontSize=11, alignment=0, spaceAfter=6, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='FinalTotalUSD', fontSize=14, alignment=0, spaceAfter=6, fontName='Helvetica-Bold', textColor=colors.blue))
-    
-    # NUEVO ESTILO PARA EL TEXTO DEL CUERPO DE LA TABLA (Para evitar el KeyError)
-    style_table_body = ParagraphStyle(name='BodyTableText', fontSize=9, alignment=0)
-    styles.add(style_table_body)
-    
-    # Título principal
-    story.append(Paragraph(f"PRESUPUESTO N° {presupuesto_id} - CLIENTE: {cliente_nombre}", styles['PresupuestoTitle']))
-    story.append(Spacer(1, 0.2*inch))
-    
-    # Información General
-    story.append(Paragraph(f"**Fecha del Presupuesto:** {fecha_hoy}", styles['BodyTextBold']))
-    story.append(Paragraph(f"**Cotización del Dólar (Ref):** ${cotizacion_dolar_actual:,.2f} ARS/USD", styles['BodyTextBold']))
-    story.append(Spacer(1, 0.3*inch))
-    
-    story.append(Paragraph("Detalle del Pedido", styles['PresupuestoHeading2']))
-    
-    table_data = []
-    
-    # CORRECCIÓN DE ENCABEZADO: Eliminar "Tipo Envase"
-    table_data.append([
-        "Producto", 
-        "Volumen (L)", 
-        "Unidades",  
-        "P. Unit. (ARS/u.)", 
-        "P. Unit. (USD/u.)", 
-        "Total (ARS)",
-        "Total (USD)" 
-    ])
-    
-    total_width = 10.3 * inch # A4 Horizontal es de 11.7, 10.3 es el espacio útil
-    
-    # CORRECCIÓN DE ANCHOS: Ajustar a 7 columnas
-    # Distribuir el espacio que deja Envase_Nombre (0.15) entre Producto y Volumen
-    col_widths = [
-        total_width * 0.30, # Producto (Aumentado de 0.25 a 0.30)
-        total_width * 0.10, # Volumen (L) (Aumentado de 0.08 a 0.10)
-        # total_width * 0.15, # Tipo Envase (ELIMINADO)
-        total_width * 0.10, # Unidades (Aumentado de 0.09 a 0.10)
-        total_width * 0.13, # P. Unit. (ARS/u.) (Aumentado de 0.11 a 0.13)
-        total_width * 0.13, # P. Unit. (USD/u.) (Aumentado de 0.11 a 0.13)
-        total_width * 0.14, # Total (ARS) (Aumentado de 0.11 a 0.14)
-        total_width * 0.10  # Total (USD)
-    ]
-    
-    # [MODIFICACIÓN CLAVE] Obtener el conjunto único de envases con su capacidad
-    unique_envases_display = set()
-    
-    # La lógica para poblar la tabla se mantiene igual, pero quitando la columna Envase_Nombre
-    for index, row in df_detalle_final.iterrows():
-        
-        total_a_pagar_ars = row['Precio_Venta_Total_ARS']
-        total_a_pagar_usd = row['Precio_Venta_Total_USD'] 
-        
-        envase_nombre = row.get('Envase_Nombre', 'N/A')
-        capacidad = row.get('Capacidad_Litros', 0.0) # Se usa para el resumen, no para la tabla
-        unidades_envase_total = row.get('Unidades_Envase_Total', 0)
-        
-        precio_por_envase_ars = 0.0
-        precio_por_envase_usd = 0.0
-        
-        if unidades_envase_total > 0:
-            precio_por_envase_ars = total_a_pagar_ars / unidades_envase_total
-            if cotizacion_dolar_actual > 0:
-                 precio_por_envase_usd = total_a_pagar_usd / unidades_envase_total
-            
-        table_data.append([
-            # Usamos el nuevo estilo 'BodyTableText' para el wrap
-            Paragraph(row['Receta'], style_table_body), 
-            f"{row['Litros']:,.2f} L", # Se espera 'Litros' con L mayúscula
-            # envase_nombre, # ELIMINADO
-            f"{unidades_envase_total:,.0f}", 
-            f"${precio_por_envase_ars:,.2f}", 
-            f"USD ${precio_por_envase_usd:,.2f}", 
-            f"${total_a_pagar_ars:,.2f}",
-            f"USD ${total_a_pagar_usd:,.2f}" 
-        ])
-        
-        # Llenar el conjunto de envases para el resumen
-        if envase_nombre and envase_nombre != 'Sin Envase' and capacidad > 0:
-            display_name = f"{envase_nombre} {capacidad:,.2f} L"
-            unique_envases_display.add(display_name)
-        elif envase_nombre and envase_nombre != 'Sin Envase' and capacidad == 0.0:
-            unique_envases_display.add(envase_nombre)
-
-
-    table = Table(table_data, colWidths=col_widths)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DBEAFE')), 
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#1E3A8A')), 
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        # Ajustar alineación a la derecha para las 6 columnas restantes (índices 2 a 6)
-        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'), # Unidades, Precios y Totales
-        ('ALIGN', (1, 1), (1, -1), 'RIGHT'), # Volumen (L) a la derecha
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10), 
-        ('FONTSIZE', (0, 1), (-1, -1), 9), # Reducir fuente del cuerpo para más espacio
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('PADDING', (0, 0), (-1, -1), 4), # Reducir padding
-    ]))
-    
-    story.append(table)
-    story.append(Spacer(1, 0.3*inch))
-    
-    # Totales Finales
-    story.append(Paragraph(f"**Volumen Total del Pedido:** {litros_total_acumulado:,.2f} Litros", styles['BodyTextBold']))
-    
-    # [MODIFICACIÓN CLAVE] Mostrar el detalle de envases utilizados con capacidad
-    envases_str = ", ".join(unique_envases_display) if unique_envases_display else "No se especificó envase."
-    story.append(Paragraph(f"**Tipos de Envase Utilizados:** {envases_str}", styles['BodyTextBold']))
-    
-    story.append(Spacer(1, 0.1*inch))
-    
-    story.append(Paragraph(f"**TOTAL FINAL A PAGAR: ${precio_final_ars:,.2f} ARS**", 
-                            ParagraphStyle(name='FinalTotal', fontSize=14, alignment=0, spaceAfter=6, 
-                                           fontName='Helvetica-Bold', textColor=colors.red)))
-    
-    story.append(Paragraph(f"**TOTAL FINAL A PAGAR: USD ${precio_final_usd:,.2f}**", 
-                            styles['FinalTotalUSD']))
-    
-    story.append(Spacer(1, 0.5*inch))
-    story.append(Paragraph("*Este presupuesto tiene validez de X días y está sujeto a cambios en los costos de materias primas y cotización del dólar a la fecha de facturación.", 
-                            ParagraphStyle(name='Footer', fontSize=8, alignment=0, textColor=colors.grey)))
+    recetas = obtener_catalogo(DB_PATH, "recetas")
+    envases = obtener_catalogo(DB_PATH, "envases")
+    receta_por_nombre = dict(zip(recetas["nombre"].astype(str).str.strip().str.lower(), zip(recetas["id"], recetas["nombre"])))
+    envase_por_nombre = dict(zip(envases["descripcion"].astype(str).str.strip().str.lower(), zip(envases["id"], envases["descripcion"])))
+
+    tabla_df = tabla_df.reindex(columns=COLUMNAS_CARGA_MASIVA)
+    items, errores = [], []
+    for fila, (receta, litros, envase, tandas, margen) in enumerate(tabla_df.itertuples(index=False), start=1):
+        if pd.isna(receta) or not str(receta).strip():
+            continue
+        receta_encontrada = receta_por_nombre.get(str(receta).strip().lower())
+        if receta_encontrada is None:
+            errores.append(f"Fila {fila}: receta '{receta}' inexistente.")
+            continue
+        litros = pd.to_numeric(litros, errors="coerce")
+        if pd.isna(litros) or litros <= 0:
+            errores.append(f"Fila {fila}: los litros deben ser un número mayor a 0.")
+            continue
+        envase_id, envase_nombre = None, "A granel"
+        if pd.notna(envase) and str(envase).strip():
+            envase_encontrado = envase_por_nombre.get(str(envase).strip().lower())
+            if envase_encontrado is None:
+                errores.append(f"Fila {fila}: envase '{envase}' inexistente.")
+                continue
+            envase_id, envase_nombre = envase_encontrado
+        tandas = pd.to_numeric(tandas, errors="coerce")
+        margen = pd.to_numeric(margen, errors="coerce")
+        items.append({
+            'receta_id': int(receta_encontrada[0]),
+            'nombre_receta': receta_encontrada[1],
+            'litros': float(litros),
+            'envase_id': envase_id,
+            'envase_nombre': envase_nombre,
+            'tandas': int(tandas) if pd.notna(tandas) and tandas >= 1 else 1,
+            'margen': float(margen) if pd.notna(margen) and margen >= 0 else float(margen_por_defecto),
+        })
+    return pd.DataFrame(items), errores
+
+def costear_carga_masiva(items_df, cotizacion_dolar_actual, flete_base_200l, costo_indirecto_litro,
+                         costo_etiqueta_por_envase, costo_caja_por_envase):
+    """
+    Costea una tanda de cada ítem: una consulta para los ingredientes de todas las recetas, la foto
+    de precios en memoria para MP y envases, y una sola llamada al motor (costeo.lote.costear_items).
+    """
+    ingredientes_df = ingredientes_recetas(get_connection(), items_df['receta_id'])
+    precios_df = obtener_precios_materias_primas(DB_PATH, ids_a_resolver(ingredientes_df))
+    return costear_items(
+        items_df,
+        ingredientes_df,
+        precios_df,
+        obtener_snapshot_precios(DB_PATH),
+        cotizacion_dolar_actual,
+        flete=flete_base_200l,
+        costo_indirecto_litro=costo_indirecto_litro,
+        etiqueta=costo_etiqueta_por_envase,
+        caja=costo_caja_por_envase,
+    )
+
+def simulaciones_carga_masiva(items_df, costos_df, cotizacion_dolar_actual, primer_id):
+    """Filas de 'simulaciones_presupuesto' (mismo formato que el alta individual) para cada ítem costeado."""
+    simulaciones = []
+    for i, (item, costo) in enumerate(zip(items_df.to_dict("records"), costos_df.to_dict("records"))):
+        tandas = item['tandas']
+        costo_total_ars = costo['costo_total_final'] * tandas
+        precio_venta_total_ars = precio_con_margen(costo_total_ars, item['margen'])
+        simulaciones.append({
+            'ID': primer_id + i,
+            'nombre_receta': item['nombre_receta'],
+            'litros': item['litros'] * tandas,
+            'costo_total_ars': costo_total_ars,
+            'costo_por_litro_ars': costo['costo_por_litro_ars'],
+            'gasto_indirecto_tanda': costo['gasto_indirecto_tanda'] * tandas,
+            'costo_flete_total_ars': costo['costo_flete_total_ars'] * tandas,
+            'costo_envase_total_ars': costo['costo_total_empaque_ars'] * tandas,
+            'costo_mp_total_ars': costo['costo_mp_total'] * tandas,
+            'costo_total_mp_usd': costo['costo_total_mp_usd'] * tandas,
+            'costo_envase_usd': costo['precio_envase_usd'] * costo['unidades_necesarias'] * tandas,
+            'cotizacion_dolar': cotizacion_dolar_actual,
+            'cantidad_tandas': tandas,
+            'margen_ganancia': item['margen'],
+            'precio_venta_total_ars': precio_venta_total_ars,
+            'precio_venta_total_usd': precio_venta_total_ars / cotizacion_dolar_actual,
+            'envase_info_json': json.dumps({
+                'Envase_Nombre': item['envase_nombre'],
+                'Capacidad_Litros': costo['capacidad_litros'],
+                'Unidades_Envase_Total': costo['unidades_necesarias'] * tandas,
+                'Precio_Envase_Unitario_ARS': costo['precio_envase_usd'] * cotizacion_dolar_actual,
+            }),
+        })
+    return simulaciones
 
-    doc.build(story)
-    
-    pdf_content = buffer.getvalue()
-    buffer.close()
-    return pdf_content
 
 # =================================================================================================
 # INTERFAZ STREAMLIT (LÓGICA ACTUALIZADA)
@@ -623,7 +383,7 @@ def main():
         st.session_state['costo_total'] = 0.0
         st.session_state['detalle_costo'] = pd.DataFrame()
         st.session_state['litros'] = BASE_LITROS
-        st.session_state['dolar'] = 1000.0
+        st.session_state['dolar'] = dolar_sugerido(DB_PATH)
         st.session_state['gasto_fijo_mensual'] = 0.0 
         st.session_state['flete_base_200l'] = 5000.0 
         
@@ -670,6 +430,7 @@ def main():
     
     st.sidebar.subheader(f"Costos Fijos Operativos (Simulación de {calendar.month_name[MES_SIMULACION].capitalize()})")
     
+    marcar_seccion("Sidebar: gastos operativos")
     # -----------------------------------------------------------
     # 1. ENTRADA DEL AÑO DE SIMULACIÓN
     # -----------------------------------------------------------
@@ -681,12 +442,9 @@ def main():
         key="anio_simulacion_value"
     )
     
-    # El valor 'gasto_fijo_mensual_auto' ahora se toma del Session State (actualizado por el editor)
-    gasto_fijo_mensual_auto = st.session_state.gasto_fijo_mensual_total
-    st.session_state['gasto_fijo_mensual'] = gasto_fijo_mensual_auto
-
+    # El total se muestra acá pero se calcula después del editor de gastos (sección 3)
     st.sidebar.markdown(f"**Gasto Operativo Total ({calendar.month_name[MES_SIMULACION].capitalize()} {anio_simulacion}):**")
-    st.sidebar.success(f"${gasto_fijo_mensual_auto:,.2f} ARS (Calculado con Cambios)")
+    total_gastos_placeholder = st.sidebar.empty()
 
     # -----------------------------------------------------------
     # 2. SECCIÓN PARA CARGAR GASTO TEMPORAL (NUEVA IMPLEMENTACIÓN)
@@ -695,7 +453,7 @@ def main():
     st.sidebar.subheader("➕ Cargar Gasto Temporal (Simulación)")
     
     # Obtener categorías de la DB para el selectbox
-    df_categorias = fetch_df("SELECT nombre FROM categorias_imputacion ORDER BY nombre")
+    df_categorias = obtener_catalogo(DB_PATH, "categorias_imputacion")
     categorias = df_categorias['nombre'].tolist() if not df_categorias.empty else ["Sin Categorías"]
     
     with st.sidebar.form("form_gasto_temporal_sidebar"):
@@ -728,7 +486,9 @@ def main():
     MES_GASTOS = MES_SIMULACION
     ANIO_GASTOS = anio_simulacion
     
-    with st.sidebar.expander(f"Detalle y Edición de Gastos Fijos (Simulación {calendar.month_name[MES_GASTOS].capitalize()} {ANIO_GASTOS})"):
+    # El detalle se lee de la DB sólo con el toggle activado (el cuerpo de un expander se ejecuta aunque esté cerrado)
+    montos_editados = False
+    if st.sidebar.toggle(f"Detalle y Edición de Gastos Fijos (Simulación {calendar.month_name[MES_GASTOS].capitalize()} {ANIO_GASTOS})", key="ver_detalle_gastos"):
         # 1. Obtener el detalle de gastos de la DB
         df_detalle_db = get_detalle_gastos_operativos_mensual(MES_GASTOS, ANIO_GASTOS)
         # Agregar una columna de ID único para DB
@@ -764,7 +524,7 @@ def main():
                 )
             }
             # 4. Mostrar el editor y capturar los cambios
-            edited_df_gastos = st.data_editor(
+            edited_df_gastos = st.sidebar.data_editor(
                 df_detalle_gastos,
                 column_config=column_config_gastos,
                 use_container_width=True,
@@ -774,20 +534,32 @@ def main():
                 column_order=["Fecha", "Categoria", "Beneficiario", "Monto_ARS"],
                 key="editor_gastos_operativos"
             )
-            # 5. Recalcular el total y actualizar el session state
-            total_db_simulacion = edited_df_gastos['Monto_ARS'].sum()
-            st.session_state.gasto_fijo_mensual_total = total_db_simulacion
+            # 5. Sólo si se editó algún monto, el total del editor pasa a ser el que usa el Overhead
+            montos_editados = bool(st.session_state["editor_gastos_operativos"].get("edited_rows"))
+            if montos_editados:
+                st.session_state.gasto_fijo_mensual_total = edited_df_gastos['Monto_ARS'].sum()
             
             # Botón para limpiar los gastos temporales
-            if st.button("🗑️ Limpiar Gastos Temporales", key="clear_temp_gastos_button"):
+            if st.sidebar.button("🗑️ Limpiar Gastos Temporales", key="clear_temp_gastos_button"):
                 st.session_state.gastos_temporales_simulacion = [g for g in st.session_state.gastos_temporales_simulacion if not g['ID_Gasto_Unico'].startswith('TEMP_')]
                 st.rerun()
         else:
-            st.warning("No hay gastos fijos registrados para este mes y año. Por favor, agregue un Gasto Temporal si desea simular un Overhead.")
-            st.session_state.gasto_fijo_mensual_total = 0.0
+            st.sidebar.warning("No hay gastos fijos registrados para este mes y año. Por favor, agregue un Gasto Temporal si desea simular un Overhead.")
+
+    # Total del mes: el resumen gastos_mensuales (una sola lectura) más los gastos temporales,
+    # salvo que se haya editado algún monto del detalle (entonces, el total del editor)
+    if montos_editados:
+        gasto_fijo_mensual_auto = st.session_state.gasto_fijo_mensual_total
+    else:
+        gasto_fijo_mensual_auto = total_gastos_mes(conn, MES_SIMULACION, anio_simulacion) + sum(
+            gasto['Monto_ARS'] for gasto in st.session_state.gastos_temporales_simulacion
+        )
+    st.session_state['gasto_fijo_mensual'] = gasto_fijo_mensual_auto
+    total_gastos_placeholder.success(f"${gasto_fijo_mensual_auto:,.2f} ARS (Calculado con Cambios)")
 
     st.sidebar.markdown("---")
 
+    marcar_seccion("Sidebar: flete, overhead y dólar")
     # -----------------------------------------------------------
     # 4. ENTRADA DEL FLETE BASE (ARS)
     # -----------------------------------------------------------
@@ -818,9 +590,7 @@ def main():
         key="volumen_mensual_litros"
     )
 
-    costo_indirecto_por_litro_auto = 0.0
-    if volumen_mensual_litros > 0:
-        costo_indirecto_por_litro_auto = gasto_fijo_mensual_auto / volumen_mensual_litros
+    costo_indirecto_por_litro_auto = costo_indirecto_por_litro(gasto_fijo_mensual_auto, volumen_mensual_litros)
     
     st.sidebar.metric("Costo Indirecto por Litro (Automático)", f"${costo_indirecto_por_litro_auto:,.4f} ARS/L")
 
@@ -833,8 +603,8 @@ def main():
         key="costo_indirecto_manual"
     )
     
-    costo_indirecto_por_litro = costo_indirecto_por_litro_manual if costo_indirecto_por_litro_manual > 0.0 else costo_indirecto_por_litro_auto
-    st.sidebar.metric("Costo Indirecto por Litro (Usado)", f"${costo_indirecto_por_litro:,.2f} ARS/L")
+    costo_indirecto_litro = costo_indirecto_por_litro(gasto_fijo_mensual_auto, volumen_mensual_litros, costo_indirecto_por_litro_manual)
+    st.sidebar.metric("Costo Indirecto por Litro (Usado)", f"${costo_indirecto_litro:,.2f} ARS/L")
 
     # -----------------------------------------------------------
     # 6. COTIZACIÓN DEL DOLAR
@@ -844,7 +614,7 @@ def main():
     cotizacion_dolar_actual = st.sidebar.number_input(
         "Dólar a Utilizar:", 
         min_value=1.0, 
-        value=st.session_state.get('dolar', 1000.0), 
+        value=st.session_state.get('dolar', dolar_sugerido(DB_PATH)), 
         step=1.0, 
         format="%.2f", 
         key="dolar_input", 
@@ -852,6 +622,7 @@ def main():
     )
     st.session_state['dolar'] = cotizacion_dolar_actual
 
+    marcar_seccion("Empaque")
     # -----------------------------------------------------------
     # 7. SELECCIÓN Y CÁLCULO DEL ENVASE (MODIFICADO)
     # -----------------------------------------------------------
@@ -959,22 +730,18 @@ def main():
             capacidad_litros = capacidad_litros_db
             
         # c. Determinar Precio Final (Prioriza Manual ARS)
+        precio_envase_unitario_ars, precio_envase_unitario_usd_base = precio_envase_ars(
+            precio_envase_unitario_usd_base_db, cotizacion_dolar_actual, manual_envase_precio_unitario_ars
+        )
         if manual_envase_precio_unitario_ars > 0.0:
-            precio_envase_unitario_ars = manual_envase_precio_unitario_ars
-            precio_envase_unitario_usd_base = precio_envase_unitario_ars / cotizacion_dolar_actual 
             st.sidebar.info(f"Usando Precio Manual: ${precio_envase_unitario_ars:,.2f} ARS/u. (sobre DB)")
-        else:
-            # Usar precio de DB (convertido a ARS)
-            precio_envase_unitario_usd_base = precio_envase_unitario_usd_base_db
-            precio_envase_unitario_ars = precio_envase_unitario_usd_base_db * cotizacion_dolar_actual
             
     elif manual_envase_precio_unitario_ars > 0.0 and manual_envase_capacidad_litros > 0.0:
         # Se usa solo Envase Manual (DB envase no seleccionado)
         envase_id_actual = -1 
         envase_seleccionado_nombre_final = "Envase Manual"
-        precio_envase_unitario_ars = manual_envase_precio_unitario_ars
+        precio_envase_unitario_ars, precio_envase_unitario_usd_base = precio_envase_ars(0.0, cotizacion_dolar_actual, manual_envase_precio_unitario_ars)
         capacidad_litros = manual_envase_capacidad_litros
-        precio_envase_unitario_usd_base = precio_envase_unitario_ars / cotizacion_dolar_actual
         st.sidebar.info(f"Usando Envase Manual: ${precio_envase_unitario_ars:,.2f} ARS/u. @ {capacidad_litros:,.2f} L")
     
     else:
@@ -987,27 +754,20 @@ def main():
     # 2. Cálculo del costo
     if capacidad_litros > 0 and (precio_envase_unitario_ars > 0.0 or costo_etiqueta_por_envase > 0.0 or costo_caja_por_envase > 0.0):
         
-        # Calcular unidades necesarias (redondeo hacia arriba al entero)
-        unidades_necesarias = int(cantidad_litros / capacidad_litros)
-        if unidades_necesarias * capacidad_litros < cantidad_litros:
-            unidades_necesarias += 1
-        
-        # Costo Total de Envase Principal
-        costo_envase_total_ars = unidades_necesarias * precio_envase_unitario_ars
-        
-        # Cálculo del costo de Empaque Adicional (Etiqueta y Caja)
-        costo_etiqueta_total_ars = costo_etiqueta_por_envase * unidades_necesarias # Costo de la Etiqueta (Adicional)
-        costo_caja_total_ars = costo_caja_por_envase * unidades_necesarias # Costo de la Caja (Adicional)
-
-        # Costo Total de Empaque
-        costo_total_empaque_ars = costo_envase_total_ars + costo_etiqueta_total_ars + costo_caja_total_ars
+        # Envase Principal + Etiqueta + Caja (unidades redondeadas hacia arriba al entero)
+        empaque = calcular_empaque(cantidad_litros, capacidad_litros, precio_envase_unitario_ars, costo_etiqueta_por_envase, costo_caja_por_envase)
+        unidades_necesarias = empaque['unidades_necesarias']
+        costo_envase_total_ars = empaque['costo_envase_total_ars']
+        costo_etiqueta_total_ars = empaque['costo_etiqueta_total_ars']
+        costo_caja_total_ars = empaque['costo_caja_total_ars']
+        costo_total_empaque_ars = empaque['costo_total_empaque_ars']
 
         # [MODIFICACIÓN] Métricas de Desglose de Empaque
         st.sidebar.markdown(f"**Total Envase Principal ({envase_seleccionado_nombre_final}):** ${costo_envase_total_ars:,.2f} ARS")
         st.sidebar.markdown(f"**Total Etiqueta (Tanda):** ${costo_etiqueta_total_ars:,.2f} ARS")
         st.sidebar.markdown(f"**Total Caja (Tanda):** ${costo_caja_total_ars:,.2f} ARS")
         
-        costo_envase_por_litro = costo_total_empaque_ars / cantidad_litros
+        costo_envase_por_litro = empaque['costo_envase_por_litro']
         st.sidebar.metric(
             "Costo Empaque Total por Litro", 
             f"${costo_envase_por_litro:,.4f} ARS/L", 
@@ -1029,6 +789,7 @@ def main():
 
     st.sidebar.markdown("---")
     
+    marcar_seccion("Carga de receta")
     # -----------------------------------------------------------
     # FIN CONFIGURACIÓN SIDEBAR
     # -----------------------------------------------------------
@@ -1039,7 +800,7 @@ def main():
     
     # <<<< INICIO FIX DEL ERROR DE BASE DE DATOS >>>>
     # Se eliminó 'descripcion' de la consulta SQL ya que no existe en la DB.
-    df_recetas = fetch_df("SELECT id, nombre FROM recetas ORDER BY nombre")
+    df_recetas = obtener_catalogo(DB_PATH, "recetas")[["id", "nombre"]]
     recetas_map = {r['nombre']: r for r in df_recetas.to_dict('records')}
     recetas_nombres = ["--- Seleccionar Receta ---"] + df_recetas['nombre'].tolist()
     
@@ -1075,6 +836,7 @@ def main():
     else:
         ingredientes_a_calcular = pd.DataFrame()
     
+    marcar_seccion("Costeo de MP")
     # -----------------------------------------------------------
     # INTERFAZ PARA EDICIÓN DE MP Y AGREGAR MP TEMPORALES
     # -----------------------------------------------------------
@@ -1103,17 +865,14 @@ def main():
         
         # 1. Calcular la cantidad simulada total
         if BASE_LITROS > 0 and cantidad_litros > 0:
-            ingredientes_a_calcular['cantidad_simulada'] = (ingredientes_a_calcular['Cantidad Base (200L)'] / BASE_LITROS) * cantidad_litros
+            ingredientes_a_calcular['cantidad_simulada'] = ingredientes_a_calcular['Cantidad Base (200L)'] * factor_escala(cantidad_litros)
         else:
             ingredientes_a_calcular['cantidad_simulada'] = 0.0
             
         # 2. Buscar el precio base de la DB (solo para visualización)
-        ingredientes_a_calcular['Precio Unitario (USD) BASE'] = 0.0
-        for index, row in ingredientes_a_calcular.iterrows():
-            if row['materia_prima_id'] != -1 and row['precio_unitario_manual'] == 0.0:
-                precio_unitario_reg_base, _, _, cotizacion_usd_reg_bd = obtener_precio_actual_materia_prima(conn, row['materia_prima_id'])
-                if cotizacion_usd_reg_bd > 1.0:
-                    ingredientes_a_calcular.loc[index, 'Precio Unitario (USD) BASE'] = precio_unitario_reg_base
+        # Una sola consulta para todas las MP de la receta; se reutiliza en el cálculo del costo.
+        precios_df = obtener_precios_materias_primas(DB_PATH, ingredientes_a_calcular['materia_prima_id'])
+        ingredientes_a_calcular['Precio Unitario (USD) BASE'] = precio_unitario_usd_base(ingredientes_a_calcular, precios_df)
             
         # 3. Data Editor
         st.subheader("Simulación de Ingredientes y Costos (ARS)")
@@ -1187,9 +946,13 @@ def main():
         # 6. Filtrar ingredientes para el cálculo final (quitar los marcados para Quitar)
         ingredientes_a_calcular = edited_ingredientes_df[~edited_ingredientes_df['Quitar']].copy()
         
-        # 7. Ejecutar el cálculo del costo
+        # 7. Ejecutar el cálculo del costo (si sólo cambiaron los litros, se reescala el de la receta base)
+        factor_tanda = factor_escala(cantidad_litros) if cantidad_litros > 0 else 0.0
         costo_mp_total, detalle_costo_df, costo_total_mp_ars_base, costo_total_recargo_mp_ars, costo_total_mp_usd = \
-            calcular_costo_total(ingredientes_a_calcular, cotizacion_dolar_actual, conn)
+            calcular_costo_tanda_mp(ingredientes_a_calcular, cotizacion_dolar_actual, precios_df, factor_tanda)
+        # Costo de MP de la receta base (factor 1): el barrido de volumen lo escala a cada litro
+        costo_mp_base_receta = costo_mp_base(ingredientes_a_calcular, cotizacion_dolar_actual, precios_df)
+        costo_mp_receta_base, costo_mp_receta_base_usd = costo_mp_base_receta[0], costo_mp_base_receta[4]
         
         # Guardar resultados en Session State
         st.session_state['costo_total'] = costo_mp_total
@@ -1202,34 +965,35 @@ def main():
         costo_total_mp_usd = 0.0
         detalle_costo_df = pd.DataFrame()
         costo_total_recargo_mp_ars = 0.0 
+        costo_mp_receta_base, costo_mp_receta_base_usd = 0.0, 0.0
 
 
     # Reasignación de seguridad
+    marcar_seccion("Totales de la tanda")
     # =================================================================================================
     # CÁLCULO DE FLETE, OVERHEAD Y TOTALES (MODIFICADO)
     # =================================================================================================
     
-    # 1. Costo de Flete
-    if cantidad_litros > 0 and BASE_LITROS > 0:
-        factor_escala = cantidad_litros / BASE_LITROS
-        costo_flete_total_ars = flete_base_200l * factor_escala
-        costo_flete_por_litro = costo_flete_total_ars / cantidad_litros
-    else:
-        costo_flete_total_ars = 0.0
-        costo_flete_por_litro = 0.0
-
-    # 2. Costo de Overhead (Gasto Indirecto)
-    gasto_indirecto_tanda = costo_indirecto_por_litro * cantidad_litros
-    
-    # 3. Costo total de Envase y Empaque (ya calculado en el sidebar)
+    # Flete escalado + Overhead (Gasto Indirecto) + Envase y Empaque (ya calculado en el sidebar)
+    totales = totales_tanda(
+        costo_mp_total,
+        costo_total_mp_usd,
+        cantidad_litros,
+        cotizacion_dolar_actual,
+        flete_base=flete_base_200l,
+        costo_indirecto_litro=costo_indirecto_litro,
+        costo_total_empaque_ars=costo_total_empaque_ars,
+    )
+    costo_flete_total_ars = totales['costo_flete_total_ars']
+    gasto_indirecto_tanda = totales['gasto_indirecto_tanda']
     costo_envase_total_ars_principal = costo_envase_total_ars # Renombrar para claridad
     
-    # 4. Costo Total Final de Producción
-    costo_total_final = costo_mp_total + costo_flete_total_ars + gasto_indirecto_tanda + costo_total_empaque_ars
+    # Costo Total Final de Producción = MP + Flete + Overhead + Empaque
+    costo_total_final = totales['costo_total_final']
     
-    # 5. Costo por Litro
-    costo_por_litro_ars = costo_total_final / cantidad_litros if cantidad_litros > 0 else 0.0
-    costo_por_litro_usd = costo_por_litro_ars / cotizacion_dolar_actual
+    # Costo por Litro
+    costo_por_litro_ars = totales['costo_por_litro_ars']
+    costo_por_litro_usd = totales['costo_por_litro_usd']
     
     # -----------------------------------------------------------
     # RESULTADOS DE COSTEO
@@ -1295,6 +1059,64 @@ def main():
         }
         st.dataframe(detalle_costo_df, column_config=col_config_detalle, use_container_width=True, hide_index=True)
 
+    marcar_seccion("Barrido de volumen")
+    # --------------------------------------------------------------------------------------
+    # BARRIDO DE VOLUMEN: COSTO POR LITRO SEGÚN LOS LITROS (CON REDONDEO DE ENVASES)
+    # --------------------------------------------------------------------------------------
+    st.markdown("---")
+    st.subheader("📈 Barrido de Volumen (Costo por Litro)")
+    if st.toggle("Calcular el costo por litro para un rango de volúmenes", key="barrido_activo"):
+        col_desde, col_hasta, col_puntos = st.columns(3)
+        litros_desde = col_desde.number_input("Desde (L):", min_value=1.0, value=BASE_LITROS, step=50.0, format="%.2f", key="barrido_litros_desde")
+        litros_hasta = col_hasta.number_input("Hasta (L):", min_value=1.0, value=5000.0, step=100.0, format="%.2f", key="barrido_litros_hasta")
+        puntos_barrido = col_puntos.number_input("Puntos:", min_value=10, max_value=5000, value=500, step=50, key="barrido_puntos")
+
+        if litros_hasta <= litros_desde:
+            st.warning("El volumen 'Hasta' debe ser mayor que 'Desde'.")
+        else:
+            # Volúmenes de referencia que suelen pedir los clientes + la tanda actual
+            volumenes_referencia = (BASE_LITROS, 1000.0, 5000.0, float(cantidad_litros))
+            volumenes = volumenes_barrido(litros_desde, litros_hasta, puntos_barrido, volumenes_referencia, capacidad_litros)
+            barrido_df = barrido_volumen(
+                volumenes,
+                costo_mp_receta_base,
+                costo_mp_receta_base_usd,
+                cotizacion_dolar_actual,
+                flete_base=flete_base_200l,
+                costo_indirecto_litro=costo_indirecto_litro,
+                capacidad_litros=capacidad_litros,
+                precio_envase_unitario_ars=precio_envase_unitario_ars,
+                costo_etiqueta_por_envase=costo_etiqueta_por_envase,
+                costo_caja_por_envase=costo_caja_por_envase,
+            )
+
+            st.line_chart(barrido_df, x="Litros", y="Costo por Litro (ARS/L)")
+            if capacidad_litros > 0:
+                st.caption(f"Cada salto es un envase más de {capacidad_litros:,.2f} L (envase, etiqueta y caja se redondean hacia arriba).")
+
+            col_config_barrido = {
+                "Litros": st.column_config.NumberColumn(format="%.2f"),
+                "Unidades": st.column_config.NumberColumn("Envases (u.)", format="%d"),
+                "Costo por Litro (ARS/L)": st.column_config.NumberColumn(format="%.4f"),
+                "Costo por Litro (USD/L)": st.column_config.NumberColumn(format="%.4f"),
+            }
+            for columna in ["Costo MP (ARS)", "Flete (ARS)", "Overhead (ARS)", "Empaque (ARS)", "Costo Total (ARS)", "Costo Total (USD)"]:
+                col_config_barrido[columna] = st.column_config.NumberColumn(format="%.2f")
+            st.dataframe(
+                barrido_df[barrido_df["Litros"].isin(volumenes_referencia)],
+                column_config=col_config_barrido,
+                use_container_width=True,
+                hide_index=True,
+            )
+            st.download_button(
+                "Descargar barrido (CSV)",
+                data=barrido_df.to_csv(index=False).encode("utf-8"),
+                file_name=f"barrido_volumen_{date.today().isoformat()}.csv",
+                mime="text/csv",
+                key="barrido_descargar_csv",
+            )
+
+    marcar_seccion("Gestión de MP temporales")
     # --------------------------------------------------------------------------------------
     # ACCIONES: AGREGAR MATERIA PRIMA TEMPORAL / LIMPIAR
     # --------------------------------------------------------------------------------------
@@ -1411,6 +1233,7 @@ def main():
     # DEFINICIÓN DE MARGEN / PRECIO DE VENTA (EDITABLE)
     # --------------------------------------------------------------------------------------
 
+    marcar_seccion("Tabla de presupuesto")
     # --------------------------------------------------------------------------------------
     # DEFINICIÓN DE MARGEN / PRECIO DE VENTA (BIDIRECCIONAL)
     # --------------------------------------------------------------------------------------
@@ -1451,14 +1274,12 @@ def main():
         # ---- LÓGICA BIDIRECCIONAL ----
         if margen_input != st.session_state.margen_deseado:
             st.session_state.margen_deseado = margen_input
-            st.session_state.precio_venta_manual = costo_total_final * (1 + margen_input / 100)
+            st.session_state.precio_venta_manual = precio_con_margen(costo_total_final, margen_input)
 
         elif precio_input != st.session_state.precio_venta_manual:
             st.session_state.precio_venta_manual = precio_input
 
-            margen_calculado = (
-                (precio_input - costo_total_final) / costo_total_final * 100
-            ) if costo_total_final > 0 else 0.0
+            margen_calculado = margen_desde_precio(precio_input, costo_total_final)
 
             # FIX: nunca permitir margen negativo
             st.session_state.margen_deseado = max(0.0, margen_calculado)
@@ -1553,6 +1374,10 @@ def main():
                     'costo_envase_total_ars': costo_total_empaque_ars * cantidad_a_agregar,
                     'costo_mp_total_ars': costo_mp_total * cantidad_a_agregar,
                     'costo_total_mp_usd': costo_total_mp_usd * cantidad_a_agregar,
+                    # Envase con precio de la DB (USD): también se mueve con el dólar; el manual queda fijo en ARS
+                    'costo_envase_usd': (precio_envase_unitario_usd_base * unidades_necesarias * cantidad_a_agregar
+                                         if manual_envase_precio_unitario_ars <= 0.0 else 0.0),
+                    'cotizacion_dolar': cotizacion_dolar_actual,
                     'cantidad_tandas': cantidad_a_agregar,
                     'margen_ganancia': margen_ganancia_calculado,
                     'precio_venta_total_ars': precio_venta_total_ars,
@@ -1573,6 +1398,65 @@ def main():
 
         st.markdown("---")
 
+    marcar_seccion("Carga masiva")
+    # --------------------------------------------------------------------------------------
+    # 1b. CARGA MASIVA: VARIAS RECETAS AL PRESUPUESTO EN UNA SOLA PASADA
+    # --------------------------------------------------------------------------------------
+    with st.expander("📋 Carga masiva de recetas al presupuesto", expanded=False):
+        st.caption(
+            "Pegá o subí una tabla con Receta, Litros (por tanda), Envase (vacío = a granel), Tandas y Margen (%). "
+            "Se usan el dólar, flete, overhead, etiqueta y caja del sidebar y los precios de la base "
+            "(sin MP temporales ni precios manuales)."
+        )
+        archivo_carga = st.file_uploader("Subir CSV", type=["csv"], key="carga_masiva_csv")
+        if archivo_carga is not None:
+            tabla_inicial = pd.read_csv(archivo_carga)
+        else:
+            tabla_inicial = pd.DataFrame(columns=COLUMNAS_CARGA_MASIVA)
+
+        nombres_recetas = obtener_catalogo(DB_PATH, "recetas")["nombre"].tolist()
+        nombres_envases = obtener_catalogo(DB_PATH, "envases")["descripcion"].tolist()
+        tabla_carga = st.data_editor(
+            tabla_inicial.reindex(columns=COLUMNAS_CARGA_MASIVA),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Receta": st.column_config.SelectboxColumn(options=nombres_recetas, required=True),
+                "Litros": st.column_config.NumberColumn(min_value=0.0, format="%.2f", required=True),
+                "Envase": st.column_config.SelectboxColumn(options=nombres_envases),
+                "Tandas": st.column_config.NumberColumn(min_value=1, step=1, format="%d"),
+                "Margen (%)": st.column_config.NumberColumn(min_value=0.0, format="%.2f"),
+            },
+            key=f"carga_masiva_tabla_{archivo_carga.file_id if archivo_carga is not None else 'manual'}",
+        )
+
+        if st.button("➕ Agregar todas al presupuesto", key="carga_masiva_agregar"):
+            items_carga, errores_carga = resolver_carga_masiva(tabla_carga, st.session_state.margen_deseado)
+            for error in errores_carga:
+                st.error(error)
+            if items_carga.empty:
+                st.warning("No hay filas válidas para agregar.")
+            elif not errores_carga:
+                costos_carga = costear_carga_masiva(
+                    items_carga,
+                    cotizacion_dolar_actual,
+                    flete_base_200l,
+                    costo_indirecto_litro,
+                    costo_etiqueta_por_envase,
+                    costo_caja_por_envase,
+                )
+                nuevas = simulaciones_carga_masiva(
+                    items_carga,
+                    costos_carga,
+                    cotizacion_dolar_actual,
+                    len(st.session_state['simulaciones_presupuesto']) + 1,
+                )
+                st.session_state['simulaciones_presupuesto'].extend(nuevas)
+                st.success(
+                    f"{len(nuevas)} simulaciones añadidas al presupuesto "
+                    f"(precio de venta total ${sum(s['precio_venta_total_ars'] for s in nuevas):,.2f} ARS)."
+                )
 
     # --------------------------------------------------------------------------------------
     # 2. VISUALIZACIÓN Y EDICIÓN DEL PRESUPUESTO ACUMULADO
@@ -1691,6 +1575,13 @@ def main():
             col_c.metric("Precio Final (ARS)", f"${precio_final_ars_total:,.2f}")
             col_c.metric("Precio Final (USD)", f"USD ${precio_final_usd_total:,.2f}")
 
+            # Riesgo cambiario: costo y margen de cada ítem si el dólar se mueve mientras el presupuesto está vigente
+            mostrar_sensibilidad_dolar(
+                items_sensibilidad(st.session_state['simulaciones_presupuesto'], cotizacion_dolar_actual, df_final['precio_venta_total_ars']),
+                cotizacion_dolar_actual,
+                DB_PATH,
+            )
+
             # --------------------------------------------------------------------------------------
             # 4. GUARDADO DE PRESUPUESTO
             # --------------------------------------------------------------------------------------
@@ -1714,6 +1605,8 @@ def main():
                     
                     df_detalle_guardado = pd.concat([
                         df_final_clean[['nombre_receta', 'litros', 'precio_venta_total_ars', 'precio_venta_total_usd']].rename(columns={'nombre_receta': 'Receta', 'precio_venta_total_ars': 'Precio_Venta_Total_ARS', 'precio_venta_total_usd': 'Precio_Venta_Total_USD'}),
+                        # Costo y margen por renglón (para presupuesto_items)
+                        df_final_clean[['costo_total_ars', 'margen_ganancia']].rename(columns={'costo_total_ars': 'Costo Total ARS', 'margen_ganancia': 'Margen_Ganancia'}),
                         df_envase_info[['Envase_Nombre', 'Unidades_Envase_Total', 'Capacidad_Litros']] # <<< CORRECCIÓN: SE INCLUYE Capacidad_Litros
                     ], axis=1)
                     
@@ -1757,6 +1650,8 @@ def main():
                         'df_detalle_final_presupuesto': df_pdf_data
                     }
                     st.session_state['presupuesto_data_for_print'] = data_pdf
+                    # El PDF se genera en segundo plano; la vista previa lo toma ya hecho
+                    encargar_pdf(generate_pdf_reportlab, data_pdf)
                     st.rerun()
 
     # --------------------------------------------------------------------------------------
@@ -1793,8 +1688,8 @@ def main():
             }
         )
         
-        # Generar PDF y botón de descarga
-        pdf_output = generate_pdf_reportlab(data_pdf)
+        # PDF ya generado (por N° y contenido del presupuesto) y botón de descarga
+        pdf_output = obtener_pdf(generate_pdf_reportlab, data_pdf)
         
         st.download_button(
             label=f"⬇️ Descargar Presupuesto N° {data_pdf['presupuesto_id']} ({data_pdf['cliente_nombre']}.pdf)",
@@ -1813,4 +1708,5 @@ def main():
     conn.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with perfil_pagina("Produccion Envases", DB_PATH):
+        main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from costeo.conexion import obtener_conexion
+from costeo.perfil import guardar_jsonl, iniciar_perfil, terminar_perfil
+
+# =================================================================================================
+# PANEL DE PERFIL (opcional): se activa con MINERVA_PERFIL=1 o con ?perfil=1 en la URL
+# =================================================================================================
+RUTA_LOG_PERFIL = "perfil_reruns.jsonl"
+
+def perfil_habilitado():
+    """True si se pidió medir los reruns (variable de entorno o parámetro de la URL)."""
+    if os.environ.get("MINERVA_PERFIL") == "1":
+        return True
+    try:
+        return st.query_params.get("perfil") == "1"
+    except Exception:
+        return False
+
+def mostrar_panel_perfil(resumen):
+    """Panel de depuración en el sidebar: tiempos por sección, consultas SQL y las más lentas con su plan."""
+    with st.sidebar.expander(f"🐢 Perfil del rerun: {resumen['total_ms']:,.0f} ms", expanded=False):
+        st.caption(f"{resumen['consultas']} consultas SQL · {resumen['ms_sql']:,.1f} ms en SQL")
+        st.dataframe(
+            pd.DataFrame(resumen["secciones"]).rename(columns={
+                "seccion": "Sección", "ms": "ms", "consultas": "SQL", "ms_sql": "ms SQL"
+            }),
+            hide_index=True,
+            use_container_width=True,
+        )
+        for lenta in resumen["lentas"]:
+            st.markdown(f"**{lenta['ms']:,.2f} ms** · {lenta['seccion']}")
+            st.code(lenta["sql"], language="sql")
+            if lenta.get("plan"):
+                st.code("\n".join(lenta["plan"]), language="text")
+        st.checkbox(f"Guardar cada rerun en {RUTA_LOG_PERFIL}", key="perfil_guardar_jsonl")
+
+@contextmanager
+def perfil_pagina(pagina, db_path):
+    """
+    Envuelve el main() de una página: si el perfil está habilitado mide el rerun, muestra el panel
+    al final (aunque la página termine antes con return o st.stop) y opcionalmente lo agrega al JSONL.
+    """
+    if not perfil_habilitado():
+        yield
+        return
+    iniciar_perfil(pagina)
+    try:
+        yield
+    finally:
+        perfil = terminar_perfil()
+        resumen = perfil.resumen(obtener_conexion(db_path))
+        mostrar_panel_perfil(resumen)
+        if st.session_state.get("perfil_guardar_jsonl"):
+            guardar_jsonl(resumen, RUTA_LOG_PERFIL)
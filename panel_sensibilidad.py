@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from costeo.conexion import obtener_conexion
+from costeo.sensibilidad import escenarios_dolar, historial_dolar, sensibilidad_presupuesto, variaciones_dolar
+
+# =================================================================================================
+# PANEL DE SENSIBILIDAD AL DÓLAR (compartido por los simuladores)
+# =================================================================================================
+
+def mostrar_sensibilidad_dolar(items_df, cotizacion_dolar_actual, db_path, clave="sensibilidad"):
+    """
+    Expander con el Monte Carlo del dólar para los ítems del presupuesto (ver `sensibilidad_presupuesto`):
+    sortea cotizaciones a partir de los últimos cambios de `historial_cambios_dolar` y muestra
+    P5/P50/P95 de costo y margen por ítem y del total.
+    """
+    with st.expander("🎲 Sensibilidad al Dólar (Monte Carlo)", expanded=False):
+        col_dias, col_escenarios, col_historial = st.columns(3)
+        dias_validez = col_dias.number_input("Validez del presupuesto (días):", min_value=1, max_value=90, value=7, step=1, key=f"{clave}_dias")
+        escenarios = col_escenarios.number_input("Escenarios:", min_value=100, max_value=50000, value=5000, step=500, key=f"{clave}_escenarios")
+        ultimos = col_historial.number_input("Cambios del historial a usar:", min_value=5, max_value=1000, value=60, step=5, key=f"{clave}_ultimos")
+
+        if not st.toggle("Calcular sensibilidad", key=f"{clave}_activa"):
+            return
+
+        inicio = time.perf_counter()
+        variaciones, cambios_por_dia = variaciones_dolar(historial_dolar(obtener_conexion(db_path), ultimos))
+        cotizaciones = escenarios_dolar(cotizacion_dolar_actual, variaciones, cambios_por_dia, dias_validez, escenarios)
+        resultado = sensibilidad_presupuesto(items_df, cotizaciones)
+        ms = (time.perf_counter() - inicio) * 1000.0
+
+        if len(variaciones) == 0:
+            st.warning("No hay historial de cambios del dólar: todos los escenarios usan la cotización actual.")
+        p5, p50, p95 = np.percentile(cotizaciones, (5, 50, 95))
+        col_p5, col_p50, col_p95 = st.columns(3)
+        col_p5.metric("Dólar P5", f"${p5:,.2f}")
+        col_p50.metric("Dólar P50", f"${p50:,.2f}", delta=f"{(p50 / cotizacion_dolar_actual - 1) * 100:+.2f}%")
+        col_p95.metric("Dólar P95", f"${p95:,.2f}", delta=f"{(p95 / cotizacion_dolar_actual - 1) * 100:+.2f}%", delta_color="inverse")
+
+        column_config = {"Receta": st.column_config.TextColumn(disabled=True)}
+        for columna in resultado.columns[1:]:
+            formato = "%.2f" if columna.startswith("Margen") else "$%.2f"
+            column_config[columna] = st.column_config.NumberColumn(format=formato)
+        st.dataframe(resultado, column_config=column_config, use_container_width=True, hide_index=True)
+        st.caption(
+            f"{len(cotizaciones):,} escenarios a {dias_validez} días a partir de {len(variaciones)} cambios "
+            f"({cambios_por_dia:.2f} por día). Precio de venta fijo en ARS; sólo la parte en USD del costo varía. "
+            f"Calculado en {ms:,.0f} ms."
+        )
+
+def items_sensibilidad(simulaciones, cotizacion_dolar_actual, precios_venta_ars):
+    """
+    Arma la tabla de `sensibilidad_presupuesto` a partir de las simulaciones del presupuesto.
+    Los ítems cargados antes de guardar 'cotizacion_dolar' se asumen costeados con el dólar actual.
+    """
+    filas = []
+    for sim, precio_venta_ars in zip(simulaciones, precios_venta_ars):
+        costo_usd = sim.get('costo_total_mp_usd', 0.0) + sim.get('costo_envase_usd', 0.0)
+        filas.append({
+            'Receta': sim['nombre_receta'],
+            'costo_total_ars': sim['costo_total_ars'],
+            'costo_usd': costo_usd,
+            'cotizacion_dolar': sim.get('cotizacion_dolar', cotizacion_dolar_actual),
+            'precio_venta_ars': precio_venta_ars,
+        })
+    return pd.DataFrame(filas, columns=['Receta', 'costo_total_ars', 'costo_usd', 'cotizacion_dolar', 'precio_venta_ars'])
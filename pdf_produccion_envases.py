@@ -0,0 +1,191 @@
+"""
+PDF del presupuesto de Produccion Envases (precio por unidad de envase y envases con su capacidad).
+
+Vive fuera de la página para que la reemisión masiva (exportar_presupuestos.py) lo importe sin
+levantar Streamlit.
+"""
+import io
+from datetime import date
+
+# =================================================================================================
+# IMPORTACIONES REPORTLAB 
+# =================================================================================================
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape 
+
+# =================================================================================================
+# FUNCIONES DE GENERACIÓN DE REPORTE (PDF con ReportLab) (CORREGIDO EL ERROR KEYERROR: 'BodyText')
+# =================================================================================================
+
+def generate_pdf_reportlab(data):
+    """
+    Genera el contenido PDF del presupuesto usando la librería ReportLab.
+    
+    MODIFICACIÓN: Muestra el precio unitario por UNIDAD DE ENVASE (ARS/u. y USD/u.) en lugar de por Litro.
+    CORRECCIÓN: Ajuste de anchos y títulos de columna para evitar superposición.
+    
+    [MODIFICACIÓN CLAVE] Muestra el tipo de envase con su capacidad.
+    """
+    
+    cliente_nombre = data['cliente_nombre']
+    # Fecha con que se guardó el presupuesto (reemisión); en una cotización en curso, la de hoy
+    fecha_presupuesto = (date.fromisoformat(str(data['fecha'])[:10]) if data.get('fecha') else date.today()).strftime('%d/%m/%Y')
+    cotizacion_dolar_actual = data['cotizacion_dolar_actual']
+    presupuesto_id = data['presupuesto_id']
+    
+    # Nota: Aquí se asume que df_detalle_final_presupuesto ya tiene la columna 'Litros' (L mayúscula)
+    # y 'Receta' (R mayúscula) y Capacidad_Litros.
+    df_detalle_final = data['df_detalle_final_presupuesto'].copy()
+    
+    precio_unitario_ars_litro_AVG = data['precio_unitario_ars_litro'] 
+    precio_final_ars = data['precio_final_ars']
+    litros_total_acumulado = data['litros_total_acumulado']
+    
+    precio_unitario_usd_litro_AVG = precio_unitario_ars_litro_AVG / cotizacion_dolar_actual
+    precio_final_usd = precio_final_ars / cotizacion_dolar_actual
+    
+    buffer = io.BytesIO()
+    
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), 
+                            leftMargin=0.5*inch, rightMargin=0.5*inch, # Reducir márgenes
+                            topMargin=0.5*inch, bottomMargin=0.5*inch)
+    
+    story = []
+    styles = getSampleStyleSheet()
+    
+    styles.add(ParagraphStyle(name='PresupuestoTitle', fontSize=18, alignment=1, spaceAfter=12, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='PresupuestoHeading2', fontSize=14, alignment=0, spaceAfter=8, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='BodyTextBold', fontSize=11, alignment=0, spaceAfter=6, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='FinalTotalUSD', fontSize=14, alignment=0, spaceAfter=6, fontName='Helvetica-Bold', textColor=colors.blue))
+    
+    # NUEVO ESTILO PARA EL TEXTO DEL CUERPO DE LA TABLA (Para evitar el KeyError)
+    style_table_body = ParagraphStyle(name='BodyTableText', fontSize=9, alignment=0)
+    styles.add(style_table_body)
+    
+    # Título principal
+    story.append(Paragraph(f"PRESUPUESTO N° {presupuesto_id} - CLIENTE: {cliente_nombre}", styles['PresupuestoTitle']))
+    story.append(Spacer(1, 0.2*inch))
+    
+    # Información General
+    story.append(Paragraph(f"**Fecha del Presupuesto:** {fecha_presupuesto}", styles['BodyTextBold']))
+    story.append(Paragraph(f"**Cotización del Dólar (Ref):** ${cotizacion_dolar_actual:,.2f} ARS/USD", styles['BodyTextBold']))
+    story.append(Spacer(1, 0.3*inch))
+    
+    story.append(Paragraph("Detalle del Pedido", styles['PresupuestoHeading2']))
+    
+    table_data = []
+    
+    # CORRECCIÓN DE ENCABEZADO: Eliminar "Tipo Envase"
+    table_data.append([
+        "Producto", 
+        "Volumen (L)", 
+        "Unidades",  
+        "P. Unit. (ARS/u.)", 
+        "P. Unit. (USD/u.)", 
+        "Total (ARS)",
+        "Total (USD)" 
+    ])
+    
+    total_width = 10.3 * inch # A4 Horizontal es de 11.7, 10.3 es el espacio útil
+    
+    # CORRECCIÓN DE ANCHOS: Ajustar a 7 columnas
+    # Distribuir el espacio que deja Envase_Nombre (0.15) entre Producto y Volumen
+    col_widths = [
+        total_width * 0.30, # Producto (Aumentado de 0.25 a 0.30)
+        total_width * 0.10, # Volumen (L) (Aumentado de 0.08 a 0.10)
+        # total_width * 0.15, # Tipo Envase (ELIMINADO)
+        total_width * 0.10, # Unidades (Aumentado de 0.09 a 0.10)
+        total_width * 0.13, # P. Unit. (ARS/u.) (Aumentado de 0.11 a 0.13)
+        total_width * 0.13, # P. Unit. (USD/u.) (Aumentado de 0.11 a 0.13)
+        total_width * 0.14, # Total (ARS) (Aumentado de 0.11 a 0.14)
+        total_width * 0.10  # Total (USD)
+    ]
+    
+    # [MODIFICACIÓN CLAVE] Obtener el conjunto único de envases con su capacidad
+    unique_envases_display = set()
+    
+    # La lógica para poblar la tabla se mantiene igual, pero quitando la columna Envase_Nombre
+    for index, row in df_detalle_final.iterrows():
+        
+        total_a_pagar_ars = row['Precio_Venta_Total_ARS']
+        total_a_pagar_usd = row['Precio_Venta_Total_USD'] 
+        
+        envase_nombre = row.get('Envase_Nombre', 'N/A')
+        capacidad = row.get('Capacidad_Litros', 0.0) # Se usa para el resumen, no para la tabla
+        unidades_envase_total = row.get('Unidades_Envase_Total', 0)
+        
+        precio_por_envase_ars = 0.0
+        precio_por_envase_usd = 0.0
+        
+        if unidades_envase_total > 0:
+            precio_por_envase_ars = total_a_pagar_ars / unidades_envase_total
+            if cotizacion_dolar_actual > 0:
+                 precio_por_envase_usd = total_a_pagar_usd / unidades_envase_total
+            
+        table_data.append([
+            # Usamos el nuevo estilo 'BodyTableText' para el wrap
+            Paragraph(row['Receta'], style_table_body), 
+            f"{row['Litros']:,.2f} L", # Se espera 'Litros' con L mayúscula
+            # envase_nombre, # ELIMINADO
+            f"{unidades_envase_total:,.0f}", 
+            f"${precio_por_envase_ars:,.2f}", 
+            f"USD ${precio_por_envase_usd:,.2f}", 
+            f"${total_a_pagar_ars:,.2f}",
+            f"USD ${total_a_pagar_usd:,.2f}" 
+        ])
+        
+        # Llenar el conjunto de envases para el resumen
+        if envase_nombre and envase_nombre != 'Sin Envase' and capacidad > 0:
+            display_name = f"{envase_nombre} {capacidad:,.2f} L"
+            unique_envases_display.add(display_name)
+        elif envase_nombre and envase_nombre != 'Sin Envase' and capacidad == 0.0:
+            unique_envases_display.add(envase_nombre)
+
+
+    table = Table(table_data, colWidths=col_widths)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DBEAFE')), 
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#1E3A8A')), 
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        # Ajustar alineación a la derecha para las 6 columnas restantes (índices 2 a 6)
+        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'), # Unidades, Precios y Totales
+        ('ALIGN', (1, 1), (1, -1), 'RIGHT'), # Volumen (L) a la derecha
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10), 
+        ('FONTSIZE', (0, 1), (-1, -1), 9), # Reducir fuente del cuerpo para más espacio
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('PADDING', (0, 0), (-1, -1), 4), # Reducir padding
+    ]))
+    
+    story.append(table)
+    story.append(Spacer(1, 0.3*inch))
+    
+    # Totales Finales
+    story.append(Paragraph(f"**Volumen Total del Pedido:** {litros_total_acumulado:,.2f} Litros", styles['BodyTextBold']))
+    
+    # [MODIFICACIÓN CLAVE] Mostrar el detalle de envases utilizados con capacidad
+    envases_str = ", ".join(unique_envases_display) if unique_envases_display else "No se especificó envase."
+    story.append(Paragraph(f"**Tipos de Envase Utilizados:** {envases_str}", styles['BodyTextBold']))
+    
+    story.append(Spacer(1, 0.1*inch))
+    
+    story.append(Paragraph(f"**TOTAL FINAL A PAGAR: ${precio_final_ars:,.2f} ARS**", 
+                            ParagraphStyle(name='FinalTotal', fontSize=14, alignment=0, spaceAfter=6, 
+                                           fontName='Helvetica-Bold', textColor=colors.red)))
+    
+    story.append(Paragraph(f"**TOTAL FINAL A PAGAR: USD ${precio_final_usd:,.2f}**", 
+                            styles['FinalTotalUSD']))
+    
+    story.append(Spacer(1, 0.5*inch))
+    story.append(Paragraph("*Este presupuesto tiene validez de X días y está sujeto a cambios en los costos de materias primas y cotización del dólar a la fecha de facturación.", 
+                            ParagraphStyle(name='Footer', fontSize=8, alignment=0, textColor=colors.grey)))
+
+    doc.build(story)
+    
+    pdf_content = buffer.getvalue()
+    buffer.close()
+    return pdf_content
@@ -2,32 +2,27 @@ import streamlit as st
 import sqlite3
 import pandas as pd
 
+from costeo.catalogos import obtener_catalogo
+from costeo.conexion import obtener_conexion
+
 # --- Configuración de la Base de Datos ---
 # Asegúrate de que este archivo exista en el mismo directorio
 DB_NAME = 'minerva.db'
 
 def get_db_connection():
-    """Establece y devuelve la conexión a la base de datos SQLite."""
-    conn = sqlite3.connect(DB_NAME)
-    # Permite acceder a las columnas por nombre (útil para fetchall)
-    conn.row_factory = sqlite3.Row 
-    return conn
+    """Devuelve la conexión a la base de datos SQLite del pool del hilo actual."""
+    # Filas sqlite3.Row: permite acceder a las columnas por nombre (útil para fetchall)
+    return obtener_conexion(DB_NAME)
 
 # --- Funciones de Acceso a Datos (CRUD) ---
 
 def fetch_recetas():
-    """Obtiene todas las recetas para el selector."""
-    conn = get_db_connection()
-    recetas = conn.execute("SELECT id, nombre FROM recetas ORDER BY nombre").fetchall()
-    conn.close()
-    return recetas
+    """Obtiene todas las recetas para el selector (catálogo en memoria)."""
+    return obtener_catalogo(DB_NAME, "recetas")[["id", "nombre"]].to_dict("records")
 
 def fetch_materias_primas():
-    """Obtiene todas las materias primas para el selector de ingredientes."""
-    conn = get_db_connection()
-    mp = conn.execute("SELECT id, nombre, unidad FROM materias_primas ORDER BY nombre").fetchall()
-    conn.close()
-    return mp
+    """Obtiene todas las materias primas para el selector de ingredientes (catálogo en memoria)."""
+    return obtener_catalogo(DB_NAME, "materias_primas")[["id", "nombre", "unidad"]].to_dict("records")
 
 def fetch_ingredientes_receta(receta_id):
     """Obtiene los ingredientes actuales de una receta específica."""
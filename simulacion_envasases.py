@@ -7,6 +7,34 @@ import json
 import base64 
 import io
 
+from cache_pdf import encargar_pdf, obtener_pdf
+from cache_costeo import calcular_costo_tanda_mp
+from cache_precios import dolar_sugerido, obtener_precios_materias_primas, obtener_snapshot_precios
+from costeo import (
+    BASE_LITROS,
+    DIAS_HABILES_FIJOS_MENSUAL,
+    RECETAS_DIARIAS,
+    VOLUMEN_MENSUAL_AUTOMATICO,
+    SQL_DETALLE_GASTOS_MES,
+    calcular_costo_mp,
+    calcular_empaque,
+    costo_indirecto_por_litro,
+    factor_escala,
+    ids_a_resolver,
+    precio_con_margen,
+    precio_envase_ars,
+    precio_unitario_usd_base,
+    rango_mes,
+    total_gastos_mes,
+    totales_tanda,
+)
+from costeo.catalogos import invalidar_catalogos, obtener_catalogo
+from costeo.conexion import obtener_conexion
+from costeo.migraciones import aplicar_migraciones
+from costeo.presupuestos import guardar_items_presupuesto
+from costeo.perfil import marcar_seccion
+from panel_perfil import perfil_pagina
+
 # =================================================================================================
 # IMPORTACIONES REPORTLAB 
 # =================================================================================================
@@ -21,21 +49,15 @@ from reportlab.lib.pagesizes import A4, landscape
 # CONFIGURACIÓN Y CONSTANTES
 # =================================================================================================
 DB_PATH = "minerva.db"
-BASE_LITROS = 200.0 # Cantidad base de la receta original (Litros)
-# CONSTANTES CLAVE BASADAS EN LA LÓGICA DE PRESUPUESTO
-RECETAS_DIARIAS = 8.0 
-DIAS_HABILES_FIJOS_MENSUAL = 20.0 
-VOLUMEN_MENSUAL_AUTOMATICO = RECETAS_DIARIAS * DIAS_HABILES_FIJOS_MENSUAL * BASE_LITROS # 32000.0 L
+# BASE_LITROS, RECETAS_DIARIAS, DIAS_HABILES_FIJOS_MENSUAL y VOLUMEN_MENSUAL_AUTOMATICO vienen de `costeo`
 
 # =================================================================================================
 # UTILIDADES DB
 # =================================================================================================
 
 def get_connection():
-    """Establece la conexión a la base de datos."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row 
-    return conn
+    """Conexión a la base de datos: la del pool del hilo actual (WAL y PRAGMAs ya aplicados)."""
+    return obtener_conexion(DB_PATH)
 
 def fetch_df(query, params=()):
     """Ejecuta una consulta SELECT y devuelve los resultados como un DataFrame de Pandas."""
@@ -51,12 +73,12 @@ def fetch_df(query, params=()):
     return df
 
 def get_categoria_id_by_name(category_name):
-    """Busca el ID de una categoría por su nombre."""
-    query = "SELECT id FROM categorias_imputacion WHERE nombre = ?"
-    df = fetch_df(query, (category_name,))
+    """Busca el ID de una categoría por su nombre (en el catálogo en memoria)."""
+    df = obtener_catalogo(DB_PATH, "categorias_imputacion")
+    df = df[df["nombre"] == category_name]
     if df.empty:
         return None
-    return df.iloc[0, 0]
+    return df["id"].iloc[0]
 
 def create_tables_if_not_exists(conn):
     """Crea las tablas de Clientes y Presupuestos si no existen."""
@@ -87,16 +109,20 @@ def create_tables_if_not_exists(conn):
     
     conn.commit()
 
+    # Índices y demás cambios de esquema versionados (no hace nada si ya están aplicados)
+    aplicar_migraciones(conn)
+
 def get_or_create_client(conn, client_name):
-    """Obtiene el ID del cliente o lo crea si no existe."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM clientes WHERE nombre = ?", (client_name,))
-    row = cursor.fetchone()
-    if row:
-        return row['id']
+    """Obtiene el ID del cliente (del catálogo en memoria) o lo crea si no existe."""
+    df_clientes = obtener_catalogo(DB_PATH, "clientes")
+    existentes = df_clientes.loc[df_clientes["nombre"] == client_name, "id"]
+    if not existentes.empty:
+        return int(existentes.iloc[0])
     else:
+        cursor = conn.cursor()
         cursor.execute("INSERT INTO clientes (nombre) VALUES (?)", (client_name,))
         conn.commit()
+        invalidar_catalogos(DB_PATH, "clientes")
         return cursor.lastrowid
 
 def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json):
@@ -107,6 +133,8 @@ def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros
         INSERT INTO presupuestos (cliente_id, fecha, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json)
         VALUES (?, ?, ?, ?, ?, ?, ?)
     """, (cliente_id, fecha_hoy, porcentaje_ganancia, volumen_total_litros, costo_total_ars, precio_final_ars, detalle_simulaciones_json))
+    # Renglones en presupuesto_items (misma transacción) para los reportes por receta
+    guardar_items_presupuesto(conn, cursor.lastrowid)
     conn.commit()
     return cursor.lastrowid 
 
@@ -115,23 +143,11 @@ def save_presupuesto(conn, cliente_id, porcentaje_ganancia, volumen_total_litros
 # =================================================================================================
 
 def get_detalle_gastos_operativos_mensual(mes: int, anio: int):
-    """Obtiene el detalle de gastos operativos para un mes y año específico."""
-    query = f"""
-    SELECT
-        g.fecha_factura AS Fecha,
-        ci.nombre AS Categoria,
-        g.beneficiario_nombre AS Beneficiario,
-        g.importe_total AS Monto_ARS
-    FROM
-        gastos g
-    JOIN
-        categorias_imputacion ci ON g.categoria_id = ci.id
-    WHERE
-        strftime('%Y', g.fecha_factura) = '{anio}' AND strftime('%m', g.fecha_factura) = '{mes:02d}'
-    ORDER BY
-        g.fecha_factura, ci.nombre;
     """
-    df_gastos = fetch_df(query) 
+    Obtiene el detalle de gastos operativos para un mes y año específico.
+    Filtra por rango de fechas [1° del mes, 1° del mes siguiente) para usar el índice de fecha_factura.
+    """
+    df_gastos = fetch_df(SQL_DETALLE_GASTOS_MES, rango_mes(mes, anio))
     return df_gastos
 
 # =================================================================================================
@@ -139,45 +155,16 @@ def get_detalle_gastos_operativos_mensual(mes: int, anio: int):
 # =================================================================================================
 
 def obtener_envases_disponibles(conn):
-    """Obtiene la lista completa de envases disponibles con IDs y capacidad."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, descripcion, capacidad_litros FROM envases ORDER BY descripcion")
-    return [dict(row) for row in cursor.fetchall()]
+    """Obtiene la lista completa de envases disponibles con IDs y capacidad (catálogo en memoria)."""
+    df_envases = obtener_catalogo(DB_PATH, "envases")[["id", "descripcion", "capacidad_litros"]]
+    return df_envases.astype(object).where(df_envases.notna(), None).to_dict("records")
 
 def obtener_precio_envase_actual(conn, envase_id):
     """
     Obtiene el último precio unitario registrado de un envase (ASUMIDO USD BASE) y su capacidad en litros.
+    Se lee de la foto de precios en memoria (se recarga sólo si hay ingresos nuevos).
     """
-    if envase_id is None or envase_id == -1:
-        # Se asume 0.0 USD y 0.0 Litros
-        return 0.0, 0.0 # precio_unitario_usd_base, capacidad_litros
-
-    cursor = conn.cursor()
-    
-    # 1. Obtener el último precio unitario (asume que la entrada más reciente es el precio actual)
-    cursor.execute("""
-        SELECT precio_unitario
-        FROM entradas_envases
-        WHERE envase_id = ?
-        ORDER BY fecha_ingreso DESC, id DESC
-        LIMIT 1
-    """, (envase_id,))
-    
-    entrada = cursor.fetchone()
-    # Se asume que este es el precio base en USD para aplicar la cotización del día
-    precio_unitario_usd_base = entrada['precio_unitario'] if entrada and entrada['precio_unitario'] is not None else 0.0
-
-    # 2. Obtener la capacidad en litros
-    cursor.execute("""
-        SELECT capacidad_litros
-        FROM envases
-        WHERE id = ?
-    """, (envase_id,))
-    
-    envase = cursor.fetchone()
-    capacidad_litros = envase['capacidad_litros'] if envase and envase['capacidad_litros'] is not None else 0.0
-    
-    return precio_unitario_usd_base, capacidad_litros
+    return obtener_snapshot_precios(DB_PATH).precio_envase(envase_id)
 
 
 # =================================================================================================
@@ -185,10 +172,8 @@ def obtener_precio_envase_actual(conn, envase_id):
 # =================================================================================================
 
 def obtener_todas_materias_primas(conn):
-    """Obtiene la lista completa de materias primas disponibles con IDs."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, nombre, unidad FROM materias_primas ORDER BY nombre")
-    return [dict(row) for row in cursor.fetchall()]
+    """Obtiene la lista completa de materias primas disponibles con IDs (catálogo en memoria)."""
+    return obtener_catalogo(DB_PATH, "materias_primas")[["id", "nombre", "unidad"]].to_dict("records")
 
 def obtener_ingredientes_receta(conn, receta_id):
     """Obtiene los ingredientes actuales de una receta."""
@@ -210,135 +195,21 @@ def obtener_ingredientes_receta(conn, receta_id):
 def obtener_precio_actual_materia_prima(conn, materia_prima_id):
     """
     Obtiene el último precio unitario y la cotización USD registrada.
+    Las MP combinadas (ej: SERUM) se costean sumando sus partes.
     """
     if materia_prima_id == -1:
         return 0.0, 0.0, 0.0, 1.0
+    return tuple(obtener_precios_materias_primas(DB_PATH, [materia_prima_id]).iloc[0])
 
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT precio_unitario, cotizacion_usd, moneda
-        FROM compras_materia_prima
-        WHERE materia_prima_id = ?
-        ORDER BY fecha DESC, id DESC
-        LIMIT 1
-    """, (materia_prima_id,))
-    
-    compra = cursor.fetchone()
-    if compra:
-        precio_base = compra['precio_unitario']
-        costo_flete = 0.0 
-        otros_costos = 0.0 
-        cotizacion_usd_reg = compra['cotizacion_usd'] if compra['cotizacion_usd'] is not None else 1.0
-        moneda = compra['moneda']
-        
-        if moneda == 'ARS' and cotizacion_usd_reg <= 1.0:
-            return precio_base, costo_flete, otros_costos, 1.0
-        else:
-            return precio_base, costo_flete, otros_costos, cotizacion_usd_reg
-    else:
-        cursor.execute("""
-            SELECT precio_unitario, costo_flete, otros_costos, cotizacion_usd
-            FROM precios_materias_primas
-            WHERE materia_prima_id = ?
-            ORDER BY fecha DESC
-            LIMIT 1
-        """, (materia_prima_id,))
-        precio = cursor.fetchone()
-        if precio:
-            return precio['precio_unitario'], precio['costo_flete'], precio['otros_costos'], precio['cotizacion_usd']
-        
-        return 0.0, 0.0, 0.0, 1.0
-
-def calcular_costo_total(ingredientes_df, cotizacion_dolar_actual, conn):
+def calcular_costo_total(ingredientes_df, cotizacion_dolar_actual, conn, precios_df=None):
     """
     Calcula el costo total SÓLO de la Materia Prima en ARS.
+    Los precios salen de la foto en memoria (o se reutiliza `precios_df`)
+    y el cálculo por columnas lo hace el motor de `costeo`.
     """
-    detalle_costo = []
-    
-    RECARGO_FIJO_USD_PERCENT = 0.03 # 3%
-    
-    costo_total_mp_ars = 0.0 # Costo total base de MP en ARS
-    costo_total_recargo_mp_ars = 0.0 # Costo total del recargo de MP en ARS
-    costo_total_mp_usd = 0.0 # Costo total de MP (Base + Recargo) en USD
-    costo_total_mp_ars_base = 0.0 # Variable agregada para consistencia con el retorno
-
-    
-    for index, ingrediente in ingredientes_df.iterrows():
-        materia_prima_id = ingrediente["materia_prima_id"]
-        cantidad_usada = ingrediente["cantidad_simulada"]
-        # FIX: Ahora se espera la columna 'Materia Prima'
-        nombre_mp = ingrediente["Materia Prima"] 
-        
-        precio_manual_unitario = ingrediente.get('precio_unitario_manual', 0.0)
-        cotizacion_manual = ingrediente.get('cotizacion_usd_manual', 1.0)
-
-        cotizacion_usd_reg_bd = 1.0 
-
-        precio_base_usd_final = 0.0 
-        costo_unitario_ars_registrado = 0.0 
-
-        if precio_manual_unitario > 0.0:
-            if cotizacion_manual > 1.0:
-                precio_base_usd_final = precio_manual_unitario
-                cotizacion_usd_reg_bd = cotizacion_manual
-            else:
-                costo_unitario_ars_registrado = precio_manual_unitario
-        
-        elif materia_prima_id != -1:
-            precio_unitario_reg_base, _, _, cotizacion_usd_reg_bd = \
-                obtener_precio_actual_materia_prima(conn, materia_prima_id)
-            
-            if cotizacion_usd_reg_bd > 1.0:
-                precio_base_usd_final = precio_unitario_reg_base 
-            else:
-                costo_unitario_ars_registrado = precio_unitario_reg_base
-                
-        recargo_unitario_ars = 0.0
-        recargo_unitario_usd = 0.0 
-        
-        if precio_base_usd_final > 0.0:
-            recargo_unitario_usd = precio_base_usd_final * RECARGO_FIJO_USD_PERCENT
-            recargo_unitario_ars = recargo_unitario_usd * cotizacion_dolar_actual
-            costo_base_mp_ars_real = precio_base_usd_final * cotizacion_dolar_actual
-            moneda_origen = f'USD ({cotizacion_usd_reg_bd:.2f})'
-        else:
-            costo_base_mp_ars_real = costo_unitario_ars_registrado
-            moneda_origen = 'ARS (Fijo)'
-            precio_base_usd_final = 0.0
-        
-        costo_base_mp_total_ars = cantidad_usada * costo_base_mp_ars_real
-        recargo_mp_total_ars_ingrediente = cantidad_usada * recargo_unitario_ars
-        
-        costo_unitario_final_ars = costo_base_mp_ars_real + recargo_unitario_ars
-        costo_ingrediente_total = cantidad_usada * costo_unitario_final_ars
-        
-        costo_unitario_usd_total = precio_base_usd_final + recargo_unitario_usd 
-        costo_total_usd_ingrediente = cantidad_usada * costo_unitario_usd_total 
-        
-        costo_total_mp_ars_base += costo_base_mp_total_ars # Acumular costo total base MP en ARS
-        costo_total_recargo_mp_ars += recargo_mp_total_ars_ingrediente 
-        costo_total_mp_usd += costo_total_usd_ingrediente 
-        
-        detalle_costo.append({
-            "Materia Prima": nombre_mp,
-            "Unidad": ingrediente["Unidad"],
-            "Cantidad (Simulada)": cantidad_usada,
-            "Moneda Origen": moneda_origen, 
-            "Costo Unit. ARS (Base)": costo_base_mp_ars_real, 
-            "Recargo 3% ARS (Unit.)": recargo_unitario_ars, 
-            "Costo Unit. ARS (Total)": costo_unitario_final_ars,
-            "Costo Total ARS": costo_ingrediente_total,
-            "Costo Unit. USD (Base)": precio_base_usd_final, 
-            "Recargo 3% USD (Unit.)": recargo_unitario_usd, 
-            "Costo Unit. USD (Total)": costo_unitario_usd_total, 
-            "Costo Total USD": costo_total_usd_ingrediente 
-        })
-
-    detalle_df = pd.DataFrame(detalle_costo) 
-    costo_mp_total = detalle_df["Costo Total ARS"].sum() # Costo total (base + recargo) en ARS
-    
-    return costo_mp_total, detalle_df, costo_total_mp_ars_base, costo_total_recargo_mp_ars, costo_total_mp_usd
-
+    if precios_df is None:
+        precios_df = obtener_precios_materias_primas(DB_PATH, ids_a_resolver(ingredientes_df))
+    return calcular_costo_mp(ingredientes_df, precios_df, cotizacion_dolar_actual)
 
 # =================================================================================================
 # FUNCIONES DE GENERACIÓN DE REPORTE (PDF con ReportLab) (CORREGIDO EL ERROR KEYERROR: 'BodyText')
@@ -350,7 +221,8 @@ def generate_pdf_reportlab(data):
     """
     
     cliente_nombre = data['cliente_nombre']
-    fecha_hoy = date.today().strftime('%d/%m/%Y')
+    # Fecha con que se guardó el presupuesto (reemisión); en una cotización en curso, la de hoy
+    fecha_presupuesto = (date.fromisoformat(str(data['fecha'])[:10]) if data.get('fecha') else date.today()).strftime('%d/%m/%Y')
     cotizacion_dolar_actual = data['cotizacion_dolar_actual']
     presupuesto_id = data['presupuesto_id']
     
@@ -385,7 +257,7 @@ def generate_pdf_reportlab(data):
     story.append(Spacer(1, 0.2*inch))
     
     # Información General
-    story.append(Paragraph(f"**Fecha del Presupuesto:** {fecha_hoy}", styles['BodyTextBold']))
+    story.append(Paragraph(f"**Fecha del Presupuesto:** {fecha_presupuesto}", styles['BodyTextBold']))
     story.append(Paragraph(f"**Cotización del Dólar (Ref):** ${cotizacion_dolar_actual:,.2f} ARS/USD", styles['BodyTextBold']))
     story.append(Spacer(1, 0.3*inch))
     
@@ -507,7 +379,7 @@ def main():
         st.session_state['costo_total'] = 0.0
         st.session_state['detalle_costo'] = pd.DataFrame()
         st.session_state['litros'] = BASE_LITROS
-        st.session_state['dolar'] = 1000.0
+        st.session_state['dolar'] = dolar_sugerido(DB_PATH)
         st.session_state['gasto_fijo_mensual'] = 0.0 
         st.session_state['flete_base_200l'] = 5000.0 
         
@@ -540,6 +412,7 @@ def main():
     
     st.sidebar.subheader(f"Costos Fijos Operativos (Simulación de {calendar.month_name[MES_SIMULACION].capitalize()})")
     
+    marcar_seccion("Sidebar: gastos operativos")
     # -----------------------------------------------------------
     # 1. ENTRADA DEL AÑO DE SIMULACIÓN
     # -----------------------------------------------------------
@@ -551,12 +424,9 @@ def main():
         key="anio_simulacion_value"
     )
     
-    # El valor 'gasto_fijo_mensual_auto' ahora se toma del Session State (actualizado por el editor)
-    gasto_fijo_mensual_auto = st.session_state.gasto_fijo_mensual_total
-    st.session_state['gasto_fijo_mensual'] = gasto_fijo_mensual_auto
-
+    # El total se muestra acá pero se calcula después del editor de gastos (sección 3)
     st.sidebar.markdown(f"**Gasto Operativo Total ({calendar.month_name[MES_SIMULACION].capitalize()} {anio_simulacion}):**")
-    st.sidebar.success(f"${gasto_fijo_mensual_auto:,.2f} ARS (Calculado con Cambios)")
+    total_gastos_placeholder = st.sidebar.empty()
 
     # -----------------------------------------------------------
     # 2. SECCIÓN PARA CARGAR GASTO TEMPORAL (NUEVA IMPLEMENTACIÓN)
@@ -565,7 +435,7 @@ def main():
     st.sidebar.subheader("➕ Cargar Gasto Temporal (Simulación)")
     
     # Obtener categorías de la DB para el selectbox
-    df_categorias = fetch_df("SELECT nombre FROM categorias_imputacion ORDER BY nombre")
+    df_categorias = obtener_catalogo(DB_PATH, "categorias_imputacion")
     categorias = df_categorias['nombre'].tolist() if not df_categorias.empty else ["Sin Categorías"]
     
     with st.sidebar.form("form_gasto_temporal_sidebar"):
@@ -598,7 +468,9 @@ def main():
     MES_GASTOS = MES_SIMULACION
     ANIO_GASTOS = anio_simulacion
     
-    with st.sidebar.expander(f"Detalle y Edición de Gastos Fijos (Simulación {calendar.month_name[MES_GASTOS].capitalize()} {ANIO_GASTOS})"):
+    # El detalle se lee de la DB sólo con el toggle activado (el cuerpo de un expander se ejecuta aunque esté cerrado)
+    montos_editados = False
+    if st.sidebar.toggle(f"Detalle y Edición de Gastos Fijos (Simulación {calendar.month_name[MES_GASTOS].capitalize()} {ANIO_GASTOS})", key="ver_detalle_gastos"):
         # 1. Obtener el detalle de gastos de la DB
         df_detalle_db = get_detalle_gastos_operativos_mensual(MES_GASTOS, ANIO_GASTOS)
         # Agregar una columna de ID único para DB
@@ -634,7 +506,7 @@ def main():
                 )
             }
             # 4. Mostrar el editor y capturar los cambios
-            edited_df_gastos = st.data_editor(
+            edited_df_gastos = st.sidebar.data_editor(
                 df_detalle_gastos,
                 column_config=column_config_gastos,
                 use_container_width=True,
@@ -644,20 +516,30 @@ def main():
                 column_order=["Fecha", "Categoria", "Beneficiario", "Monto_ARS"],
                 key="editor_gastos_operativos"
             )
-            # 5. Recalcular el total y actualizar el session state
-            if not edited_df_gastos.empty:
-                total_db_simulacion = edited_df_gastos['Monto_ARS'].sum()
-                st.session_state.gasto_fijo_mensual_total = total_db_simulacion
-            else:
-                 st.session_state.gasto_fijo_mensual_total = 0.0
+            # 5. Sólo si se editó algún monto, el total del editor pasa a ser el que usa el Overhead
+            montos_editados = bool(st.session_state["editor_gastos_operativos"].get("edited_rows"))
+            if montos_editados:
+                st.session_state.gasto_fijo_mensual_total = edited_df_gastos['Monto_ARS'].sum()
 
             # Botón para limpiar los gastos temporales
-            if st.button("Limpiar Gastos Temporales (de la lista)"):
+            if st.sidebar.button("Limpiar Gastos Temporales (de la lista)"):
                 st.session_state.gastos_temporales_simulacion = []
                 st.rerun()
         else:
-            st.info("No hay gastos fijos registrados en la DB para este mes/año ni gastos temporales.")
+            st.sidebar.info("No hay gastos fijos registrados en la DB para este mes/año ni gastos temporales.")
+
+    # Total del mes: el resumen gastos_mensuales (una sola lectura) más los gastos temporales,
+    # salvo que se haya editado algún monto del detalle (entonces, el total del editor)
+    if montos_editados:
+        gasto_fijo_mensual_auto = st.session_state.gasto_fijo_mensual_total
+    else:
+        gasto_fijo_mensual_auto = total_gastos_mes(conn, MES_SIMULACION, anio_simulacion) + sum(
+            gasto['Monto_ARS'] for gasto in st.session_state.gastos_temporales_simulacion
+        )
+    st.session_state['gasto_fijo_mensual'] = gasto_fijo_mensual_auto
+    total_gastos_placeholder.success(f"${gasto_fijo_mensual_auto:,.2f} ARS (Calculado con Cambios)")
 
+    marcar_seccion("Sidebar: overhead, dólar y flete")
     # -----------------------------------------------------------
     # 4. VOLUMEN MENSUAL Y CÁLCULO DE OVERHEAD
     # -----------------------------------------------------------
@@ -679,11 +561,10 @@ def main():
     
     volumen_a_usar = volumen_mensual_manual if volumen_mensual_manual > 0.0 else volumen_mensual_auto
 
+    costo_indirecto_por_litro_auto = costo_indirecto_por_litro(gasto_fijo_mensual_auto, volumen_a_usar)
     if volumen_a_usar > 0:
-        costo_indirecto_por_litro_auto = st.session_state.gasto_fijo_mensual_total / volumen_a_usar
         st.sidebar.metric("Costo Indirecto (Overhead) por Litro (Auto)", f"${costo_indirecto_por_litro_auto:,.4f} ARS/L")
     else:
-        costo_indirecto_por_litro_auto = 0.0
         st.sidebar.warning("Volumen mensual proyectado es cero, no se puede calcular Overhead/Litro.")
         
     costo_indirecto_por_litro_manual = st.sidebar.number_input(
@@ -696,8 +577,8 @@ def main():
         help="Si es > 0, anula el cálculo automático de Overhead/Litro."
     )
     
-    costo_indirecto_por_litro = costo_indirecto_por_litro_manual if costo_indirecto_por_litro_manual > 0.0 else costo_indirecto_por_litro_auto
-    st.sidebar.metric("Costo Indirecto por Litro (Usado)", f"${costo_indirecto_por_litro:,.2f} ARS/L")
+    costo_indirecto_litro = costo_indirecto_por_litro(gasto_fijo_mensual_auto, volumen_a_usar, costo_indirecto_por_litro_manual)
+    st.sidebar.metric("Costo Indirecto por Litro (Usado)", f"${costo_indirecto_litro:,.2f} ARS/L")
 
     # -----------------------------------------------------------
     # 5. COTIZACIÓN DEL DOLAR
@@ -707,7 +588,7 @@ def main():
     cotizacion_dolar_actual = st.sidebar.number_input(
         "Dólar a Utilizar:", 
         min_value=1.0, 
-        value=st.session_state.get('dolar', 1000.0), 
+        value=st.session_state.get('dolar', dolar_sugerido(DB_PATH)), 
         step=1.0, 
         format="%.2f", 
         key="dolar_input",
@@ -731,6 +612,7 @@ def main():
     )
     st.session_state['flete_base_200l'] = flete_base_200l
     
+    marcar_seccion("Sidebar: envase")
     # -----------------------------------------------------------
     # 7. SELECCIÓN Y CÁLCULO DEL ENVASE (MODIFICADO)
     # -----------------------------------------------------------
@@ -766,7 +648,7 @@ def main():
         
         # 1. Obtener precios de Envase Principal
         precio_envase_unitario_usd_base, capacidad_litros = obtener_precio_envase_actual(conn, envase_id_actual)
-        precio_envase_unitario_ars = precio_envase_unitario_usd_base * cotizacion_dolar_actual
+        precio_envase_unitario_ars, precio_envase_unitario_usd_base = precio_envase_ars(precio_envase_unitario_usd_base, cotizacion_dolar_actual)
         
         st.sidebar.metric(
             f"Capacidad del Envase: {capacidad_litros} L", 
@@ -803,6 +685,7 @@ def main():
         precio_envase_unitario_ars = 0.0
         precio_envase_unitario_usd_base = 0.0
 
+    marcar_seccion("Carga de receta")
     # -----------------------------------------------------------
     # FIN CONFIGURACIÓN SIDEBAR
     # -----------------------------------------------------------
@@ -813,7 +696,7 @@ def main():
     
     # <<<< INICIO LÓGICA DE RECETA >>>>
     
-    df_recetas = fetch_df("SELECT id, nombre FROM recetas ORDER BY nombre")
+    df_recetas = obtener_catalogo(DB_PATH, "recetas")[["id", "nombre"]]
     recetas_map = {r['nombre']: r for r in df_recetas.to_dict('records')}
     recetas_nombres = ["--- Seleccionar Receta ---"] + df_recetas['nombre'].tolist()
 
@@ -839,32 +722,27 @@ def main():
     
     st.session_state.receta_id_actual = receta_id_seleccionada
 
+    marcar_seccion("Empaque")
     # -----------------------------------------------------------
     # CÁLCULO DE UNIDADES DE ENVASE Y COSTO DE EMPAQUE
     # -----------------------------------------------------------
     
     unidades_necesarias = 0
     if cantidad_litros > 0 and capacidad_litros > 0:
-        unidades_necesarias = int(cantidad_litros / capacidad_litros)
-        
-        # 1. Costo Envase Principal
-        costo_envase_total_ars = precio_envase_unitario_ars * unidades_necesarias
-        
-        # 2. Costo Etiqueta (Adicional)
-        costo_etiqueta_total_ars = costo_etiqueta_por_envase * unidades_necesarias
-        
-        # 3. Costo de la Caja (Adicional)
-        costo_caja_total_ars = costo_caja_por_envase * unidades_necesarias
-        
-        # Costo Total de Empaque
-        costo_total_empaque_ars = costo_envase_total_ars + costo_etiqueta_total_ars + costo_caja_total_ars
+        # Envase Principal + Etiqueta + Caja (unidades redondeadas hacia arriba)
+        empaque = calcular_empaque(cantidad_litros, capacidad_litros, precio_envase_unitario_ars, costo_etiqueta_por_envase, costo_caja_por_envase)
+        unidades_necesarias = empaque['unidades_necesarias']
+        costo_envase_total_ars = empaque['costo_envase_total_ars']
+        costo_etiqueta_total_ars = empaque['costo_etiqueta_total_ars']
+        costo_caja_total_ars = empaque['costo_caja_total_ars']
+        costo_total_empaque_ars = empaque['costo_total_empaque_ars']
         
         # [MODIFICACIÓN] Métricas de Desglose de Empaque
         st.sidebar.markdown(f"**Total Envase Principal (Tanda):** ${costo_envase_total_ars:,.2f} ARS")
         st.sidebar.markdown(f"**Total Etiqueta (Tanda):** ${costo_etiqueta_total_ars:,.2f} ARS")
         st.sidebar.markdown(f"**Total Caja (Tanda):** ${costo_caja_total_ars:,.2f} ARS")
         
-        costo_envase_por_litro = costo_total_empaque_ars / cantidad_litros
+        costo_envase_por_litro = empaque['costo_envase_por_litro']
         st.sidebar.metric(
             "Costo Empaque Total por Litro", 
             f"${costo_envase_por_litro:,.4f} ARS/L", 
@@ -879,6 +757,7 @@ def main():
              st.sidebar.warning("Ingrese un volumen de tanda > 0 para calcular unidades.")
 
 
+    marcar_seccion("Costeo de MP")
     # -----------------------------------------------------------
     # LÓGICA DE INGREDIENTES Y EDICIÓN (MP)
     # -----------------------------------------------------------
@@ -932,17 +811,14 @@ def main():
     if not ingredientes_a_calcular.empty:
         # 1. Calcular la cantidad simulada total
         if BASE_LITROS > 0 and cantidad_litros > 0:
-            ingredientes_a_calcular['cantidad_simulada'] = (ingredientes_a_calcular['Cantidad Base (200L)'] / BASE_LITROS) * cantidad_litros
+            ingredientes_a_calcular['cantidad_simulada'] = ingredientes_a_calcular['Cantidad Base (200L)'] * factor_escala(cantidad_litros)
         else:
             ingredientes_a_calcular['cantidad_simulada'] = 0.0
             
         # 2. Buscar el precio base de la BD (solo para visualización)
-        ingredientes_a_calcular['Precio Unitario (USD) BASE'] = 0.0
-        for index, row in ingredientes_a_calcular.iterrows():
-            if row['materia_prima_id'] != -1 and row['precio_unitario_manual'] == 0.0:
-                precio_unitario_reg_base, _, _, cotizacion_usd_reg_bd = obtener_precio_actual_materia_prima(conn, row['materia_prima_id'])
-                if cotizacion_usd_reg_bd > 1.0:
-                    ingredientes_a_calcular.loc[index, 'Precio Unitario (USD) BASE'] = precio_unitario_reg_base
+        # Precios de la foto en memoria (sin consultar la DB en cada rerun); se reutilizan en el cálculo del costo.
+        precios_df = obtener_precios_materias_primas(DB_PATH, ingredientes_a_calcular['materia_prima_id'])
+        ingredientes_a_calcular['Precio Unitario (USD) BASE'] = precio_unitario_usd_base(ingredientes_a_calcular, precios_df)
             
         # 3. Configurar el editor
         column_config_ingredientes = {
@@ -1018,9 +894,10 @@ def main():
         # 6. Filtrar ingredientes para el cálculo final (quitar los marcados para Quitar)
         ingredientes_a_calcular = edited_ingredientes_df[~edited_ingredientes_df['Quitar']].copy()
         
-        # 7. Ejecutar el cálculo del costo
+        # 7. Ejecutar el cálculo del costo (si sólo cambiaron los litros, se reescala el de la receta base)
+        factor_tanda = factor_escala(cantidad_litros) if cantidad_litros > 0 else 0.0
         costo_mp_total, detalle_costo_df, costo_total_mp_ars_base, costo_total_recargo_mp_ars, costo_total_mp_usd = \
-            calcular_costo_total(ingredientes_a_calcular, cotizacion_dolar_actual, conn)
+            calcular_costo_tanda_mp(ingredientes_a_calcular, cotizacion_dolar_actual, precios_df, factor_tanda)
 
         # Guardar resultados en Session State
         st.session_state['costo_total'] = costo_mp_total
@@ -1032,25 +909,31 @@ def main():
         # Las variables mantienen su valor de 0.0 si el bloque 'if' es omitido.
 
 
+    marcar_seccion("Totales de la tanda")
     # -----------------------------------------------------------
     # RESULTADOS DE COSTO TOTAL
     # -----------------------------------------------------------
     st.markdown("---")
     st.subheader("Resumen de Costos de Producción (Tanda Simulada)")
 
-    # Cálculo final de costos
-    costo_indirecto_total_ars = costo_indirecto_por_litro * cantidad_litros
-    
-    # Flete escalado
-    costo_flete_total_ars = (flete_base_200l / BASE_LITROS) * cantidad_litros if BASE_LITROS > 0 else 0.0
-    
-    # Costo Total Final = MP + Flete + Overhead + Empaque
+    # Cálculo final de costos: Costo Total Final = MP + Flete + Overhead + Empaque
     # Las variables costo_mp_total, costo_total_recargo_mp_ars, costo_total_mp_usd están garantizadas con un valor (0.0 o el calculado)
-    costo_total_final = costo_mp_total + costo_flete_total_ars + costo_indirecto_total_ars + costo_total_empaque_ars
+    totales = totales_tanda(
+        costo_mp_total,
+        costo_total_mp_usd,
+        cantidad_litros,
+        cotizacion_dolar_actual,
+        flete_base=flete_base_200l,
+        costo_indirecto_litro=costo_indirecto_litro,
+        costo_total_empaque_ars=costo_total_empaque_ars,
+    )
+    costo_indirecto_total_ars = totales['gasto_indirecto_tanda']
+    costo_flete_total_ars = totales['costo_flete_total_ars']
+    costo_total_final = totales['costo_total_final']
     
     # Costo por Litro
-    costo_por_litro_ars = costo_total_final / cantidad_litros if cantidad_litros > 0 else 0.0
-    costo_por_litro_usd = costo_por_litro_ars / cotizacion_dolar_actual if cotizacion_dolar_actual > 0 else 0.0
+    costo_por_litro_ars = totales['costo_por_litro_ars']
+    costo_por_litro_usd = totales['costo_por_litro_usd']
     
     col_res1, col_res2, col_res3 = st.columns(3)
     
@@ -1125,6 +1008,7 @@ def main():
     else:
         st.info("El detalle de costos de materia prima estará disponible al seleccionar una receta o añadir MPs temporales.")
 
+    marcar_seccion("Gestión de MP temporales")
     # -----------------------------------------------------------
     # FORMULARIOS PARA AÑADIR/ACTUALIZAR MATERIA PRIMA MANUALMENTE
     # -----------------------------------------------------------
@@ -1248,6 +1132,7 @@ def main():
         st.session_state.litros = BASE_LITROS
         st.rerun()
 
+    marcar_seccion("Tabla de presupuesto")
     # =================================================================================================
     # PRESUPUESTO ACUMULADO
     # =================================================================================================
@@ -1281,7 +1166,7 @@ def main():
             col_litros_total.metric("Volumen Total a Presupuestar", f"{total_litros:,.2f} Litros")
             
             costo_final_tandas = costo_total_final * cantidad_a_agregar
-            precio_venta_total_ars = costo_final_tandas * (1 + margen_ganancia_inicial / 100)
+            precio_venta_total_ars = precio_con_margen(costo_final_tandas, margen_ganancia_inicial)
             precio_venta_total_usd = precio_venta_total_ars / cotizacion_dolar_actual
             
             # Cálculo del Precio Unitario por Envase (para inicializar el campo de edición)
@@ -1617,6 +1502,8 @@ def main():
                     }
                     
                     st.session_state['presupuesto_data_for_print'] = data_pdf
+                    # El PDF se genera en segundo plano; la vista previa lo toma ya hecho
+                    encargar_pdf(generate_pdf_reportlab, data_pdf)
                     st.rerun()
 
                 else:
@@ -1663,8 +1550,8 @@ def main():
             }
         )
         
-        # Generar PDF y botón de descarga
-        pdf_output = generate_pdf_reportlab(data_pdf)
+        # PDF ya generado (por N° y contenido del presupuesto) y botón de descarga
+        pdf_output = obtener_pdf(generate_pdf_reportlab, data_pdf)
         
         st.download_button(
             label=f"⬇️ Descargar Presupuesto N° {data_pdf['presupuesto_id']} ({data_pdf['cliente_nombre'].replace(' ', '_')}.pdf)",
@@ -1682,4 +1569,5 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    with perfil_pagina("simulacion_envasases", DB_PATH):
+        main()
\ No newline at end of file